@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        import api.authentication  # noqa: F401
+        import api.database  # noqa: F401
+        import api.ingredient_search  # noqa: F401
+        import api.metrics  # noqa: F401
+        import api.reciept_cards  # noqa: F401
+        import api.reference_cache  # noqa: F401
+        import api.search  # noqa: F401
+        import api.short_links  # noqa: F401
@@ -0,0 +1,155 @@
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
+from django.views import View
+from rest_framework.exceptions import APIException
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from api.views import IngredientViewSet, RecieptViewSet, TagViewSet
+
+LIST_ACTIONS = {"get": "list", "post": "create"}
+DETAIL_ACTIONS = {
+    "get": "retrieve",
+    "put": "update",
+    "patch": "partial_update",
+    "delete": "destroy",
+}
+FALLBACK_ERRORS = (
+    APIException,
+    ObjectDoesNotExist,
+    ValidationError,
+    ValueError,
+)
+
+
+class Fallback(Exception):
+    pass
+
+
+class AsyncReadView(View):
+    viewset_class = None
+    actions = None
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        view.csrf_exempt = True
+        return view
+
+    async def get(self, request, *args, **kwargs):
+        viewset = self.viewset_class(
+            action_map=self.actions, action=self.actions["get"]
+        )
+        viewset.args = args
+        viewset.kwargs = kwargs
+        viewset.request = viewset.initialize_request(request, *args, **kwargs)
+        viewset.headers = viewset.default_response_headers
+        try:
+            await sync_to_async(viewset.initial)(viewset.request)
+            if not isinstance(
+                viewset.request.accepted_renderer, JSONRenderer
+            ):
+                raise Fallback
+            response = await self.read(viewset, *args, **kwargs)
+        except (Fallback, *FALLBACK_ERRORS):
+            return await self.fallback(request, *args, **kwargs)
+        if isinstance(response, Response):
+            response = viewset.finalize_response(
+                viewset.request, response, *args, **kwargs
+            )
+            response.render()
+        return response
+
+    async def read(self, viewset, *args, **kwargs):
+        raise NotImplementedError
+
+    async def fallback(self, request, *args, **kwargs):
+        view = self.viewset_class.as_view(self.actions)
+        return await sync_to_async(view)(request, *args, **kwargs)
+
+    post = put = patch = delete = options = fallback
+
+
+async def card_serializer(viewset, instance, many=False):
+    # viewset.get_serializer загружает карточки синхронно.
+    serializer = viewset.get_serializer_class()(
+        instance, many=many, context=viewset.get_serializer_context()
+    )
+    return await serializer.aload()
+
+
+class AsyncRecieptListView(AsyncReadView):
+    viewset_class = RecieptViewSet
+    actions = LIST_ACTIONS
+
+    async def read(self, viewset):
+        paginator = viewset.paginator
+        if paginator.cursor_query_param in viewset.request.query_params:
+            raise Fallback
+        queryset = viewset.filter_queryset(viewset.get_queryset())
+        page = await paginator.apaginate_queryset(queryset, viewset.request)
+        if page is None:
+            raise Fallback
+        serializer = await card_serializer(viewset, page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+
+class AsyncRecieptDetailView(AsyncReadView):
+    viewset_class = RecieptViewSet
+    actions = DETAIL_ACTIONS
+
+    async def read(self, viewset, pk):
+        reciept = await viewset.get_queryset().aget(pk=pk)
+        serializer = await card_serializer(viewset, reciept)
+        return Response(serializer.data)
+
+
+class AsyncReferenceListView(AsyncReadView):
+    actions = {"get": "list"}
+
+    async def read(self, viewset):
+        async def build():
+            queryset = viewset.filter_queryset(viewset.get_queryset())
+            return viewset.get_serializer(
+                [item async for item in queryset], many=True
+            ).data
+
+        return await viewset.acached_response(build, viewset.request)
+
+
+class AsyncReferenceDetailView(AsyncReadView):
+    actions = {"get": "retrieve"}
+
+    async def read(self, viewset, pk):
+        async def build():
+            item = await viewset.get_queryset().aget(pk=pk)
+            return viewset.get_serializer(item).data
+
+        return await viewset.acached_response(build, viewset.request)
+
+
+class AsyncTagListView(AsyncReferenceListView):
+    viewset_class = TagViewSet
+
+
+class AsyncTagDetailView(AsyncReferenceDetailView):
+    viewset_class = TagViewSet
+
+
+class AsyncIngredientListView(AsyncReferenceListView):
+    viewset_class = IngredientViewSet
+
+    async def read(self, viewset):
+        name = viewset.request.query_params.get("name")
+        if not name:
+            return await super().read(viewset)
+
+        async def build():
+            items = await sync_to_async(viewset.search)(name)
+            return viewset.get_serializer(items, many=True).data
+
+        return await viewset.acached_response(build, viewset.request)
+
+
+class AsyncIngredientDetailView(AsyncReferenceDetailView):
+    viewset_class = IngredientViewSet
@@ -0,0 +1,127 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import (
+    AuthenticationFailed,
+    InvalidToken,
+)
+from rest_framework_simplejwt.settings import api_settings
+
+from reciepts.models import CustomUser
+
+USER_VERSION_KEY = "auth_user_version:{}"
+USER_KEY = "auth_user:{}:{}"
+AUTH_FIELDS = [
+    field.attname
+    for field in CustomUser._meta.concrete_fields
+    if field.attname
+    in (
+        "id",
+        "username",
+        "email",
+        "first_name",
+        "last_name",
+        "avatar",
+        "is_active",
+        "is_staff",
+        "is_superuser",
+    )
+]
+
+
+def get_user_version(user_id):
+    return cache.get_or_set(USER_VERSION_KEY.format(user_id), 0, timeout=None)
+
+
+def bump_user_version(user_id):
+    key = USER_VERSION_KEY.format(user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, timeout=None)
+
+
+class TokenCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tokens = OrderedDict()
+
+    def get(self, raw_token):
+        with self._lock:
+            token = self._tokens.get(raw_token)
+            if token is None:
+                return None
+            if token["exp"] <= time.time():
+                del self._tokens[raw_token]
+                return None
+            self._tokens.move_to_end(raw_token)
+            return token
+
+    def set(self, raw_token, token):
+        with self._lock:
+            self._tokens[raw_token] = token
+            while len(self._tokens) > settings.AUTH_TOKEN_CACHE_SIZE:
+                self._tokens.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._tokens.clear()
+
+
+token_cache = TokenCache()
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    def get_validated_token(self, raw_token):
+        token = token_cache.get(raw_token)
+        if token is None:
+            token = super().get_validated_token(raw_token)
+            token_cache.set(raw_token, token)
+        return token
+
+    def get_user(self, validated_token):
+        if api_settings.CHECK_REVOKE_TOKEN:
+            return super().get_user(validated_token)
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(
+                _("Token contained no recognizable user identification")
+            )
+
+        key = USER_KEY.format(user_id, get_user_version(user_id))
+        values = cache.get(key)
+        if values is None:
+            values = (
+                CustomUser.objects.filter(
+                    **{api_settings.USER_ID_FIELD: user_id}
+                )
+                .values_list(*AUTH_FIELDS)
+                .first()
+            )
+            if values is None:
+                raise AuthenticationFailed(
+                    _("User not found"), code="user_not_found"
+                )
+            cache.set(key, values, settings.AUTH_USER_CACHE_TTL)
+
+        user = CustomUser.from_db(DEFAULT_DB_ALIAS, AUTH_FIELDS, values)
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(
+                _("User is inactive"), code="user_inactive"
+            )
+        return user
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def invalidate_cached_user(sender, instance, **kwargs):
+    bump_user_version(instance.pk)
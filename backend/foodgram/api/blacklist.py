@@ -0,0 +1,143 @@
+import hashlib
+import logging
+import math
+import threading
+
+import jwt
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError
+from django.db.models import Max
+from django.utils import timezone
+
+from api.models import BlacklistedTokens
+
+logger = logging.getLogger(__name__)
+
+MIN_CAPACITY = 1024
+VERSION_KEY = "token_blacklist:version"
+FALSE_POSITIVE_RATE = 0.001
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate=FALSE_POSITIVE_RATE):
+        self.capacity = capacity
+        self.count = 0
+        self.size = max(
+            8, int(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        )
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return (
+            (first + i * second) % self.size for i in range(self.hash_count)
+        )
+
+    def add(self, value):
+        self.count += 1
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value):
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(value)
+        )
+
+
+class TokenBlacklist:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._filter = None
+        self._version = None
+
+    def _current_version(self):
+        # Версией служит наибольший pk таблицы: он общий для всех
+        # процессов и растёт при каждом добавлении токена. Значение
+        # хранится в кэше не дольше TOKEN_BLACKLIST_REFRESH секунд, а add()
+        # сбрасывает его, поэтому на промахе фильтра база не нужна.
+        version = cache.get(VERSION_KEY)
+        if version is None:
+            version = (
+                BlacklistedTokens.objects.aggregate(version=Max("pk"))[
+                    "version"
+                ]
+                or 0
+            )
+            cache.set(VERSION_KEY, version, settings.TOKEN_BLACKLIST_REFRESH)
+        return version
+
+    def _rebuild(self, version):
+        jtis = list(
+            BlacklistedTokens.objects.filter(
+                expires_at__gt=timezone.now()
+            ).values_list("jti", flat=True)
+        )
+        bloom = BloomFilter(max(MIN_CAPACITY, len(jtis) * 2))
+        for jti in jtis:
+            bloom.add(jti)
+        with self._lock:
+            self._filter = bloom
+            self._version = version
+
+    def _extend(self, version):
+        jtis = list(
+            BlacklistedTokens.objects.filter(
+                pk__gt=self._version, pk__lte=version
+            ).values_list("jti", flat=True)
+        )
+        with self._lock:
+            for jti in jtis:
+                self._filter.add(jti)
+            self._version = max(self._version, version)
+
+    def _get_filter(self):
+        version = self._current_version()
+        if (
+            self._filter is None
+            or version < self._version
+            or self._filter.count >= self._filter.capacity
+        ):
+            self._rebuild(version)
+        elif version > self._version:
+            self._extend(version)
+        return self._filter
+
+    def is_blacklisted(self, jti):
+        if jti not in self._get_filter():
+            return False
+        return BlacklistedTokens.objects.filter(jti=jti).exists()
+
+    def warm(self):
+        try:
+            self._get_filter()
+        except DatabaseError:
+            logger.exception("Не удалось загрузить отозванные токены")
+
+    def add(self, jti, expires_at):
+        BlacklistedTokens.objects.get_or_create(
+            jti=jti, defaults={"expires_at": expires_at}
+        )
+        cache.delete(VERSION_KEY)
+
+    def prune(self):
+        deleted, _ = BlacklistedTokens.objects.filter(
+            expires_at__lte=timezone.now()
+        ).delete()
+        cache.delete(VERSION_KEY)
+        return deleted
+
+
+def get_unverified_jti(token):
+    try:
+        claims = jwt.decode(token, options={"verify_signature": False})
+    except jwt.InvalidTokenError:
+        return None
+    return claims.get("jti")
+
+
+token_blacklist = TokenBlacklist()
@@ -0,0 +1,127 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import (
+    iscoroutinefunction,
+    markcoroutinefunction,
+    sync_to_async,
+)
+from django.conf import settings
+from rest_framework.permissions import SAFE_METHODS
+
+PIN_COOKIE = "db_pin"
+PIN_SALT = "api.db_router.pin"
+
+
+class RoutingState:
+    def __init__(self):
+        self.use_replica = False
+
+
+_routing = ContextVar("db_routing", default=None)
+
+
+@contextmanager
+def request_routing():
+    token = _routing.set(RoutingState())
+    try:
+        yield _routing.get()
+    finally:
+        _routing.reset(token)
+
+
+def current_routing():
+    return _routing.get()
+
+
+def is_pinned(request):
+    # Метка хранится в подписанной cookie, а не в кэше процесса: следующий
+    # запрос того же клиента может попасть на другой воркер.
+    return request.user.is_authenticated and request.get_signed_cookie(
+        PIN_COOKIE,
+        default=None,
+        salt=PIN_SALT,
+        max_age=settings.REPLICA_PIN_SECONDS,
+    ) == str(request.user.pk)
+
+
+def pin_to_primary(request, response):
+    state = _routing.get()
+    if state is not None:
+        state.use_replica = False
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        response.set_signed_cookie(
+            PIN_COOKIE,
+            str(user.pk),
+            salt=PIN_SALT,
+            max_age=settings.REPLICA_PIN_SECONDS,
+            httponly=True,
+            samesite="Lax",
+        )
+
+
+def allow_replica_reads(request):
+    state = _routing.get()
+    if (
+        state is not None
+        and settings.DATABASE_REPLICAS
+        and request.method in SAFE_METHODS
+        and not is_pinned(request)
+    ):
+        state.use_replica = True
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _routing.get()
+        if state is None or not state.use_replica:
+            return None
+        instance = hints.get("instance")
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+
+class ReplicaRoutingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        with request_routing():
+            response = self.get_response(request)
+        self._pin_after_write(request, response)
+        return response
+
+    async def __acall__(self, request):
+        with request_routing():
+            response = await self.get_response(request)
+        if request.method not in SAFE_METHODS:
+            await sync_to_async(self._pin_after_write)(request, response)
+        return response
+
+    @staticmethod
+    def _pin_after_write(request, response):
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            pin_to_primary(request, response)
+
+
+class ReplicaReadMixin:
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        allow_replica_reads(request)
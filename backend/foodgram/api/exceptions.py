@@ -21,3 +21,9 @@ class InvalidData(APIException):
     def __init__(self, field):
         detail = {field: "Введено неверное значение."}
         super().__init__(detail)
+
+
+class ServerBusy(APIException):
+    status_code = status.HTTP_429_TOO_MANY_REQUESTS
+    default_detail = "Сервер перегружен, повторите попытку позже."
+    default_code = "server_busy"
@@ -0,0 +1,49 @@
+from django_filters import rest_framework as filters
+
+from api.search import search_reciepts
+from reciepts.models import CustomUser, Reciept, RecieptTag
+
+
+class RecieptFilter(filters.FilterSet):
+    tags = filters.CharFilter(method="filter_tags")
+    author = filters.NumberFilter(field_name="author")
+    is_favorited = filters.NumberFilter(method="filter_user_relation")
+    is_in_shopping_cart = filters.NumberFilter(method="filter_user_relation")
+    search = filters.CharFilter(method="filter_search")
+
+    class Meta:
+        model = Reciept
+        fields = (
+            "tags",
+            "author",
+            "is_favorited",
+            "is_in_shopping_cart",
+            "search",
+        )
+
+    def filter_tags(self, queryset, name, value):
+        slugs = self.request.query_params.getlist("tags")
+        return queryset.filter(
+            pk__in=RecieptTag.objects.filter(tag__slug__in=slugs).values(
+                "reciept"
+            )
+        )
+
+    def filter_user_relation(self, queryset, name, value):
+        if not value:
+            return queryset
+        user = self.request.user
+        if not user.is_authenticated:
+            return queryset.none()
+        relation = {
+            "is_favorited": CustomUser.favorites,
+            "is_in_shopping_cart": CustomUser.shopping_cart,
+        }[name]
+        return queryset.filter(
+            pk__in=relation.through.objects.filter(customuser=user).values(
+                "reciept"
+            )
+        )
+
+    def filter_search(self, queryset, name, value):
+        return search_reciepts(queryset, value)
@@ -0,0 +1,133 @@
+import base64
+import binascii
+import io
+import logging
+import posixpath
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.dispatch import Signal
+from PIL import Image, ImageOps, UnidentifiedImageError
+from rest_framework import serializers
+
+logger = logging.getLogger(__name__)
+
+DECODE_CHUNK_SIZE = 64 * 1024
+RENDITION_FORMATS = {"WEBP": "webp", "JPEG": "jpg"}
+
+renditions_built = Signal()
+
+
+def decode_base64_image(data):
+    header, encoded = data.split(";base64,", 1)
+    ext = header.split("/")[-1]
+    if len(encoded) * 3 // 4 > settings.IMAGE_MAX_UPLOAD_SIZE:
+        raise serializers.ValidationError(
+            "Размер изображения превышает "
+            f"{settings.IMAGE_MAX_UPLOAD_SIZE // (1024 * 1024)} МБ."
+        )
+
+    file = tempfile.SpooledTemporaryFile(max_size=DECODE_CHUNK_SIZE * 16)
+    try:
+        for start in range(0, len(encoded), DECODE_CHUNK_SIZE):
+            file.write(
+                base64.b64decode(
+                    encoded[start:start + DECODE_CHUNK_SIZE], validate=True
+                )
+            )
+    except binascii.Error:
+        file.close()
+        raise serializers.ValidationError("Некорректные данные base64.")
+    file.seek(0)
+
+    try:
+        with Image.open(file) as image:
+            width, height = image.size
+    except (UnidentifiedImageError, Image.DecompressionBombError):
+        file.close()
+        raise serializers.ValidationError("Файл не является изображением.")
+    if max(width, height) > settings.IMAGE_MAX_DIMENSION:
+        file.close()
+        raise serializers.ValidationError(
+            "Изображение не должно быть больше "
+            f"{settings.IMAGE_MAX_DIMENSION} пикселей по стороне."
+        )
+    file.seek(0)
+    return File(file, name="img." + ext)
+
+
+def rendition_name(name, size):
+    directory, filename = posixpath.split(name)
+    stem = posixpath.splitext(filename)[0]
+    ext = RENDITION_FORMATS[settings.IMAGE_RENDITION_FORMAT]
+    return posixpath.join(directory, "renditions", f"{stem}.{size}.{ext}")
+
+
+def build_renditions(name):
+    with default_storage.open(name) as source:
+        image = ImageOps.exif_transpose(Image.open(source))
+        image.load()
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA")
+    if settings.IMAGE_RENDITION_FORMAT == "JPEG" and image.mode == "RGBA":
+        image = image.convert("RGB")
+
+    for size, bounds in settings.IMAGE_RENDITIONS.items():
+        rendition = image.copy()
+        rendition.thumbnail(bounds)
+        buffer = io.BytesIO()
+        rendition.save(
+            buffer, format=settings.IMAGE_RENDITION_FORMAT, quality=80
+        )
+        target = rendition_name(name, size)
+        if default_storage.exists(target):
+            default_storage.delete(target)
+        default_storage.save(target, ContentFile(buffer.getvalue()))
+    renditions_built.send(sender=build_renditions, name=name)
+
+
+def rendition_urls(field_file):
+    if not field_file:
+        return None
+    urls = {}
+    for size in settings.IMAGE_RENDITIONS:
+        name = rendition_name(field_file.name, size)
+        urls[size] = (
+            default_storage.url(name)
+            if default_storage.exists(name)
+            else field_file.url
+        )
+    return urls
+
+
+class ImagePipeline:
+    def __init__(self):
+        self._executor = None
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=settings.IMAGE_WORKERS,
+                thread_name_prefix="image-pipeline",
+            )
+        return self._executor
+
+    def submit(self, name):
+        future = self._get_executor().submit(build_renditions, name)
+        future.add_done_callback(self._log_failure)
+        return future
+
+    @staticmethod
+    def _log_failure(future):
+        if future.exception() is not None:
+            logger.error(
+                "Не удалось обработать изображение",
+                exc_info=future.exception(),
+            )
+
+
+image_pipeline = ImagePipeline()
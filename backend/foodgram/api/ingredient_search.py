@@ -0,0 +1,129 @@
+import threading
+from bisect import bisect_left, bisect_right
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from reciepts.models import Ingredient, normalize_ingredient_name
+
+FIELDS = ("id", "name", "measurement_unit")
+TRIGRAM_TABLE = "reciepts_ingredient_trigram"
+TRIGRAM_CANDIDATES = 1000
+
+
+def prefix_upper(key):
+    return key[:-1] + chr(ord(key[-1]) + 1)
+
+
+def prefix_range(key):
+    return Q(search_name__gte=key, search_name__lt=prefix_upper(key))
+
+
+def trigram_candidates(queryset, key):
+    # В PostgreSQL подстроку находит GIN-индекс pg_trgm. В SQLite кандидатов
+    # отбирает таблица FTS5 с токенизатором trigram; ключам короче трёх
+    # символов и частым подстрокам быстрее обычный просмотр, который
+    # останавливается после первых совпадений.
+    connection = connections[queryset.db]
+    if connection.vendor != "sqlite" or len(key) < 3:
+        return queryset
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid FROM {TRIGRAM_TABLE} "
+            "WHERE search_name LIKE %s LIMIT %s",
+            (f"%{key}%", TRIGRAM_CANDIDATES + 1),
+        )
+        ids = [row[0] for row in cursor.fetchall()]
+    if len(ids) > TRIGRAM_CANDIDATES:
+        return queryset
+    return queryset.filter(pk__in=ids)
+
+
+def search_ingredients(queryset, name):
+    key = normalize_ingredient_name(name)
+    if not key:
+        return []
+    limit = settings.INGREDIENT_SEARCH_LIMIT
+    queryset = queryset.order_by("search_name", "id").values(*FIELDS)
+    prefix = prefix_range(key)
+    matches = list(queryset.filter(prefix)[:limit])
+    # Совпадения по подстроке только добирают оставшиеся места.
+    if len(matches) < limit:
+        matches += (
+            trigram_candidates(queryset, key)
+            .filter(search_name__contains=key)
+            .exclude(prefix)[: limit - len(matches)]
+        )
+    return matches
+
+
+class IngredientSearchCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._index = None
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._index = None
+
+    def _load(self):
+        index = self._index
+        if index is not None:
+            return index
+        generation = self._generation
+        rows = sorted(
+            (normalize_ingredient_name(name), pk, name, measurement_unit)
+            for pk, name, measurement_unit in Ingredient.objects.values_list(
+                "id", "name", "measurement_unit"
+            )
+        )
+        keys = [row[0] for row in rows]
+        # Все ключи склеены в одну строку: поиск подстроки идёт через
+        # str.find, а не перебором строк в Python.
+        offsets, position = [], 0
+        for key in keys:
+            offsets.append(position)
+            position += len(key) + 1
+        index = (keys, rows, "\n".join(keys), offsets)
+        with self._lock:
+            if generation == self._generation:
+                self._index = index
+        return index
+
+    def search(self, name):
+        key = normalize_ingredient_name(name)
+        if not key:
+            return []
+        limit = settings.INGREDIENT_SEARCH_LIMIT
+        keys, rows, haystack, offsets = self._load()
+        start = bisect_left(keys, key)
+        prefix_end = bisect_left(keys, prefix_upper(key), start)
+        matches = rows[start:min(prefix_end, start + limit)]
+        position = haystack.find(key) if len(matches) < limit else -1
+        while position != -1 and len(matches) < limit:
+            row = bisect_right(offsets, position) - 1
+            if start <= row < prefix_end:
+                row = prefix_end - 1
+            else:
+                matches.append(rows[row])
+            if row + 1 == len(offsets):
+                break
+            position = haystack.find(key, offsets[row + 1])
+        return [
+            {"id": pk, "name": title, "measurement_unit": measurement_unit}
+            for _, pk, title, measurement_unit in matches
+        ]
+
+
+ingredient_search_cache = IngredientSearchCache()
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_ingredient_search_cache(**kwargs):
+    ingredient_search_cache.invalidate()
@@ -0,0 +1,97 @@
+import csv
+import tempfile
+import time
+import tracemalloc
+from itertools import islice
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.management.commands.load_ingredients import (
+    Command as LoadIngredientsCommand,
+    DryRunRollback,
+    read_csv,
+)
+from api.management.commands.seed_benchmark_data import PREFIX
+from reciepts.models import Ingredient
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает пакетную загрузку ингредиентов с построчными вставками "
+        "на синтетическом CSV и измеряет пиковую память загрузчика. "
+        "Все изменения откатываются."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1_000_000)
+        parser.add_argument(
+            "--row-by-row",
+            type=int,
+            default=20_000,
+            help="Сколько строк вставить по одной для сравнения.",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "ingredients.csv"
+            with open(path, "w", encoding="utf-8", newline="") as file:
+                writer = csv.writer(file)
+                for number in range(options["rows"]):
+                    writer.writerow((f"{PREFIX}import {number}", "г"))
+
+            bulk_time, _ = self._rolled_back(
+                self._load_bulk, path, options["batch_size"]
+            )
+            tracemalloc.start()
+            try:
+                self._rolled_back(self._load_bulk, path, options["batch_size"])
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+            row_time, rows = self._rolled_back(
+                self._load_row_by_row, path, options["row_by_row"]
+            )
+
+        bulk_rate = options["rows"] / bulk_time
+        row_rate = rows / row_time if rows else 0
+        self.stdout.write(
+            f"Пакетная загрузка: {options['rows']} строк "
+            f"за {bulk_time:.1f} с, {bulk_rate:.0f} строк/с, "
+            f"пик памяти {peak / 2**20:.1f} МиБ"
+        )
+        self.stdout.write(
+            f"Построчные вставки: {rows} строк за {row_time:.1f} с, "
+            f"{row_rate:.0f} строк/с"
+        )
+        if row_rate:
+            self.stdout.write(f"Ускорение: x{bulk_rate / row_rate:.1f}")
+
+    @staticmethod
+    def _rolled_back(load, *args):
+        started = time.perf_counter()
+        result = None
+        try:
+            with transaction.atomic():
+                result = load(*args)
+                raise DryRunRollback
+        except DryRunRollback:
+            pass
+        return time.perf_counter() - started, result
+
+    @staticmethod
+    def _load_bulk(path, batch_size):
+        return LoadIngredientsCommand()._load(read_csv, path, batch_size)
+
+    @staticmethod
+    def _load_row_by_row(path, limit):
+        rows = 0
+        with open(path, encoding="utf-8", newline="") as file:
+            for name, unit in islice(read_csv(file), limit):
+                Ingredient.objects.get_or_create(
+                    name=name, measurement_unit=unit
+                )
+                rows += 1
+        return rows
@@ -0,0 +1,135 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.read_serializers import (
+    IngredientReadSerializer,
+    TagReadSerializer,
+    UserReadSerializer,
+)
+from api.reciept_cards import CACHE_ALIAS, RecieptCardSerializer, card_key
+from api.renderers import FastJSONRenderer
+from api.serializers import (
+    IngredientSerializer,
+    TagSerializer,
+    UserSerializer,
+)
+from reciepts.models import CustomUser, Ingredient, Reciept, Tag
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает процессорное время сериализации и рендеринга JSON "
+        "у DRF-сериализаторов и быстрых сериализаторов для чтения, а для "
+        "рецептов — сборку карточек без кэша и чтение их из кэша."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--objects", type=int, default=100)
+        parser.add_argument("--repeat", type=int, default=50)
+
+    def handle(self, *args, **options):
+        limit = options["objects"]
+        # Те же строки, что отдаёт список рецептов.
+        rows = list(
+            Reciept.objects.with_user_flags(AnonymousUser())
+            .order_by("-id")
+            .values(*RecieptCardSerializer.fields)[:limit]
+        )
+        if not rows:
+            raise CommandError(
+                "Нет рецептов: сначала выполните seed_benchmark_data."
+            )
+        context = {"request": Request(APIRequestFactory().get("/"))}
+        cases = (
+            (
+                "users",
+                UserSerializer,
+                UserReadSerializer,
+                list(CustomUser.objects.order_by("id")[:limit]),
+            ),
+            (
+                "tags",
+                TagSerializer,
+                TagReadSerializer,
+                list(Tag.objects.values(*TagReadSerializer.fields)),
+            ),
+            (
+                "ingredients",
+                IngredientSerializer,
+                IngredientReadSerializer,
+                list(
+                    Ingredient.objects.values(
+                        *IngredientReadSerializer.fields
+                    )[:limit]
+                ),
+            ),
+        )
+        with override_settings(
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]
+        ):
+            self._compare_cards(rows, context, options)
+            for case in cases:
+                self._compare(*case, context, options)
+
+    def _compare_cards(self, rows, context, options):
+        keys = [card_key(row["id"]) for row in rows]
+
+        def serialize(cold):
+            if cold:
+                caches[CACHE_ALIAS].delete_many(keys)
+            return (
+                RecieptCardSerializer(rows, many=True, context=context)
+                .load()
+                .data
+            )
+
+        cold_content, cold_time = self._measure(
+            lambda: serialize(True), FastJSONRenderer(), options
+        )
+        warm_content, warm_time = self._measure(
+            lambda: serialize(False), FastJSONRenderer(), options
+        )
+        if warm_content != cold_content:
+            raise CommandError("recipes: ответы различаются.")
+        self.stdout.write(
+            f"{'recipes':<12} {len(rows):>5} объектов  "
+            f"без кэша {cold_time:>8.3f} мс  "
+            f"из кэша {warm_time:>8.3f} мс  "
+            f"x{cold_time / warm_time:.1f}"
+        )
+
+    def _compare(self, name, reference, fast, objects, context, options):
+        reference_content, reference_time = self._measure(
+            lambda: reference(objects, many=True, context=context).data,
+            JSONRenderer(),
+            options,
+        )
+        fast_content, fast_time = self._measure(
+            lambda: fast(objects, many=True, context=context).data,
+            FastJSONRenderer(),
+            options,
+        )
+        if fast_content != reference_content:
+            raise CommandError(f"{name}: ответы различаются.")
+        self.stdout.write(
+            f"{name:<12} {len(objects):>5} объектов  "
+            f"DRF {reference_time:>8.3f} мс  "
+            f"быстрый {fast_time:>8.3f} мс  "
+            f"x{reference_time / fast_time:.1f}"
+        )
+
+    @staticmethod
+    def _measure(serialize, renderer, options):
+        started = time.process_time()
+        for _ in range(options["repeat"]):
+            content = renderer.render(serialize())
+        elapsed = time.process_time() - started
+        return content, elapsed * 1000 / options["repeat"]
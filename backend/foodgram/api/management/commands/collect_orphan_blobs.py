@@ -0,0 +1,91 @@
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from api.images import rendition_name
+from reciepts.models import CustomUser, MediaBlob, Reciept
+from reciepts.storage import BLOBS_PREFIX, content_storage
+
+
+class Command(BaseCommand):
+    help = "Удаляет файлы изображений, на которые больше нет ссылок."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--grace-minutes",
+            type=int,
+            default=60,
+            help="Не трогать файлы, изменявшиеся позже этого срока.",
+        )
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(minutes=options["grace_minutes"])
+        orphans = MediaBlob.objects.filter(
+            ref_count__lte=0, updated_at__lt=cutoff
+        )
+        deleted = 0
+        while batch := list(
+            orphans.values_list("pk", "name")[: options["batch_size"]]
+        ):
+            for pk, name in batch:
+                deleted += self._collect(pk, name, cutoff)
+
+        deleted += self._delete_untracked(cutoff)
+        self.stdout.write(f"Удалено файлов: {deleted}")
+
+    def _collect(self, pk, name, cutoff):
+        # Пока шла выборка, на файл могли снова сослаться: строку удаляем
+        # только если счётчик всё ещё нулевой, а файл не трогали после
+        # отсечки (повторная загрузка того же содержимого обновляет mtime).
+        with transaction.atomic():
+            removed, _ = MediaBlob.objects.filter(
+                pk=pk, ref_count__lte=0, updated_at__lt=cutoff
+            ).delete()
+            if not removed or not content_storage.exists(name):
+                return 0
+            if content_storage.get_modified_time(name) >= cutoff:
+                return 0
+            self._delete_blob(name)
+        return 1
+
+    def _delete_blob(self, name):
+        content_storage.delete(name)
+        for size in settings.IMAGE_RENDITIONS:
+            default_storage.delete(rendition_name(name, size))
+
+    def _delete_untracked(self, cutoff):
+        root = content_storage.path(BLOBS_PREFIX)
+        deleted = 0
+        for directory, subdirs, files in os.walk(root):
+            subdirs[:] = [name for name in subdirs if name != "renditions"]
+            relative = os.path.relpath(directory, content_storage.location)
+            names = {
+                os.path.join(relative, file).replace(os.sep, "/"): file
+                for file in files
+                if not file.startswith(".")
+            }
+            tracked = set(
+                MediaBlob.objects.filter(name__in=names).values_list(
+                    "name", flat=True
+                )
+            )
+            tracked.update(
+                Reciept.objects.filter(image__in=names).values_list(
+                    "image", flat=True
+                ),
+                CustomUser.objects.filter(avatar__in=names).values_list(
+                    "avatar", flat=True
+                ),
+            )
+            for name in names.keys() - tracked:
+                modified = content_storage.get_modified_time(name)
+                if modified < cutoff:
+                    self._delete_blob(name)
+                    deleted += 1
+        return deleted
@@ -0,0 +1,131 @@
+import csv
+import json
+import time
+from itertools import islice
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.ingredient_search import ingredient_search_cache
+from api.reference_cache import bump_version
+from reciepts.models import Ingredient
+
+DEFAULT_PATH = settings.BASE_DIR.parent.parent / "data" / "ingredients.csv"
+READ_SIZE = 64 * 1024
+
+
+class DryRunRollback(Exception):
+    pass
+
+
+def read_csv(file):
+    reader = csv.reader(file)
+    for row in reader:
+        if not row:
+            continue
+        if len(row) < 2:
+            raise CommandError(
+                f"Строка {reader.line_num}: ожидались название "
+                "и единица измерения."
+            )
+        yield row[0], row[1]
+
+
+def parse_item(item):
+    if not isinstance(item, dict) or not all(
+        isinstance(item.get(key), str) for key in ("name", "measurement_unit")
+    ):
+        raise CommandError(f"Некорректный элемент JSON: {item!r}.")
+    return item["name"], item["measurement_unit"]
+
+
+def read_json(file):
+    decoder = json.JSONDecoder()
+    buffer = ""
+    position = 0
+    started = False
+    while True:
+        chunk = file.read(READ_SIZE)
+        buffer = buffer[position:] + chunk
+        position = 0
+        while True:
+            while position < len(buffer) and buffer[position] in " \t\r\n,":
+                position += 1
+            if not started and position < len(buffer):
+                if buffer[position] != "[":
+                    raise CommandError("Ожидался JSON-массив.")
+                started = True
+                position += 1
+                continue
+            if position < len(buffer) and buffer[position] == "]":
+                return
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if not chunk:
+                    raise CommandError("Некорректный JSON.")
+                break
+            yield parse_item(item)
+        if not chunk:
+            return
+
+
+READERS = {".csv": read_csv, ".json": read_json}
+
+
+class Command(BaseCommand):
+    help = "Загружает ингредиенты из CSV или JSON файла."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", nargs="?", default=DEFAULT_PATH)
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Выполнить загрузку и откатить транзакцию.",
+        )
+
+    def handle(self, *args, **options):
+        path = Path(options["path"])
+        reader = READERS.get(path.suffix.lower())
+        if reader is None:
+            raise CommandError("Поддерживаются только файлы .csv и .json.")
+
+        started = time.perf_counter()
+        try:
+            with transaction.atomic():
+                total, created = self._load(
+                    reader, path, options["batch_size"]
+                )
+                if options["dry_run"]:
+                    raise DryRunRollback
+        except DryRunRollback:
+            pass
+        else:
+            ingredient_search_cache.invalidate()
+            bump_version("ingredients")
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            f"Прочитано строк: {total}, новых ингредиентов: {created}, "
+            f"{total / max(elapsed, 1e-9):.0f} строк/с"
+            + (" (dry-run, изменения отменены)" if options["dry_run"] else "")
+        )
+
+    def _load(self, reader, path, batch_size):
+        before = Ingredient.objects.count()
+        total = 0
+        with open(path, encoding="utf-8", newline="") as file:
+            rows = reader(file)
+            while batch := list(islice(rows, batch_size)):
+                Ingredient.objects.bulk_create(
+                    (
+                        Ingredient(name=name, measurement_unit=unit)
+                        for name, unit in batch
+                    ),
+                    ignore_conflicts=True,
+                )
+                total += len(batch)
+        return total, Ingredient.objects.count() - before
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from api.blacklist import token_blacklist
+
+
+class Command(BaseCommand):
+    help = "Удаляет из черного списка токены с истекшим сроком действия."
+
+    def handle(self, *args, **options):
+        deleted = token_blacklist.prune()
+        self.stdout.write(f"Удалено токенов: {deleted}")
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.search import rebuild_index
+from reciepts.models import Reciept
+
+
+class Command(BaseCommand):
+    help = "Перестраивает полнотекстовый индекс рецептов."
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            rebuild_index()
+        self.stdout.write(
+            f"Проиндексировано рецептов: {Reciept.objects.count()}"
+        )
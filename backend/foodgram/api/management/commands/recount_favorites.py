@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from reciepts.models import CustomUser, Reciept
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает количество добавлений рецептов в избранное."
+
+    def handle(self, *args, **options):
+        counts = (
+            CustomUser.favorites.through.objects.filter(
+                reciept=OuterRef("pk")
+            )
+            .values("reciept")
+            .annotate(total=Count("pk"))
+            .values("total")
+        )
+        updated = Reciept.objects.update(
+            favorited_count=Coalesce(
+                Subquery(counts, output_field=IntegerField()), 0
+            )
+        )
+        self.stdout.write(f"Обновлено рецептов: {updated}")
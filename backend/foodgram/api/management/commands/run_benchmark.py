@@ -0,0 +1,730 @@
+import base64
+import itertools
+import json
+import re
+import statistics
+import subprocess
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from urllib.parse import quote, urlencode
+
+import requests
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection
+from django.test import AsyncClient, Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.management.commands.seed_benchmark_data import (
+    CART_USER,
+    FOLLOWER,
+    PASSWORD,
+    PREFIX,
+)
+from api.shopping_cart import SHOPPING_CART_FORMATS
+from api.short_links import encode
+from reciepts.models import CustomUser, Ingredient, Reciept, Tag
+
+COLLECTION_PATH = (
+    settings.BASE_DIR.parent.parent
+    / "postman_collection"
+    / "foodgram.postman_collection.json"
+)
+SERVER_TIMING_QUERIES = re.compile(r'db;[^,]*desc="(\d+)"')
+PERCENTILES = (50, 95, 99)
+PAGE_SIZE = 6
+DEEP_PAGE = 10_000
+HOT_LINKS = 10
+LOGIN_WORKERS = 4
+WRITE_WORKERS = 8
+SQLITE_REPORTED_PRAGMAS = (
+    "journal_mode",
+    "synchronous",
+    "busy_timeout",
+    "mmap_size",
+)
+
+
+def load_flows(path):
+    with open(path, encoding="utf-8") as file:
+        collection = json.load(file)
+    flows = {}
+    stack = list(reversed(collection["item"]))
+    while stack:
+        item = stack.pop()
+        if "item" in item:
+            stack.extend(reversed(item["item"]))
+            continue
+        request = item["request"]
+        url = request["url"]
+        url = url["raw"] if isinstance(url, dict) else url
+        name = item["name"].strip()
+        if request["method"] != "GET" or "non_existing" in name:
+            continue
+        authorized = not name.endswith("No Auth")
+        path = url.replace("{{baseUrl}}", "")
+        flows.setdefault((path, authorized), name)
+    return [
+        {"name": name, "requests": [spec(path, authorized=authorized)]}
+        for (path, authorized), name in flows.items()
+    ]
+
+
+def spec(
+    path,
+    method="GET",
+    data=None,
+    user=None,
+    authorized=True,
+    headers=None,
+    remote_addr=None,
+):
+    return {
+        "method": method,
+        "path": path,
+        "data": data,
+        "user": user,
+        "authorized": authorized,
+        "headers": headers or {},
+        "remote_addr": remote_addr,
+    }
+
+
+def cart_flows(options):
+    prefix = CART_USER.format("")
+    users = {
+        int(user.username[len(prefix):]): user
+        for user in CustomUser.objects.filter(username__startswith=prefix)
+    }
+    flows = []
+    for size, user in sorted(users.items()):
+        flows += [
+            {
+                "name": f"download_shopping_cart // {size} recipes "
+                f"{file_type}",
+                "requests": [
+                    spec(
+                        "/api/recipes/download_shopping_cart/"
+                        f"?type={file_type}",
+                        user=user,
+                    )
+                ],
+                "memory": True,
+            }
+            for file_type in SHOPPING_CART_FORMATS
+        ]
+    return flows
+
+
+def ingredient_flows(options):
+    # Каждый запрос ищет своё имя, чтобы не попадать в кэш ответов.
+    names = Ingredient.objects.order_by("?").values_list("name", flat=True)[
+        : options["warmup"] + options["requests"] + 1
+    ]
+    requests = [
+        spec(f"/api/ingredients/?name={quote(name.upper())}", authorized=False)
+        for name in names
+    ]
+    return [
+        {"name": "search_ingredients // database", "requests": requests},
+        {
+            "name": "search_ingredients // in-memory index",
+            "requests": requests,
+            "settings": {"INGREDIENT_SEARCH_CACHE": True},
+        },
+    ]
+
+
+def subscription_flows(options):
+    follower = CustomUser.objects.filter(username=FOLLOWER).first()
+    if follower is None:
+        return []
+    authors = follower.follows.count()
+    last_page = max(1, -(-authors // 6))
+    return [
+        {
+            "name": f"get_subscription_list // {authors} authors {label}",
+            "requests": [
+                spec(
+                    f"/api/users/subscriptions/?page={page}&limit=6"
+                    "&recipes_limit=3",
+                    user=follower,
+                )
+            ],
+        }
+        for label, page in (("first page", 1), ("last page", last_page))
+    ]
+
+
+def cursor_after(queryset, ordering, offset):
+    row = queryset.order_by(*ordering).values(
+        *(field.lstrip("-") for field in ordering)
+    )[offset]
+    position = json.dumps(list(row.values()), cls=DjangoJSONEncoder)
+    return base64.b64encode(urlencode({"p": position}).encode()).decode()
+
+
+def pagination_flows(options):
+    lists = (
+        ("get_recipes_list", "/api/recipes/?", Reciept.objects, ("-id",)),
+        (
+            "get_recipes_list_popular",
+            "/api/recipes/?ordering=popular&",
+            Reciept.objects,
+            ("-favorited_count", "-id"),
+        ),
+        ("get_users_list", "/api/users/?", CustomUser.objects, ("id",)),
+    )
+    flows = []
+    for name, path, queryset, ordering in lists:
+        pages = max(1, -(-queryset.count() // PAGE_SIZE))
+        deep = min(DEEP_PAGE, pages)
+        cursor = (
+            cursor_after(queryset, ordering, (deep - 1) * PAGE_SIZE - 1)
+            if deep > 1
+            else ""
+        )
+        for label, query in (
+            ("offset first page", "page=1"),
+            ("offset deep page", f"page={deep}"),
+            ("cursor first page", "cursor="),
+            ("cursor deep page", f"cursor={quote(cursor)}"),
+        ):
+            flows.append(
+                {
+                    "name": f"{name} // {label}",
+                    "requests": [
+                        spec(f"{path}{query}&limit={PAGE_SIZE}")
+                    ],
+                }
+            )
+    return flows
+
+
+def short_link_flows(options):
+    ids = list(
+        Reciept.objects.order_by("?").values_list("id", flat=True)[
+            : options["warmup"] + options["requests"] + 1
+        ]
+    )
+    redirects = [spec(f"/s/{encode(pk)}/", authorized=False) for pk in ids]
+    return [
+        {
+            "name": "get_link",
+            "requests": [spec(f"/api/recipes/{pk}/get-link/") for pk in ids],
+        },
+        {
+            # Популярные ссылки: после прогрева все коды уже в кэше.
+            "name": "short_link_redirect // cached",
+            "requests": redirects[:HOT_LINKS],
+            "memory": True,
+        },
+        {
+            "name": "short_link_redirect // uncached",
+            "requests": redirects,
+            "settings": {"SHORT_LINK_CACHE_SIZE": 0},
+        },
+    ]
+
+
+def login_flows(options):
+    # Каждый вход идёт со своего адреса и email, чтобы троттлинг не
+    # подменял стоимость хеширования быстрыми 429. Адрес клиента задаётся
+    # только в процессе; с --base-url поднимите LOGIN_IP_RATE на сервере.
+    emails = CustomUser.objects.filter(
+        username__startswith=PREFIX
+    ).values_list("email", flat=True)
+    logins = [
+        spec(
+            "/api/auth/token/login/",
+            "POST",
+            {"email": email, "password": PASSWORD},
+            authorized=False,
+            remote_addr=f"10.{number >> 16 & 255}."
+            f"{number >> 8 & 255}.{number & 255}",
+        )
+        for number, email in enumerate(emails, start=1)
+    ]
+    reads = [spec("/api/recipes/?limit=6")]
+    return [
+        {"name": "login", "requests": logins},
+        {"name": "get_recipes_list // idle", "requests": reads},
+        {
+            "name": "get_recipes_list // login storm",
+            "requests": reads,
+            "background": logins,
+        },
+        {
+            "name": "get_recipes_list // login storm, inline hashing",
+            "requests": reads,
+            "background": logins,
+            "settings": {"PASSWORD_HASH_WORKERS": 0},
+        },
+    ]
+
+
+def interface_flows(options):
+    # Один и тот же запрос через ASGIHandler (асинхронные представления)
+    # и через WSGIHandler. Для uvicorn и gunicorn запустите коллекцию
+    # с --base-url против каждого сервера.
+    reads = (
+        ("get_recipes_list", spec("/api/recipes/?limit=6")),
+        ("get_recipe_detail", spec("/api/recipes/{{firstRecipeId}}/")),
+        ("get_tag_list", spec("/api/tags/", authorized=False)),
+        (
+            "get_ingredients_list",
+            spec(
+                "/api/ingredients/?name={{ingredientNameFirstLatter}}",
+                authorized=False,
+            ),
+        ),
+    )
+    return [
+        {
+            "name": f"{name} // {interface}",
+            "requests": [request],
+            "interface": interface,
+        }
+        for name, request in reads
+        for interface in ("wsgi", "asgi")
+    ]
+
+
+def favorite_flows(options):
+    # Пары пользователь-рецепт, которых ещё нет в избранном: первый сценарий
+    # добавляет их параллельно, второй удаляет, возвращая базу к исходной.
+    users = list(
+        CustomUser.objects.filter(username__startswith=PREFIX).order_by("id")
+    )
+    reciepts = list(
+        Reciept.objects.order_by("id").values_list("id", flat=True)
+    )
+    existing = set(
+        CustomUser.favorites.through.objects.filter(
+            customuser__in=users
+        ).values_list("customuser_id", "reciept_id")
+    )
+    pairs = []
+    for number in range(len(users) * len(reciepts)):
+        user = users[number % len(users)]
+        reciept = reciepts[number // len(users) % len(reciepts)]
+        if (user.pk, reciept) not in existing:
+            pairs.append((user, reciept))
+        if len(pairs) > options["warmup"] + options["requests"]:
+            break
+    return [
+        {
+            "name": f"{name} // {WRITE_WORKERS} writers",
+            "requests": [
+                spec(f"/api/recipes/{reciept}/favorite/", method, user=user)
+                for user, reciept in pairs
+            ],
+            "concurrency": WRITE_WORKERS,
+        }
+        for name, method in (
+            ("add_to_favorites", "POST"),
+            ("remove_from_favorites", "DELETE"),
+        )
+    ]
+
+
+SCENARIOS = {
+    "cart": cart_flows,
+    "ingredients": ingredient_flows,
+    "subscriptions": subscription_flows,
+    "pagination": pagination_flows,
+    "short_links": short_link_flows,
+    "login": login_flows,
+    "asgi": interface_flows,
+    "writes": favorite_flows,
+}
+
+
+def percentile(samples, rank):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * rank / 100))]
+
+
+async def ageneric(client, *args, **kwargs):
+    return await client.generic(*args, **kwargs)
+
+
+class InProcessTarget:
+    measures_memory = True
+
+    def __init__(self, asgi=False):
+        self.asgi = asgi
+        self._local = threading.local()
+
+    def request(self, method, path, headers, data=None, remote_addr=None):
+        client = getattr(self._local, "client", None)
+        if client is None:
+            # Ошибки приложения считаются ответами 500, а не прерывают прогон.
+            client_class = AsyncClient if self.asgi else Client
+            client = self._local.client = client_class(
+                raise_request_exception=False
+            )
+        send = async_to_sync(ageneric) if self.asgi else client.generic
+        # Журнал запросов ограничен по длине: после заполнения
+        # CaptureQueriesContext перестаёт видеть новые запросы.
+        connection.queries_log.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = send(
+                *((client,) if self.asgi else ()),
+                method,
+                path,
+                json.dumps(data) if data is not None else "",
+                content_type="application/json",
+                headers=headers,
+                **({"REMOTE_ADDR": remote_addr} if remote_addr else {}),
+            )
+            if response.streaming and not self.asgi:
+                b"".join(response.streaming_content)
+        return response.status_code, len(queries)
+
+
+class HttpTarget:
+    measures_memory = False
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip("/")
+        self._local = threading.local()
+
+    def request(self, method, path, headers, data=None, remote_addr=None):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        response = session.request(
+            method, self.base_url + path, headers=headers, json=data
+        )
+        match = SERVER_TIMING_QUERIES.search(
+            response.headers.get("Server-Timing", "")
+        )
+        return response.status_code, int(match[1]) if match else None
+
+
+class Command(BaseCommand):
+    help = (
+        "Прогоняет GET-сценарии из Postman-коллекции и дополнительные "
+        "сценарии нагрузки, измеряет задержки, пропускную способность, "
+        "число SQL-запросов и пиковую память."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--collection", default=COLLECTION_PATH)
+        parser.add_argument(
+            "--base-url",
+            help="Адрес запущенного сервера, например uvicorn "
+            "foodgram.asgi:application или gunicorn foodgram.wsgi; "
+            "по умолчанию запросы выполняются в процессе через "
+            "django.test.Client (и AsyncClient для группы asgi).",
+        )
+        parser.add_argument(
+            "--search",
+            action="append",
+            default=[],
+            help="Добавить сценарий поиска рецептов по строке; "
+            "можно указать несколько раз.",
+        )
+        parser.add_argument(
+            "--scenario",
+            action="append",
+            choices=("collection", *SCENARIOS),
+            help="Запустить только указанные группы сценариев; "
+            "по умолчанию запускаются все.",
+        )
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--warmup", type=int, default=10)
+        parser.add_argument("--concurrency", type=int, default=1)
+        parser.add_argument("--output", help="Файл для JSON-результатов.")
+        parser.add_argument(
+            "--budget",
+            help="JSON-файл с бюджетами, например benchmark_budget.json: "
+            '{"<сценарий или *>": {"p95_ms": 50, "queries": 5}}; '
+            "queries - типичное число SQL-запросов, queries_max - "
+            "наибольшее.",
+        )
+
+    def handle(self, *args, **options):
+        variables, user = self._variables()
+        self.tokens = {}
+        self.default_user = user
+        if options["base_url"]:
+            target = HttpTarget(options["base_url"])
+            environment = nullcontext()
+        else:
+            target = InProcessTarget()
+            self.asgi_target = InProcessTarget(asgi=True)
+            environment = override_settings(
+                ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]
+            )
+
+        groups = options["scenario"] or ["collection", *SCENARIOS]
+        flows = []
+        if "collection" in groups:
+            flows += load_flows(options["collection"]) + [
+                {
+                    "name": f"search_recipes // {query}",
+                    "requests": [
+                        spec(f"/api/recipes/?search={quote(query)}&limit=6")
+                    ],
+                }
+                for query in options["search"]
+            ]
+        for group in SCENARIOS:
+            if group in groups:
+                flows += SCENARIOS[group](options)
+
+        database = None if options["base_url"] else self._database()
+        if database:
+            self.stdout.write(f"База данных: {database}")
+        results = {}
+        with environment:
+            for flow in flows:
+                if options["base_url"] and (
+                    flow.get("settings") or flow.get("interface")
+                ):
+                    continue
+                for request in flow["requests"]:
+                    request["path"] = re.sub(
+                        r"{{(\w+)}}",
+                        lambda m: variables[m[1]],
+                        request["path"],
+                    )
+                with override_settings(**flow.get("settings", {})):
+                    results[flow["name"]] = self._measure(
+                        (
+                            self.asgi_target
+                            if flow.get("interface") == "asgi"
+                            else target
+                        ),
+                        flow,
+                        options,
+                    )
+                self._print(flow["name"], results[flow["name"]])
+
+        report = {
+            "commit": self._commit(),
+            "created_at": timezone.now().isoformat(),
+            "target": options["base_url"] or "in-process",
+            "concurrency": options["concurrency"],
+            "database": database,
+            "dataset": {
+                "users": CustomUser.objects.count(),
+                "recipes": Reciept.objects.count(),
+                "ingredients": Ingredient.objects.count(),
+            },
+            "endpoints": results,
+        }
+        if options["output"]:
+            Path(options["output"]).write_text(
+                json.dumps(report, ensure_ascii=False, indent=2),
+                encoding="utf-8",
+            )
+        if options["budget"]:
+            self._check_budget(results, options["budget"])
+
+    def _variables(self):
+        users = list(
+            CustomUser.objects.filter(username__startswith=PREFIX).order_by(
+                "id"
+            )[:3]
+        )
+        tags = list(Tag.objects.order_by("id")[:3])
+        reciept = Reciept.objects.order_by("id").first()
+        ingredient = Ingredient.objects.order_by("id").first()
+        if len(users) < 3 or len(tags) < 3 or not reciept or not ingredient:
+            raise CommandError(
+                "Недостаточно данных: сначала выполните seed_benchmark_data."
+            )
+        return {
+            "userId": str(users[0].id),
+            "secondUserId": str(users[1].id),
+            "thirdUserId": str(users[2].id),
+            "firstTagId": str(tags[0].id),
+            "secondTagSlug": tags[1].slug,
+            "thirdTagSlug": tags[2].slug,
+            "firstRecipeId": str(reciept.id),
+            "firstIndredientId": str(ingredient.id),
+            "ingredientNameFirstLatter": ingredient.name[0],
+        }, users[0]
+
+    def _headers(self, request):
+        if not request["authorized"]:
+            return {}
+        user = request["user"] or self.default_user
+        if user.pk not in self.tokens:
+            self.tokens[user.pk] = {
+                "Authorization": f"Token {AccessToken.for_user(user)}"
+            }
+        return self.tokens[user.pk]
+
+    def _send(self, target, flow, number):
+        request = flow["requests"][number % len(flow["requests"])]
+        return target.request(
+            request["method"],
+            request["path"],
+            {**self._headers(request), **request["headers"]},
+            request["data"],
+            request["remote_addr"],
+        )
+
+    def _measure(self, target, flow, options):
+        for number in range(options["warmup"]):
+            self._send(target, flow, number)
+
+        def timed(number):
+            started = time.perf_counter()
+            status, queries = self._send(
+                target, flow, options["warmup"] + number
+            )
+            return time.perf_counter() - started, status, queries
+
+        with self._background(target, flow) as background:
+            started = time.perf_counter()
+            concurrency = flow.get("concurrency", options["concurrency"])
+            if concurrency > 1:
+                with ThreadPoolExecutor(concurrency) as executor:
+                    samples = list(
+                        executor.map(timed, range(options["requests"]))
+                    )
+            else:
+                samples = [
+                    timed(number) for number in range(options["requests"])
+                ]
+            elapsed = time.perf_counter() - started
+
+        latencies = [sample[0] * 1000 for sample in samples]
+        queries = [sample[2] for sample in samples if sample[2] is not None]
+        result = {
+            "path": flow["requests"][0]["path"],
+            "requests": len(samples),
+            "statuses": dict(Counter(str(sample[1]) for sample in samples)),
+            "errors": sum(sample[1] >= 500 for sample in samples),
+            "throughput_rps": round(len(samples) / elapsed, 1),
+            "mean_ms": round(statistics.fmean(latencies), 3),
+            # Типичное число запросов; редкие промахи кэша видны в max.
+            "queries": statistics.median_low(queries) if queries else None,
+            "queries_max": max(queries) if queries else None,
+        }
+        for rank in PERCENTILES:
+            result[f"p{rank}_ms"] = round(percentile(latencies, rank), 3)
+        if flow.get("memory") and target.measures_memory:
+            result["peak_memory_kib"] = self._peak_memory(target, flow)
+        if flow.get("background"):
+            result["background"] = {
+                "requests": sum(background.values()),
+                "throughput_rps": round(
+                    sum(background.values()) / elapsed, 1
+                ),
+                "statuses": dict(background),
+            }
+        return result
+
+    @contextmanager
+    def _background(self, target, flow):
+        statuses = Counter()
+        if not flow.get("background"):
+            yield statuses
+            return
+        stop = threading.Event()
+        numbers = itertools.count()
+        lock = threading.Lock()
+        background = {"requests": flow["background"]}
+
+        def load():
+            while not stop.is_set():
+                status, _ = self._send(target, background, next(numbers))
+                with lock:
+                    statuses[str(status)] += 1
+
+        with ThreadPoolExecutor(LOGIN_WORKERS) as executor:
+            workers = [executor.submit(load) for _ in range(LOGIN_WORKERS)]
+            try:
+                yield statuses
+            finally:
+                stop.set()
+                for worker in workers:
+                    worker.result()
+
+    def _peak_memory(self, target, flow):
+        tracemalloc.start()
+        try:
+            self._send(target, flow, 0)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return round(peak / 1024, 1)
+
+    def _print(self, name, result):
+        self.stdout.write(
+            f"{name:<50} p50 {result['p50_ms']:>8.2f} мс  "
+            f"p95 {result['p95_ms']:>8.2f} мс  "
+            f"p99 {result['p99_ms']:>8.2f} мс  "
+            f"{result['throughput_rps']:>8.1f} rps  "
+            f"SQL {result['queries']}  коды {result['statuses']}"
+            + (
+                f"  фон {result['background']['throughput_rps']} rps "
+                f"{result['background']['statuses']}"
+                if "background" in result
+                else ""
+            )
+            + (
+                f"  память {result['peak_memory_kib']} КиБ"
+                if "peak_memory_kib" in result
+                else ""
+            )
+        )
+
+    def _check_budget(self, results, path):
+        with open(path, encoding="utf-8") as file:
+            budgets = json.load(file)
+        violations = []
+        for name, result in results.items():
+            budget = {**budgets.get("*", {}), **budgets.get(name, {})}
+            for metric, limit in budget.items():
+                value = result.get(metric)
+                if value is not None and value > limit:
+                    violations.append(f"{name}: {metric} {value} > {limit}")
+            if result["errors"]:
+                violations.append(f"{name}: ошибок {result['errors']}")
+        if violations:
+            raise CommandError(
+                "Превышен бюджет производительности:\n"
+                + "\n".join(violations)
+            )
+
+    @staticmethod
+    def _database():
+        # Настройки фактического соединения: journal_mode хранится в файле
+        # базы и переживает запуск с SQLITE_TUNING=False.
+        database = {"vendor": connection.vendor}
+        if connection.vendor == "sqlite":
+            with connection.cursor() as cursor:
+                for pragma in SQLITE_REPORTED_PRAGMAS:
+                    cursor.execute(f"PRAGMA {pragma}")
+                    row = cursor.fetchone()
+                    database[pragma] = row[0] if row else None
+        return database
+
+    @staticmethod
+    def _commit():
+        try:
+            return subprocess.run(
+                ["git", "rev-parse", "HEAD"],
+                capture_output=True,
+                text=True,
+                check=True,
+                cwd=settings.BASE_DIR,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
@@ -0,0 +1,293 @@
+import random
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from reciepts.models import (
+    CustomUser,
+    Ingredient,
+    IngredientReciept,
+    Reciept,
+    RecieptTag,
+    Subscription,
+    Tag,
+)
+
+PREFIX = "bench_"
+AUTHOR = PREFIX + "author_{}"
+CART_USER = PREFIX + "cart_{}"
+FOLLOWER = PREFIX + "follower"
+PASSWORD = "bench-password"
+DISHES = (
+    "омлет",
+    "борщ",
+    "салат",
+    "пирог",
+    "суп",
+    "плов",
+    "рагу",
+    "запеканка",
+    "блины",
+    "каша",
+)
+STYLES = (
+    "домашний",
+    "быстрый",
+    "острый",
+    "постный",
+    "сырный",
+    "летний",
+    "грибной",
+    "овощной",
+)
+WORDS = (
+    "нарезать",
+    "обжарить",
+    "посолить",
+    "перемешать",
+    "варить",
+    "запечь",
+    "подавать",
+    "добавить",
+    "минут",
+    "масло",
+    "лук",
+    "морковь",
+    "чеснок",
+    "соус",
+    "тесто",
+    "сковорода",
+    "духовка",
+    "кастрюля",
+    "огонь",
+    "зелень",
+)
+
+
+class Command(BaseCommand):
+    help = "Заполняет базу синтетическими данными для нагрузочных тестов."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=100)
+        parser.add_argument("--recipes", type=int, default=1000)
+        parser.add_argument("--tags", type=int, default=5)
+        parser.add_argument("--ingredients", type=int, default=500)
+        parser.add_argument("--ingredients-per-recipe", type=int, default=5)
+        parser.add_argument("--favorites-per-user", type=int, default=20)
+        parser.add_argument("--subscriptions-per-user", type=int, default=5)
+        parser.add_argument(
+            "--followed-authors",
+            type=int,
+            default=1000,
+            help="На скольких авторов подписан пользователь bench_follower; "
+            "если --users меньше, недостающие авторы создаются отдельно.",
+        )
+        parser.add_argument(
+            "--cart-sizes",
+            type=int,
+            nargs="*",
+            default=[10, 100, 1000],
+            help="Для каждого размера создать пользователя с таким числом "
+            "рецептов в списке покупок.",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--clear",
+            action="store_true",
+            help="Удалить ранее созданные синтетические данные.",
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        self.random = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+        with transaction.atomic():
+            if options["clear"]:
+                self._clear()
+            counts = self._seed(options)
+        call_command("recount_favorites", stdout=self.stdout)
+        call_command("rebuild_search_index", stdout=self.stdout)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            ", ".join(f"{name}: {count}" for name, count in counts.items())
+            + f" ({elapsed:.1f} с)"
+        )
+
+    def _clear(self):
+        CustomUser.objects.filter(username__startswith=PREFIX).delete()
+        Tag.objects.filter(slug__startswith=PREFIX).delete()
+        Ingredient.objects.filter(name__startswith=PREFIX).delete()
+
+    def _bulk(self, model, objects, **kwargs):
+        return model.objects.bulk_create(
+            objects, batch_size=self.batch_size, **kwargs
+        )
+
+    def _seed(self, options):
+        offset = CustomUser.objects.filter(
+            username__startswith=PREFIX
+        ).count()
+        password = make_password(PASSWORD)
+        users = self._bulk(
+            CustomUser,
+            [
+                CustomUser(
+                    username=f"{PREFIX}{number}",
+                    email=f"{PREFIX}{number}@example.com",
+                    first_name="Bench",
+                    last_name=str(number),
+                    password=password,
+                )
+                for number in range(offset, offset + options["users"])
+            ],
+        )
+        offset = CustomUser.objects.filter(
+            username__startswith=AUTHOR.format("")
+        ).count()
+        authors = users + self._bulk(
+            CustomUser,
+            [
+                CustomUser(
+                    username=AUTHOR.format(number),
+                    email=f"{AUTHOR.format(number)}@example.com",
+                    first_name="Bench",
+                    last_name=f"author {number}",
+                    password=password,
+                )
+                for number in range(
+                    offset,
+                    offset + options["followed_authors"] - len(users),
+                )
+            ],
+        )
+        tags = list(Tag.objects.filter(slug__startswith=PREFIX))
+        tags += self._bulk(
+            Tag,
+            [
+                Tag(name=f"{PREFIX}tag {number}", slug=f"{PREFIX}{number}")
+                for number in range(len(tags), options["tags"])
+            ],
+        )
+        self._bulk(
+            Ingredient,
+            [
+                Ingredient(
+                    name=f"{PREFIX}ingredient {number}",
+                    measurement_unit="г",
+                )
+                for number in range(options["ingredients"])
+            ],
+            ignore_conflicts=True,
+        )
+        ingredient_ids = list(
+            Ingredient.objects.filter(name__startswith=PREFIX).values_list(
+                "id", flat=True
+            )
+        )
+
+        reciepts = self._bulk(
+            Reciept,
+            [
+                Reciept(
+                    name=(
+                        f"{self.random.choice(STYLES).capitalize()} "
+                        f"{self.random.choice(DISHES)} {number}"
+                    ),
+                    image="images/reciept_images/bench.png",
+                    cooking_time=self.random.randint(1, 180),
+                    text=" ".join(self.random.choices(WORDS, k=12)),
+                    author=self.random.choice(authors),
+                )
+                for number in range(options["recipes"])
+            ],
+        )
+        self._bulk(
+            RecieptTag,
+            [
+                RecieptTag(reciept=reciept, tag=tag)
+                for reciept in reciepts
+                for tag in self.random.sample(
+                    tags, min(len(tags), self.random.randint(1, 3))
+                )
+            ],
+        )
+        per_recipe = min(
+            options["ingredients_per_recipe"], len(ingredient_ids)
+        )
+        self._bulk(
+            IngredientReciept,
+            [
+                IngredientReciept(
+                    reciept=reciept,
+                    ingredient_id=ingredient_id,
+                    amount=self.random.randint(1, 500),
+                )
+                for reciept in reciepts
+                for ingredient_id in self.random.sample(
+                    ingredient_ids, per_recipe
+                )
+            ],
+        )
+
+        favorites = CustomUser.favorites.through
+        per_user = min(options["favorites_per_user"], len(reciepts))
+        self._bulk(
+            favorites,
+            [
+                favorites(customuser=user, reciept=reciept)
+                for user in users
+                for reciept in self.random.sample(reciepts, per_user)
+            ],
+            ignore_conflicts=True,
+        )
+        per_user = min(options["subscriptions_per_user"], len(users) - 1)
+        self._bulk(
+            Subscription,
+            [
+                Subscription(
+                    user=user, author=users[other + (other >= position)]
+                )
+                for position, user in enumerate(users)
+                for other in self.random.sample(
+                    range(len(users) - 1), per_user
+                )
+            ],
+            ignore_conflicts=True,
+        )
+        follower, _ = CustomUser.objects.get_or_create(
+            username=FOLLOWER,
+            defaults={
+                "email": f"{FOLLOWER}@example.com",
+                "password": password,
+            },
+        )
+        self._bulk(
+            Subscription,
+            [
+                Subscription(user=follower, author=author)
+                for author in authors[: options["followed_authors"]]
+            ],
+            ignore_conflicts=True,
+        )
+        for size in options["cart_sizes"]:
+            user, _ = CustomUser.objects.get_or_create(
+                username=CART_USER.format(size),
+                defaults={
+                    "email": f"{CART_USER.format(size)}@example.com",
+                    "password": password,
+                },
+            )
+            user.shopping_cart.add(
+                *self.random.sample(reciepts, min(size, len(reciepts)))
+            )
+        return {
+            "пользователей": len(users),
+            "авторов": len(authors),
+            "рецептов": len(reciepts),
+            "тегов": len(tags),
+            "ингредиентов": len(ingredient_ids),
+        }
@@ -0,0 +1,284 @@
+import ipaddress
+import logging
+import math
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+
+logger = logging.getLogger(__name__)
+
+SUB_BUCKETS = 2
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Histogram:
+    def __init__(self, lowest, highest):
+        size = math.ceil(math.log2(highest / lowest) * SUB_BUCKETS) + 1
+        self.bounds = [
+            lowest * 2 ** (index / SUB_BUCKETS) for index in range(size)
+        ]
+        self.lowest = lowest
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0
+
+    def record(self, value):
+        if value <= self.lowest:
+            index = 0
+        else:
+            index = min(
+                math.ceil(
+                    round(math.log2(value / self.lowest) * SUB_BUCKETS, 9)
+                ),
+                len(self.bounds),
+            )
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.bounds + [math.inf], self.counts):
+            total += count
+            yield bound, total
+
+
+METRICS = (
+    (
+        "duration_seconds",
+        "Request wall time.",
+        lambda: Histogram(0.0001, 30),
+    ),
+    ("sql_queries", "SQL queries per request.", lambda: Histogram(1, 1024)),
+    (
+        "sql_duration_seconds",
+        "SQL time per request.",
+        lambda: Histogram(0.0001, 30),
+    ),
+    (
+        "serializer_duration_seconds",
+        "Serializer time per request.",
+        lambda: Histogram(0.0001, 30),
+    ),
+    (
+        "response_size_bytes",
+        "Response body size.",
+        lambda: Histogram(64, 64 * 1024 * 1024),
+    ),
+)
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+        self._statuses = Counter()
+
+    def observe(self, route, method, status_code, values):
+        key = (route, method)
+        with self._lock:
+            histograms = self._routes.get(key)
+            if histograms is None:
+                histograms = self._routes[key] = {
+                    name: factory() for name, _, factory in METRICS
+                }
+            for name, value in values.items():
+                histograms[name].record(value)
+            self._statuses[(route, method, status_code)] += 1
+
+    def clear(self):
+        with self._lock:
+            self._routes.clear()
+            self._statuses.clear()
+
+    def render(self):
+        lines = [
+            "# HELP foodgram_requests_total Requests handled.",
+            "# TYPE foodgram_requests_total counter",
+        ]
+        with self._lock:
+            for (route, method, code), total in sorted(
+                self._statuses.items()
+            ):
+                lines.append(
+                    "foodgram_requests_total{"
+                    f'route="{route}",method="{method}",status="{code}"'
+                    f"}} {total}"
+                )
+            for name, description, _ in METRICS:
+                metric = f"foodgram_request_{name}"
+                lines.append(f"# HELP {metric} {description}")
+                lines.append(f"# TYPE {metric} histogram")
+                for (route, method), histograms in sorted(
+                    self._routes.items()
+                ):
+                    labels = f'route="{route}",method="{method}"'
+                    histogram = histograms[name]
+                    for bound, total in histogram.cumulative():
+                        le = "+Inf" if bound == math.inf else f"{bound:.6g}"
+                        lines.append(
+                            f'{metric}_bucket{{{labels},le="{le}"}} {total}'
+                        )
+                    lines.append(
+                        f"{metric}_sum{{{labels}}} {histogram.sum:.6f}"
+                    )
+                    lines.append(
+                        f"{metric}_count{{{labels}}} {histogram.count}"
+                    )
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.queries = Counter()
+        self.sql_time = 0
+        self.serializer_time = 0
+        self.serializer_depth = 0
+
+
+_current = ContextVar("request_metrics", default=None)
+
+
+def record_sql(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.sql_time += time.perf_counter() - started
+        metrics.queries[sql] += 1
+
+
+@receiver(connection_created)
+def install_sql_recorder(sender, connection, **kwargs):
+    if record_sql not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_sql)
+
+
+class InstrumentedSerializerMixin:
+    def to_representation(self, instance):
+        metrics = _current.get()
+        if metrics is None:
+            return super().to_representation(instance)
+        metrics.serializer_depth += 1
+        started = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            metrics.serializer_depth -= 1
+            if not metrics.serializer_depth:
+                metrics.serializer_time += time.perf_counter() - started
+
+
+class InstrumentationMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, metrics, started)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, metrics, started)
+
+    def _finish(self, request, response, metrics, started):
+        elapsed = time.perf_counter() - started
+        match = request.resolver_match
+        route = match.view_name if match is not None else "unmatched"
+        query_count = sum(metrics.queries.values())
+        values = {
+            "duration_seconds": elapsed,
+            "sql_queries": query_count,
+            "sql_duration_seconds": metrics.sql_time,
+            "serializer_duration_seconds": metrics.serializer_time,
+        }
+        if not response.streaming:
+            values["response_size_bytes"] = len(response.content)
+        registry.observe(
+            route, request.method, response.status_code, values
+        )
+
+        if settings.SERVER_TIMING:
+            response["Server-Timing"] = (
+                f"total;dur={elapsed * 1000:.1f}, "
+                f'db;dur={metrics.sql_time * 1000:.1f};desc="{query_count}", '
+                f"serialize;dur={metrics.serializer_time * 1000:.1f}"
+            )
+        if elapsed * 1000 >= settings.SLOW_REQUEST_MS:
+            duplicates = [
+                f"{count}x {sql}"
+                for sql, count in metrics.queries.most_common(
+                    settings.SLOW_REQUEST_TOP_QUERIES
+                )
+                if count > 1
+            ]
+            logger.warning(
+                "Медленный запрос %s %s: %.0f мс, SQL: %d (%.0f мс)%s",
+                request.method,
+                request.get_full_path(),
+                elapsed * 1000,
+                query_count,
+                metrics.sql_time * 1000,
+                "".join(f"\n  {line}" for line in duplicates),
+            )
+        return response
+
+
+def metrics_access_allowed(request):
+    authorization = request.headers.get("Authorization", "")
+    if settings.METRICS_TOKEN and constant_time_compare(
+        authorization, f"Bearer {settings.METRICS_TOKEN}"
+    ):
+        return True
+    try:
+        address = ipaddress.ip_address(request.META.get("REMOTE_ADDR", ""))
+    except ValueError:
+        return False
+    return any(
+        address in ipaddress.ip_network(network, strict=False)
+        for network in settings.METRICS_ALLOWED_IPS
+    )
+
+
+def metrics_view(request):
+    if not settings.METRICS_TOKEN and not settings.METRICS_ALLOWED_IPS:
+        raise Http404
+    if not metrics_access_allowed(request):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        registry.render(), content_type=PROMETHEUS_CONTENT_TYPE
+    )
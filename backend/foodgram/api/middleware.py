@@ -1,18 +1,40 @@
+from asgiref.sync import (
+    iscoroutinefunction,
+    markcoroutinefunction,
+    sync_to_async,
+)
 from django.http import HttpResponse
 
-from api.models import BlacklistedTokens
+from api.blacklist import get_unverified_jti, token_blacklist
 
 
 class JWTBlacklistMiddleware:
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
 
     def __call__(self, request):
-        auth_header = request.headers.get("Authorization")
+        if self.async_mode:
+            return self.__acall__(request)
+        jti = self._get_jti(request)
+        if jti and token_blacklist.is_blacklisted(jti):
+            return HttpResponse(status=401)
+        return self.get_response(request)
 
-        if auth_header and auth_header.startswith("Token "):
-            token = auth_header.split(" ")[1]
-            if BlacklistedTokens.objects.filter(token=token).exists():
-                return HttpResponse(status=401)
+    async def __acall__(self, request):
+        jti = self._get_jti(request)
+        if jti and await sync_to_async(token_blacklist.is_blacklisted)(jti):
+            return HttpResponse(status=401)
+        return await self.get_response(request)
 
-        return self.get_response(request)
+    @staticmethod
+    def _get_jti(request):
+        auth_header = request.headers.get("Authorization")
+        if auth_header and auth_header.startswith("Token "):
+            return get_unverified_jti(auth_header.split(" ")[1])
+        return None
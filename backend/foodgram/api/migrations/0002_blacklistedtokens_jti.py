@@ -0,0 +1,52 @@
+import jwt
+from django.db import migrations, models
+from django.utils import timezone
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+
+def fill_jti(apps, schema_editor):
+    BlacklistedTokens = apps.get_model("api", "BlacklistedTokens")
+    for row in BlacklistedTokens.objects.all():
+        try:
+            claims = jwt.decode(
+                row.token, options={"verify_signature": False}
+            )
+        except jwt.InvalidTokenError:
+            claims = {}
+        if "jti" not in claims or "exp" not in claims:
+            row.delete()
+            continue
+        row.jti = claims["jti"]
+        row.expires_at = datetime_from_epoch(claims["exp"])
+        row.save(update_fields=["jti", "expires_at"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blacklistedtokens',
+            name='jti',
+            field=models.CharField(max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='blacklistedtokens',
+            name='expires_at',
+            field=models.DateTimeField(db_index=True, default=timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_jti, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='blacklistedtokens',
+            name='token',
+        ),
+        migrations.AlterField(
+            model_name='blacklistedtokens',
+            name='jti',
+            field=models.CharField(max_length=255, unique=True),
+        ),
+    ]
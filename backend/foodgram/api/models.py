@@ -2,5 +2,6 @@ from django.db import models
 
 
 class BlacklistedTokens(models.Model):
-    token = models.TextField(unique=True)
+    jti = models.CharField(max_length=255, unique=True)
+    expires_at = models.DateTimeField(db_index=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -1,6 +1,140 @@
-from rest_framework.pagination import PageNumberPagination
+import json
+
+from django.core.paginator import InvalidPage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (
+    CursorPagination,
+    PageNumberPagination,
+    _reverse_ordering,
+)
+
+
+class LimitCursorPagination(CursorPagination):
+    page_size_query_param = "limit"
+    ordering = ("-id",)
+
+    def get_ordering(self, request, queryset, view):
+        return getattr(view, "cursor_ordering", self.ordering)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            offset, reverse, current_position = 0, False, None
+        else:
+            offset, reverse, current_position = self.cursor
+
+        ordering = (
+            _reverse_ordering(self.ordering) if reverse else self.ordering
+        )
+        queryset = queryset.order_by(*ordering)
+        if current_position is not None:
+            queryset = queryset.filter(
+                self._after(ordering, current_position)
+            )
+
+        results = list(queryset[offset:offset + self.page_size + 1])
+        self.page = results[:self.page_size]
+        following_position = None
+        if len(results) > len(self.page):
+            following_position = self._get_position_from_instance(
+                results[-1], self.ordering
+            )
+
+        has_following = following_position is not None
+        has_current = current_position is not None or offset > 0
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = has_current, has_following
+            self.next_position = current_position
+            self.previous_position = following_position
+        else:
+            self.has_next, self.has_previous = has_following, has_current
+            self.next_position = following_position
+            self.previous_position = current_position
+        self.display_page_controls = self.has_previous or self.has_next
+        return self.page
+
+    def _after(self, ordering, position):
+        try:
+            values = json.loads(position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        # (a, b) < (x, y) раскрывается в a <= x AND (a < x OR a = x AND
+        # b < y): первое условие позволяет использовать составной индекс.
+        after = None
+        for field, value in reversed(list(zip(ordering, values))):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            strictly = Q(**{f"{name}__{lookup}": value})
+            after = strictly if after is None else (
+                strictly | Q(**{name: value}) & after
+            )
+        if len(ordering) > 1:
+            name = ordering[0].lstrip("-")
+            lookup = "lte" if ordering[0].startswith("-") else "gte"
+            after = Q(**{f"{name}__{lookup}": values[0]}) & after
+        return after
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for field in ordering:
+            name = field.lstrip("-")
+            if isinstance(instance, dict):
+                values.append(instance[name])
+            else:
+                values.append(getattr(instance, name))
+        return json.dumps(values, cls=DjangoJSONEncoder)
 
 
 class PageLimitPagination(PageNumberPagination):
     page_query_param = "page"
     page_size_query_param = "limit"
+    cursor_query_param = "cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        if self.cursor_query_param in request.query_params:
+            self.cursor_paginator = LimitCursorPagination()
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+    async def apaginate_queryset(self, queryset, request):
+        self.cursor_paginator = None
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        paginator = self.django_paginator_class(
+            range(await queryset.acount()), page_size
+        )
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(
+                self.invalid_page_message.format(
+                    page_number=page_number, message=str(exc)
+                )
+            )
+        start = (self.page.number - 1) * page_size
+        return [item async for item in queryset[start:start + page_size]]
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,81 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    check_password,
+    get_hasher,
+    identify_hasher,
+    make_password,
+)
+
+from api.exceptions import ServerBusy
+
+
+def verify_password(password, encoded):
+    if not check_password(password, encoded):
+        return False, False
+    preferred = get_hasher("default")
+    hasher = identify_hasher(encoded)
+    return True, (
+        hasher.algorithm != preferred.algorithm
+        or preferred.must_update(encoded)
+    )
+
+
+def _init_worker():
+    django.setup()
+    if hasattr(os, "nice"):
+        os.nice(settings.PASSWORD_HASH_NICE)
+
+
+class PasswordHasherPool:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._slots = None
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=settings.PASSWORD_HASH_WORKERS,
+                    initializer=_init_worker,
+                )
+                self._slots = threading.BoundedSemaphore(
+                    settings.PASSWORD_HASH_QUEUE
+                )
+        return self._executor
+
+    def _run(self, func, *args):
+        if not settings.PASSWORD_HASH_WORKERS:
+            return func(*args)
+        executor = self._get_executor()
+        if not self._slots.acquire(blocking=False):
+            raise ServerBusy()
+        try:
+            return executor.submit(func, *args).result()
+        finally:
+            self._slots.release()
+
+    def verify(self, password, encoded):
+        return self._run(verify_password, password, encoded)
+
+    def hash(self, password):
+        return self._run(make_password, password)
+
+
+password_pool = PasswordHasherPool()
+
+
+def check_user_password(user, password):
+    valid, must_update = password_pool.verify(password, user.password)
+    if valid and must_update:
+        encoded = password_pool.hash(password)
+        type(user).objects.filter(pk=user.pk, password=user.password).update(
+            password=encoded
+        )
+        user.password = encoded
+    return valid
@@ -0,0 +1,155 @@
+from rest_framework.renderers import BrowsableAPIRenderer
+
+from api.images import rendition_urls
+from api.metrics import InstrumentedSerializerMixin
+from api.renderers import FastJSONRenderer
+
+READ_ACTIONS = ("list", "retrieve")
+
+
+def file_url(value, request):
+    if not value:
+        return None
+    return absolute_url(value.url, request)
+
+
+def absolute_url(url, request):
+    if url is None or request is None:
+        return url
+    return request.build_absolute_uri(url)
+
+
+def thumbnail_urls(value, request):
+    urls = rendition_urls(value)
+    if urls is None or request is None:
+        return urls
+    return {
+        size: request.build_absolute_uri(url) for size, url in urls.items()
+    }
+
+
+def represent_user(user, is_subscribed, request):
+    return {
+        "id": user.id,
+        "username": user.username,
+        "email": user.email,
+        "first_name": user.first_name,
+        "last_name": user.last_name,
+        "is_subscribed": bool(is_subscribed),
+        "avatar": file_url(user.avatar, request),
+    }
+
+
+def reciept_card(reciept):
+    return {
+        "id": reciept.id,
+        "tags": [
+            {"id": tag.id, "name": tag.name, "slug": tag.slug}
+            for tag in reciept.tags.all()
+        ],
+        "author": represent_user(reciept.author, False, None),
+        "ingredients": [
+            {
+                "id": row.ingredient.id,
+                "name": row.ingredient.name,
+                "measurement_unit": row.ingredient.measurement_unit,
+                "amount": row.amount,
+            }
+            for row in reciept.i2r.all()
+        ],
+        "name": reciept.name,
+        "image": file_url(reciept.image, None),
+        "thumbnails": thumbnail_urls(reciept.image, None),
+        "text": reciept.text,
+        "cooking_time": reciept.cooking_time,
+    }
+
+
+def merge_card(
+    card, is_favorited, is_in_shopping_cart, author_subscribed, request
+):
+    author = {
+        **card["author"],
+        "is_subscribed": bool(author_subscribed),
+        "avatar": absolute_url(card["author"]["avatar"], request),
+    }
+    thumbnails = card["thumbnails"]
+    if thumbnails is not None and request is not None:
+        thumbnails = {
+            size: request.build_absolute_uri(url)
+            for size, url in thumbnails.items()
+        }
+    return {
+        "id": card["id"],
+        "tags": card["tags"],
+        "author": author,
+        "ingredients": card["ingredients"],
+        "is_favorited": bool(is_favorited),
+        "is_in_shopping_cart": bool(is_in_shopping_cart),
+        "name": card["name"],
+        "image": absolute_url(card["image"], request),
+        "thumbnails": thumbnails,
+        "text": card["text"],
+        "cooking_time": card["cooking_time"],
+    }
+
+
+class ReadSerializer:
+    def __init__(self, instance=None, many=False, context=None, **kwargs):
+        self.instance = instance
+        self.many = many
+        self.context = context or {}
+        self.request = self.context.get("request")
+
+    @property
+    def data(self):
+        if self.many:
+            return [self.to_representation(item) for item in self.instance]
+        return self.to_representation(self.instance)
+
+    def to_representation(self, instance):
+        raise NotImplementedError
+
+
+class ReferenceReadSerializer(InstrumentedSerializerMixin, ReadSerializer):
+    fields = ()
+
+    def to_representation(self, instance):
+        if isinstance(instance, dict):
+            return instance
+        return {name: getattr(instance, name) for name in self.fields}
+
+
+class TagReadSerializer(ReferenceReadSerializer):
+    fields = ("id", "name", "slug")
+
+
+class IngredientReadSerializer(ReferenceReadSerializer):
+    fields = ("id", "name", "measurement_unit")
+
+
+class UserReadSerializer(InstrumentedSerializerMixin, ReadSerializer):
+    def to_representation(self, instance):
+        return represent_user(
+            instance, getattr(instance, "user_subscribed", False), self.request
+        )
+
+
+class FastReadMixin:
+    read_serializer_class = None
+    renderer_classes = (FastJSONRenderer, BrowsableAPIRenderer)
+
+    def get_serializer_class(self):
+        if self.action in READ_ACTIONS:
+            return self.read_serializer_class
+        return super().get_serializer_class()
+
+    def get_read_fields(self):
+        return getattr(self.read_serializer_class, "fields", None)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        fields = self.get_read_fields()
+        if self.action in READ_ACTIONS and fields:
+            queryset = queryset.values(*fields)
+        return queryset
@@ -0,0 +1,204 @@
+from asgiref.sync import sync_to_async
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from api.images import renditions_built
+from api.metrics import InstrumentedSerializerMixin
+from api.read_serializers import ReadSerializer, merge_card, reciept_card
+from reciepts.models import (
+    CustomUser,
+    Ingredient,
+    IngredientReciept,
+    Reciept,
+    RecieptTag,
+    Tag,
+)
+
+CACHE_ALIAS = "reciept_cards"
+PROFILE_IGNORED_FIELDS = {"last_login", "password"}
+
+
+def card_key(reciept_id):
+    return f"reciept_card:{reciept_id}"
+
+
+def _value(row, name):
+    if isinstance(row, dict):
+        return row[name]
+    return getattr(row, name)
+
+
+def cached_cards(rows):
+    keys = [card_key(_value(row, "id")) for row in rows]
+    cards = caches[CACHE_ALIAS].get_many(keys)
+    return cards, [row for row, key in zip(rows, keys) if key not in cards]
+
+
+async def acached_cards(rows):
+    keys = [card_key(_value(row, "id")) for row in rows]
+    cards = await caches[CACHE_ALIAS].aget_many(keys)
+    return cards, [row for row, key in zip(rows, keys) if key not in cards]
+
+
+def build_cards(rows):
+    # Карточка живёт в кэше до инвалидации, поэтому собирается только из
+    # основной базы: строка с отстающей реплики закрепила бы старые данные.
+    instances = [
+        row
+        for row in rows
+        if isinstance(row, Reciept) and row._state.db == "default"
+    ]
+    ids = [
+        _value(row, "id")
+        for row in rows
+        if not isinstance(row, Reciept) or row._state.db != "default"
+    ]
+    if ids:
+        instances += (
+            Reciept.objects.using("default").filter(pk__in=ids).with_related()
+        )
+    built = {
+        card_key(reciept.pk): reciept_card(reciept) for reciept in instances
+    }
+    caches[CACHE_ALIAS].set_many(built)
+    return built
+
+
+def get_cards(rows):
+    cards, missing = cached_cards(rows)
+    if missing:
+        cards.update(build_cards(missing))
+    return cards
+
+
+async def aget_cards(rows):
+    cards, missing = await acached_cards(rows)
+    if missing:
+        cards.update(await sync_to_async(build_cards)(missing))
+    return cards
+
+
+def invalidate_cards(reciept_ids):
+    keys = [card_key(reciept_id) for reciept_id in reciept_ids]
+    if not keys:
+        return
+    cache = caches[CACHE_ALIAS]
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+class RecieptCardSerializer(InstrumentedSerializerMixin, ReadSerializer):
+    fields = (
+        "id",
+        "favorited_count",
+        "user_favorited",
+        "user_in_shopping_cart",
+        "author_subscribed",
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.rows = list(self.instance) if self.many else [self.instance]
+        self.cards = None
+
+    # Карточки загружаются до сериализации: представление вызывает load()
+    # или aload(), а сама сериализация в базу не ходит.
+    def load(self):
+        self.cards = get_cards(self.rows)
+        return self
+
+    async def aload(self):
+        self.cards = await aget_cards(self.rows)
+        return self
+
+    @property
+    def data(self):
+        if self.cards is None:
+            raise RuntimeError("Карточки рецептов не загружены.")
+        data = self.to_representation(self.rows)
+        return data if self.many else data[0]
+
+    def to_representation(self, rows):
+        data = []
+        for row in rows:
+            card = self.cards.get(card_key(_value(row, "id")))
+            if card is not None:
+                data.append(
+                    merge_card(
+                        card,
+                        _value(row, "user_favorited"),
+                        _value(row, "user_in_shopping_cart"),
+                        _value(row, "author_subscribed"),
+                        self.request,
+                    )
+                )
+        return data
+
+
+@receiver(post_save, sender=Reciept)
+@receiver(post_delete, sender=Reciept)
+def invalidate_reciept_card(instance, **kwargs):
+    invalidate_cards([instance.pk])
+
+
+@receiver(post_save, sender=IngredientReciept)
+@receiver(post_delete, sender=IngredientReciept)
+@receiver(post_save, sender=RecieptTag)
+@receiver(post_delete, sender=RecieptTag)
+def invalidate_related_card(instance, **kwargs):
+    invalidate_cards([instance.reciept_id])
+
+
+@receiver(m2m_changed, sender=Reciept.tags.through)
+def invalidate_tagged_cards(instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    if not reverse:
+        invalidate_cards([instance.pk])
+    elif pk_set is not None:
+        invalidate_cards(pk_set)
+    else:
+        invalidate_cards(
+            RecieptTag.objects.filter(tag=instance).values_list(
+                "reciept_id", flat=True
+            )
+        )
+
+
+@receiver(renditions_built)
+def invalidate_image_cards(name, **kwargs):
+    invalidate_cards(
+        Reciept.objects.filter(image=name).values_list("id", flat=True)
+    )
+
+
+@receiver(post_save, sender=Tag)
+def invalidate_tag_cards(instance, **kwargs):
+    invalidate_cards(
+        RecieptTag.objects.filter(tag=instance).values_list(
+            "reciept_id", flat=True
+        )
+    )
+
+
+@receiver(post_save, sender=Ingredient)
+def invalidate_ingredient_cards(instance, **kwargs):
+    invalidate_cards(
+        IngredientReciept.objects.filter(ingredient=instance).values_list(
+            "reciept_id", flat=True
+        )
+    )
+
+
+@receiver(post_save, sender=CustomUser)
+def invalidate_author_cards(instance, created, update_fields=None, **kwargs):
+    if created or (
+        update_fields is not None
+        and set(update_fields) <= PROFILE_IGNORED_FIELDS
+    ):
+        return
+    invalidate_cards(
+        Reciept.objects.filter(author=instance).values_list("id", flat=True)
+    )
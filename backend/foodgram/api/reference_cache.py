@@ -0,0 +1,134 @@
+import hashlib
+import time
+import uuid
+
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.http import HttpResponse
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+
+from api.renderers import FastJSONRenderer
+from reciepts.models import Ingredient, Tag
+
+CACHE_ALIAS = "reference_data"
+
+
+def _state_key(namespace):
+    return f"{namespace}:state"
+
+
+def _new_state():
+    return {"version": uuid.uuid4().hex, "last_modified": int(time.time())}
+
+
+def get_state(namespace):
+    return caches[CACHE_ALIAS].get_or_set(
+        _state_key(namespace), _new_state, timeout=None
+    )
+
+
+def bump_version(namespace):
+    caches[CACHE_ALIAS].set(_state_key(namespace), _new_state(), timeout=None)
+
+
+class ReferenceCacheMixin:
+    cache_namespace = None
+
+    def list(self, request, *args, **kwargs):
+        return self._cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def _cached_response(self, view, request, *args, **kwargs):
+        if not isinstance(request.accepted_renderer, JSONRenderer):
+            return view(request, *args, **kwargs)
+
+        content_key, headers, not_modified = self._cache_headers(
+            request, get_state(self.cache_namespace)
+        )
+        if not_modified:
+            return HttpResponse(
+                status=status.HTTP_304_NOT_MODIFIED, headers=headers
+            )
+
+        cache = caches[CACHE_ALIAS]
+        content = cache.get(content_key)
+        if content is None:
+            response = view(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            content = FastJSONRenderer().render(response.data)
+            cache.set(content_key, content, timeout=None)
+        return HttpResponse(
+            content, content_type="application/json", headers=headers
+        )
+
+    async def acached_response(self, build, request):
+        cache = caches[CACHE_ALIAS]
+        state = await cache.aget_or_set(
+            _state_key(self.cache_namespace), _new_state, timeout=None
+        )
+        content_key, headers, not_modified = self._cache_headers(
+            request, state
+        )
+        if not_modified:
+            return HttpResponse(
+                status=status.HTTP_304_NOT_MODIFIED, headers=headers
+            )
+
+        content = await cache.aget(content_key)
+        if content is None:
+            content = FastJSONRenderer().render(await build())
+            await cache.aset(content_key, content, timeout=None)
+        return HttpResponse(
+            content, content_type="application/json", headers=headers
+        )
+
+    def _cache_headers(self, request, state):
+        digest = hashlib.md5(
+            f"{state['version']}:{request.get_full_path()}".encode()
+        ).hexdigest()
+        headers = {
+            "ETag": f'"{digest}"',
+            "Last-Modified": http_date(state["last_modified"]),
+        }
+        return (
+            f"{self.cache_namespace}:{digest}",
+            headers,
+            self._not_modified(request, headers["ETag"], state),
+        )
+
+    def _not_modified(self, request, etag, state):
+        if_none_match = request.headers.get("If-None-Match")
+        if if_none_match is not None:
+            return etag in (tag.strip() for tag in if_none_match.split(","))
+        if_modified_since = parse_http_date_safe(
+            request.headers.get("If-Modified-Since", "")
+        )
+        return (
+            if_modified_since is not None
+            and state["last_modified"] <= if_modified_since
+        )
+
+
+def bump_version_on_commit(namespace, using=None):
+    transaction.on_commit(lambda: bump_version(namespace), using=using)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def bump_tags_version(using, **kwargs):
+    bump_version_on_commit("tags", using)
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def bump_ingredients_version(using, **kwargs):
+    bump_version_on_commit("ingredients", using)
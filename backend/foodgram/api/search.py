@@ -0,0 +1,184 @@
+import re
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import FloatField, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from reciepts.models import Ingredient, IngredientReciept, Reciept
+
+SEARCH_TABLE = "reciepts_reciept_search"
+SEARCH_ORDERING = ("-search_rank", "-id")
+CHUNK_SIZE = 500
+WORD = re.compile(r"\w+")
+
+DOCUMENT_JOINS = (
+    "FROM reciepts_reciept r "
+    "LEFT JOIN reciepts_ingredientreciept ir ON ir.reciept_id = r.id "
+    "LEFT JOIN reciepts_ingredient i ON i.id = ir.ingredient_id "
+)
+
+
+class SqliteSearch:
+    def annotate(self, queryset, query):
+        terms = WORD.findall(query)
+        if not terms:
+            return None
+        match = " ".join(f'"{term}"*' for term in terms)
+        return queryset.annotate(
+            search_rank=RawSQL(
+                "WITH matches AS MATERIALIZED ("
+                f"SELECT rowid AS id, -rank AS score FROM {SEARCH_TABLE} "
+                f"WHERE {SEARCH_TABLE} MATCH %s) "
+                "SELECT score FROM matches "
+                f"WHERE matches.id = {Reciept._meta.db_table}.id",
+                (match,),
+                output_field=FloatField(),
+            )
+        ).filter(
+            pk__in=RawSQL(
+                f"SELECT rowid FROM {SEARCH_TABLE} "
+                f"WHERE {SEARCH_TABLE} MATCH %s",
+                (match,),
+            )
+        )
+
+    def reindex(self, cursor, ids=None):
+        where, params = "", ()
+        if ids is None:
+            cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+        else:
+            placeholders = ", ".join(["%s"] * len(ids))
+            where, params = f"WHERE r.id IN ({placeholders}) ", tuple(ids)
+        cursor.execute(
+            f"INSERT OR REPLACE INTO {SEARCH_TABLE} "
+            "(rowid, name, text, ingredients) "
+            "SELECT r.id, r.name, r.text, "
+            "COALESCE(group_concat(i.name, ' '), '') "
+            f"{DOCUMENT_JOINS}{where}GROUP BY r.id",
+            params,
+        )
+
+    def delete(self, cursor, ids):
+        placeholders = ", ".join(["%s"] * len(ids))
+        cursor.execute(
+            f"DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({placeholders})",
+            tuple(ids),
+        )
+
+
+class PostgresSearch:
+    def annotate(self, queryset, query):
+        if not WORD.search(query):
+            return None
+        tsquery = "websearch_to_tsquery(%s::regconfig, %s)"
+        params = (settings.SEARCH_CONFIG, query)
+        return queryset.annotate(
+            search_rank=RawSQL(
+                f"SELECT ts_rank(document, {tsquery}) FROM {SEARCH_TABLE} "
+                f"WHERE reciept_id = {Reciept._meta.db_table}.id",
+                params,
+                output_field=FloatField(),
+            )
+        ).filter(
+            pk__in=RawSQL(
+                f"SELECT reciept_id FROM {SEARCH_TABLE} "
+                f"WHERE document @@ {tsquery}",
+                params,
+            )
+        )
+
+    def reindex(self, cursor, ids=None):
+        where, params = "", [settings.SEARCH_CONFIG] * 3
+        if ids is None:
+            cursor.execute(f"TRUNCATE {SEARCH_TABLE}")
+        else:
+            where = "WHERE r.id = ANY(%s) "
+            params.append(list(ids))
+        cursor.execute(
+            f"INSERT INTO {SEARCH_TABLE} (reciept_id, document) "
+            "SELECT r.id, "
+            "setweight(to_tsvector(%s::regconfig, r.name), 'A') || "
+            "setweight(to_tsvector(%s::regconfig, "
+            "COALESCE(string_agg(i.name, ' '), '')), 'B') || "
+            "setweight(to_tsvector(%s::regconfig, r.text), 'C') "
+            f"{DOCUMENT_JOINS}{where}GROUP BY r.id "
+            "ON CONFLICT (reciept_id) "
+            "DO UPDATE SET document = EXCLUDED.document",
+            params,
+        )
+
+    def delete(self, cursor, ids):
+        cursor.execute(
+            f"DELETE FROM {SEARCH_TABLE} WHERE reciept_id = ANY(%s)",
+            [list(ids)],
+        )
+
+
+BACKENDS = {"sqlite": SqliteSearch(), "postgresql": PostgresSearch()}
+
+
+def search_backend(connection):
+    return BACKENDS[connection.vendor]
+
+
+def search_reciepts(queryset, query):
+    annotated = search_backend(connections[queryset.db]).annotate(
+        queryset, query
+    )
+    if annotated is None:
+        return queryset.none().annotate(
+            search_rank=Value(0.0, output_field=FloatField())
+        )
+    return annotated.order_by(*SEARCH_ORDERING)
+
+
+def reindex_reciepts(ids, using="default"):
+    ids = list(ids)
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        for start in range(0, len(ids), CHUNK_SIZE):
+            search_backend(connection).reindex(
+                cursor, ids[start:start + CHUNK_SIZE]
+            )
+
+
+def rebuild_index(using="default"):
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        search_backend(connection).reindex(cursor)
+
+
+@receiver(post_save, sender=Reciept)
+def index_reciept(instance, using, **kwargs):
+    reindex_reciepts([instance.pk], using)
+
+
+@receiver(post_delete, sender=Reciept)
+def unindex_reciept(instance, using, **kwargs):
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        search_backend(connection).delete(cursor, [instance.pk])
+
+
+@receiver(post_save, sender=IngredientReciept)
+@receiver(post_delete, sender=IngredientReciept)
+def index_reciept_ingredients(instance, using, origin=None, **kwargs):
+    if isinstance(origin, Reciept):
+        return
+    reindex_reciepts([instance.reciept_id], using)
+
+
+@receiver(post_save, sender=Ingredient)
+def index_ingredient_reciepts(instance, created, using, **kwargs):
+    if created:
+        return
+    reindex_reciepts(
+        IngredientReciept.objects.using(using)
+        .filter(ingredient=instance)
+        .values_list("reciept_id", flat=True)
+        .distinct(),
+        using,
+    )
@@ -1,17 +1,24 @@
-import base64
-
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from rest_framework_simplejwt.tokens import AccessToken
 from rest_framework import serializers
 from rest_framework.validators import UniqueValidator
-from django.contrib.auth.password_validation import validate_password
+from django.contrib.auth.password_validation import (
+    password_changed,
+    validate_password,
+)
 from django.core.validators import RegexValidator
 from django.contrib.auth import authenticate
-from django.core.files.base import ContentFile
+from django.db import transaction
 
 
+from api.images import decode_base64_image, image_pipeline
 from api.validators import MaxLengthValidator, is_not_number
 from api.exceptions import UserNotFoundError, WrongPassword, InvalidData
+from api.metrics import InstrumentedSerializerMixin
+from api.passwords import check_user_password, password_pool
+from api.read_serializers import thumbnail_urls
+from api.search import reindex_reciepts
+from reciepts.cart import apply_to_totals, cart_holders
 from reciepts.models import (
     CustomUser,
     Tag,
@@ -24,14 +31,16 @@ from reciepts.models import (
 class Base64ImageField(serializers.ImageField):
     def to_internal_value(self, data):
         if isinstance(data, str) and data.startswith("data:image"):
-            format, imgstr = data.split(";base64,")
-            ext = format.split("/")[-1]
-
-            data = ContentFile(base64.b64decode(imgstr), name="img." + ext)
+            data = decode_base64_image(data)
 
         return super().to_internal_value(data)
 
 
+class ThumbnailsField(serializers.ReadOnlyField):
+    def to_representation(self, value):
+        return thumbnail_urls(value, self.context.get("request"))
+
+
 class CustomTokenObtainSerializer(TokenObtainPairSerializer):
     username_field = CustomUser.EMAIL_FIELD
 
@@ -41,7 +50,7 @@ class CustomTokenObtainSerializer(TokenObtainPairSerializer):
         user = CustomUser.objects.filter(email=email).first()
         if not user:
             raise UserNotFoundError()
-        if not user.check_password(password):
+        if not check_user_password(user, password):
             raise WrongPassword()
         access_token = AccessToken.for_user(user)
         return {"auth_token": str(access_token)}
@@ -76,7 +85,7 @@ class SignUpSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         password = validated_data.pop("password")
         user = CustomUser(**validated_data)
-        user.set_password(password)
+        user.password = password_pool.hash(password)
         user.save()
         return user
 
@@ -92,7 +101,13 @@ class SignUpSerializer(serializers.ModelSerializer):
         )
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(
+    InstrumentedSerializerMixin, serializers.ModelSerializer
+):
+    is_subscribed = serializers.BooleanField(
+        read_only=True, source="user_subscribed", default=False
+    )
+
     class Meta:
         model = CustomUser
         fields = (
@@ -128,14 +143,15 @@ class ChangePasswordSerializer(serializers.ModelSerializer):
     def validate(self, attrs):
         user = self.context.get("user")
         current_password = attrs.get("current_password")
-        if not user.check_password(current_password):
+        if not check_user_password(user, current_password):
             raise WrongPassword()
         return attrs
 
     def update(self, instance, validated_data):
         new_password = validated_data.pop("new_password")
-        instance.set_password(new_password)
+        instance.password = password_pool.hash(new_password)
         instance.save()
+        password_changed(new_password, instance)
         return instance
 
     class Meta:
@@ -143,13 +159,17 @@ class ChangePasswordSerializer(serializers.ModelSerializer):
         fields = ("new_password", "current_password")
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(
+    InstrumentedSerializerMixin, serializers.ModelSerializer
+):
     class Meta:
         model = Tag
         fields = ("id", "name", "slug")
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(
+    InstrumentedSerializerMixin, serializers.ModelSerializer
+):
     class Meta:
         model = Ingredient
         fields = ("id", "name", "measurement_unit")
@@ -163,27 +183,10 @@ class IngredientInRecieptSerializer(serializers.Serializer):
     amount = serializers.IntegerField(min_value=1)
 
 
-class IngredientInRecieptReadSerializer(serializers.ModelSerializer):
-    id = serializers.ReadOnlyField(source="ingredient.id")
-    name = serializers.ReadOnlyField(source="ingredient.name")
-    measurement_unit = serializers.ReadOnlyField(
-        source="ingredient.measurement_unit"
-    )
-
-    class Meta:
-        model = IngredientReciept
-        fields = ["id", "name", "measurement_unit", "amount"]
-
-
-class TestSerializer(serializers.ModelSerializer):
-    amount = serializers.ReadOnlyField(source="i2r.amount")
-
-    class Meta:
-        model = Ingredient
-        fields = ["id", "name", "measurement_unit", "amount"]
-
-
 class RecieptCreateSerializer(serializers.ModelSerializer):
+    tags = serializers.PrimaryKeyRelatedField(
+        many=True, queryset=Tag.objects.all()
+    )
     ingredients = IngredientInRecieptSerializer(many=True)
     image = Base64ImageField(required=True)
     author = UserSerializer(required=False)
@@ -201,6 +204,27 @@ class RecieptCreateSerializer(serializers.ModelSerializer):
             "ingredients",
         ]
 
+    def validate_ingredients(self, value: list[dict]) -> list[dict]:
+        if not value:
+            raise serializers.ValidationError(
+                "Нужно указать хотя бы один ингредиент."
+            )
+        ids = [item["id"] for item in value]
+        if len(ids) != len(set(ids)):
+            raise serializers.ValidationError(
+                "Ингредиенты не должны повторяться."
+            )
+        ingredients = Ingredient.objects.in_bulk(ids)
+        missing = sorted(set(ids) - ingredients.keys())
+        if missing:
+            raise serializers.ValidationError(
+                f"Ингредиенты не найдены: {missing}."
+            )
+        for item in value:
+            item["ingredient"] = ingredients[item["id"]]
+        return value
+
+    @transaction.atomic
     def create(self, validated_data: dict):
         user = self.context.get("request").user
         ingredients_data = validated_data.pop("ingredients")
@@ -208,41 +232,93 @@ class RecieptCreateSerializer(serializers.ModelSerializer):
         reciept = Reciept.objects.create(**validated_data, author=user)
         reciept.tags.set(tags_data)
         self._save_ingredients(ingredients_data, reciept)
+        reindex_reciepts([reciept.pk])
+        self._schedule_renditions(reciept)
         return reciept
 
+    @transaction.atomic
+    def update(self, instance: Reciept, validated_data: dict):
+        ingredients_data = validated_data.pop("ingredients", None)
+        tags_data = validated_data.pop("tags", None)
+        validated_data.pop("author", None)
+        instance = super().update(instance, validated_data)
+        if "image" in validated_data:
+            self._schedule_renditions(instance)
+        if tags_data is not None:
+            instance.tags.set(tags_data)
+        if ingredients_data is not None:
+            holders = cart_holders(instance.pk)
+            apply_to_totals(holders, [instance.pk], -1)
+            self._update_ingredients(ingredients_data, instance)
+            apply_to_totals(holders, [instance.pk], 1)
+            reindex_reciepts([instance.pk])
+        return instance
+
+    def _schedule_renditions(self, reciept: Reciept):
+        name = reciept.image.name
+        transaction.on_commit(lambda: image_pipeline.submit(name))
+
     def _save_ingredients(
         self, ingredients_data: list[dict], reciept: Reciept
     ):
-        for item in ingredients_data:
-            ingredient = Ingredient.objects.get(id=item["id"])
-            obj = IngredientReciept.objects.create(
-                reciept=reciept, ingredient=ingredient, amount=item["amount"]
+        IngredientReciept.objects.bulk_create(
+            IngredientReciept(
+                reciept=reciept,
+                ingredient=item["ingredient"],
+                amount=item["amount"],
             )
+            for item in ingredients_data
+        )
 
+    def _update_ingredients(
+        self, ingredients_data: list[dict], reciept: Reciept
+    ):
+        existing = {row.ingredient_id: row for row in reciept.i2r.all()}
+        incoming = {item["id"]: item for item in ingredients_data}
 
-class RecieptSerializer(serializers.ModelSerializer):
-    tags = serializers.PrimaryKeyRelatedField(
-        many=True, queryset=Tag.objects.all()
-    )
-    author = UserSerializer(read_only=True)
-    # ingredients = IngredientInRecieptReadSerializer(many=True)
-    ingredients = TestSerializer(many=True)
-    image = Base64ImageField(required=True)
-    name = serializers.CharField(required=True)
-    text = serializers.CharField(required=True)
-    cooking_time = serializers.IntegerField(required=True)
+        removed = [
+            row.pk
+            for ingredient_id, row in existing.items()
+            if ingredient_id not in incoming
+        ]
+        if removed:
+            IngredientReciept.objects.filter(pk__in=removed).delete()
+
+        changed = []
+        for ingredient_id, row in existing.items():
+            item = incoming.get(ingredient_id)
+            if item is not None and row.amount != item["amount"]:
+                row.amount = item["amount"]
+                changed.append(row)
+        if changed:
+            IngredientReciept.objects.bulk_update(changed, ["amount"])
+
+        self._save_ingredients(
+            [
+                item
+                for ingredient_id, item in incoming.items()
+                if ingredient_id not in existing
+            ],
+            reciept,
+        )
+
+
+class RecieptMinifiedSerializer(
+    InstrumentedSerializerMixin, serializers.ModelSerializer
+):
+    image = Base64ImageField(read_only=True)
+    thumbnails = ThumbnailsField(source="image")
 
     class Meta:
         model = Reciept
-        fields = (
-            "id",
-            "tags",
-            "author",
-            "ingredients",
-            "is_favorited",
-            "is_in_shopping_cart",
-            "name",
-            "image",
-            "text",
-            "cooking_time",
-        )
+        fields = ("id", "name", "image", "thumbnails", "cooking_time")
+
+
+class UserWithRecipesSerializer(UserSerializer):
+    recipes = RecieptMinifiedSerializer(
+        many=True, read_only=True, source="limited_recipes"
+    )
+    recipes_count = serializers.IntegerField(read_only=True)
+
+    class Meta(UserSerializer.Meta):
+        fields = UserSerializer.Meta.fields + ("recipes", "recipes_count")
@@ -0,0 +1,40 @@
+import csv
+
+from reciepts.models import ShoppingCartIngredient
+
+CHUNK_SIZE = 500
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+def shopping_cart_totals(user):
+    return (
+        ShoppingCartIngredient.objects.filter(user=user)
+        .order_by("ingredient__name", "ingredient__measurement_unit")
+        .values_list(
+            "ingredient__name", "ingredient__measurement_unit", "amount"
+        )
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+
+
+def render_txt(rows):
+    yield "Список покупок\n\n"
+    for name, measurement_unit, total in rows:
+        yield f"{name} ({measurement_unit}) — {total}\n"
+
+
+def render_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(("name", "measurement_unit", "amount"))
+    for row in rows:
+        yield writer.writerow(row)
+
+
+SHOPPING_CART_FORMATS = {
+    "txt": (render_txt, "text/plain; charset=utf-8"),
+    "csv": (render_csv, "text/csv; charset=utf-8"),
+}
@@ -0,0 +1,136 @@
+import atexit
+import logging
+import string
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.db.models import Case, F, IntegerField, Value, When
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from reciepts.models import Reciept
+
+logger = logging.getLogger(__name__)
+
+ALPHABET = string.digits + string.ascii_letters
+BASE = len(ALPHABET)
+POSITIONS = {char: position for position, char in enumerate(ALPHABET)}
+
+
+def encode(number):
+    code = ""
+    while True:
+        number, remainder = divmod(number, BASE)
+        code = ALPHABET[remainder] + code
+        if not number:
+            return code
+
+
+def decode(code):
+    if not code or len(code) > 11 or (code[0] == "0" and len(code) > 1):
+        return None
+    number = 0
+    for char in code:
+        position = POSITIONS.get(char)
+        if position is None:
+            return None
+        number = number * BASE + position
+    return number
+
+
+class ShortLinkResolver:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._known = OrderedDict()
+
+    def resolve(self, code):
+        reciept_id = decode(code)
+        if reciept_id is None:
+            return None
+        with self._lock:
+            if reciept_id in self._known:
+                self._known.move_to_end(reciept_id)
+                return reciept_id
+        if not Reciept.objects.filter(pk=reciept_id).exists():
+            return None
+        with self._lock:
+            self._known[reciept_id] = None
+            while len(self._known) > settings.SHORT_LINK_CACHE_SIZE:
+                self._known.popitem(last=False)
+        return reciept_id
+
+    def discard(self, reciept_id):
+        with self._lock:
+            self._known.pop(reciept_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._known.clear()
+
+
+class HitCounter:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._count = 0
+        self._flushed_at = time.monotonic()
+
+    def hit(self, reciept_id):
+        with self._lock:
+            self._pending[reciept_id] = self._pending.get(reciept_id, 0) + 1
+            self._count += 1
+            if (
+                self._count < settings.SHORT_LINK_FLUSH_SIZE
+                and time.monotonic() - self._flushed_at
+                < settings.SHORT_LINK_FLUSH_INTERVAL
+            ):
+                return
+            pending = self._take()
+        self._write(pending)
+
+    def flush(self):
+        with self._lock:
+            pending = self._take()
+        self._write(pending)
+
+    def _take(self):
+        pending, self._pending = self._pending, {}
+        self._count = 0
+        self._flushed_at = time.monotonic()
+        return pending
+
+    @staticmethod
+    def _write(pending):
+        if not pending:
+            return
+        Reciept.objects.filter(pk__in=pending).update(
+            link_hits=F("link_hits")
+            + Case(
+                *(
+                    When(pk=reciept_id, then=Value(hits))
+                    for reciept_id, hits in pending.items()
+                ),
+                default=Value(0),
+                output_field=IntegerField(),
+            )
+        )
+
+
+short_link_resolver = ShortLinkResolver()
+hit_counter = HitCounter()
+
+
+@atexit.register
+def flush_hits_on_exit():
+    try:
+        hit_counter.flush()
+    except DatabaseError:
+        logger.exception("Не удалось сохранить переходы по коротким ссылкам")
+
+
+@receiver(post_delete, sender=Reciept)
+def discard_short_link(sender, instance, **kwargs):
+    short_link_resolver.discard(instance.pk)
@@ -0,0 +1,10 @@
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def _start_transaction_under_autocommit(self):
+        # Отложенная транзакция, которая сначала читает, а затем пишет,
+        # получает "database is locked" сразу, минуя busy_timeout: в WAL
+        # её снимок уже устарел. IMMEDIATE берёт блокировку записи в начале
+        # и ждёт её в пределах busy_timeout.
+        self.cursor().execute("BEGIN IMMEDIATE")
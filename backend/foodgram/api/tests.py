@@ -1,3 +1,2070 @@
-from django.test import TestCase
+import datetime
+import decimal
+import json
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache, caches
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, connections, transaction
+from django.test import (
+    Client,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.tokens import AccessToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from api.async_views import AsyncReadView
+from api.authentication import token_cache
+from api.blacklist import BloomFilter, TokenBlacklist, token_blacklist
+from api.db_router import PIN_COOKIE, ReplicaRouter, request_routing
+from api.filters import RecieptFilter
+from api.images import build_renditions
+from api.ingredient_search import TRIGRAM_TABLE, ingredient_search_cache
+from api.management.commands import (
+    collect_orphan_blobs,
+    load_ingredients,
+    run_benchmark,
+)
+from api.metrics import Histogram, registry
+from api.passwords import password_pool
+from api.reference_cache import get_state
+from api.reciept_cards import RecieptCardSerializer, card_key, get_cards
+from api.read_serializers import (
+    IngredientReadSerializer,
+    TagReadSerializer,
+    UserReadSerializer,
+)
+from api.renderers import FastJSONRenderer
+from api.serializers import (
+    IngredientSerializer,
+    TagSerializer,
+    UserSerializer,
+)
+from api.throttling import LoginEmailThrottle, LoginIPThrottle
+from api.short_links import (
+    decode,
+    encode,
+    hit_counter,
+    short_link_resolver,
+)
+from api.sqlite import base as sqlite
+
+from reciepts.models import (
+    CustomUser,
+    Tag,
+    Ingredient,
+    Reciept,
+    IngredientReciept,
+    Subscription,
+    MediaBlob,
+    ShoppingCartIngredient,
+)
+from reciepts.signals import change_ref_count
+from reciepts.storage import content_storage
+
+
+IMAGE = (
+    "data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABAgMAAABieywaAAAA"
+    "CVBMVEUAAAD///9fX1/S0ecCAAAACXBIWXMAAA7EAAAOxAGVKw4bAAAACklEQVQImWNoAAAA"
+    "ggCByxOyYQAAAABJRU5ErkJggg=="
+)
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def create_reciepts(author, count, tags, ingredients):
+    reciepts = Reciept.objects.bulk_create(
+        Reciept(
+            name=f"Рецепт {i}",
+            image="images/reciept_images/img.png",
+            cooking_time=10,
+            text="Описание",
+            author=author,
+        )
+        for i in range(count)
+    )
+    Reciept.tags.through.objects.bulk_create(
+        Reciept.tags.through(reciept=reciept, tag=tag)
+        for reciept in reciepts
+        for tag in tags
+    )
+    IngredientReciept.objects.bulk_create(
+        IngredientReciept(reciept=reciept, ingredient=ingredient, amount=5)
+        for reciept in reciepts
+        for ingredient in ingredients
+    )
+    return reciepts
+
+
+class RecieptListQueriesTest(TestCase):
+    MAX_QUERIES = 5
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            username="reader", email="reader@example.com", password="pass"
+        )
+        author = CustomUser.objects.create_user(
+            username="author", email="author@example.com", password="pass"
+        )
+        tags = Tag.objects.bulk_create(
+            Tag(name=f"Тег {i}", slug=f"tag{i}") for i in range(3)
+        )
+        ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f"Ингредиент {i}", measurement_unit="г")
+            for i in range(5)
+        )
+        reciepts = create_reciepts(author, 100, tags, ingredients)
+        cls.user.favorites.add(*reciepts[::2])
+        cls.user.shopping_cart.add(*reciepts[::3])
+
+    def setUp(self):
+        caches["reciept_cards"].clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_queries_do_not_depend_on_page_size(self):
+        for limit in (1, 10, 100):
+            with self.subTest(limit=limit):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(
+                        "/api/recipes/", {"limit": limit}
+                    )
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.data["results"]), limit)
+                self.assertLessEqual(len(queries), self.MAX_QUERIES)
+
+    def test_cursor_pages_skip_count(self):
+        ids = []
+        url, params = "/api/recipes/", {"cursor": "", "limit": 40}
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url, params)
+            self.assertFalse(
+                any("COUNT(" in query["sql"] for query in queries)
+            )
+            self.assertNotIn("count", response.data)
+            ids += [item["id"] for item in response.data["results"]]
+            url, params = response.data["next"], None
+        self.assertEqual(ids, sorted(ids, reverse=True))
+        self.assertEqual(len(ids), 100)
+
+    def test_user_flags(self):
+        response = self.client.get("/api/recipes/", {"limit": 6})
+        flags = [
+            (item["is_favorited"], item["is_in_shopping_cart"])
+            for item in response.data["results"]
+        ]
+        favorited = set(self.user.favorites.values_list("id", flat=True))
+        in_cart = set(self.user.shopping_cart.values_list("id", flat=True))
+        expected = [
+            (item["id"] in favorited, item["id"] in in_cart)
+            for item in response.data["results"]
+        ]
+        self.assertEqual(flags, expected)
+        self.assertEqual(len(response.data["results"][0]["ingredients"]), 5)
+
+    def test_anonymous_flags_are_false(self):
+        response = APIClient().get("/api/recipes/", {"limit": 10})
+        self.assertEqual(response.status_code, 200)
+        for item in response.data["results"]:
+            self.assertFalse(item["is_favorited"])
+            self.assertFalse(item["is_in_shopping_cart"])
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class RecieptWriteTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            username="author", email="author@example.com", password="pass"
+        )
+        cls.tag = Tag.objects.create(name="Завтрак", slug="breakfast")
+        cls.ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f"Ингредиент {i}", measurement_unit="г")
+            for i in range(30)
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        caches["reciept_cards"].clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def payload(self, ingredients):
+        return {
+            "name": "Омлет",
+            "text": "Взбить и пожарить.",
+            "cooking_time": 5,
+            "image": IMAGE,
+            "tags": [self.tag.id],
+            "ingredients": [
+                {"id": ingredient_id, "amount": amount}
+                for ingredient_id, amount in ingredients
+            ],
+        }
+
+    def test_create_does_not_query_per_ingredient(self):
+        ingredients = [(ingredient.id, 10) for ingredient in self.ingredients]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                "/api/recipes/", self.payload(ingredients), format="json"
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data["ingredients"]), 30)
+        self.assertLess(len(queries), 20)
+
+    def test_unknown_and_duplicate_ingredients_are_rejected(self):
+        first = self.ingredients[0].id
+        for ingredients in ([(first, 1), (first, 2)], [(first, 1), (0, 1)]):
+            with self.subTest(ingredients=ingredients):
+                response = self.client.post(
+                    "/api/recipes/", self.payload(ingredients), format="json"
+                )
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("ingredients", response.data)
+        self.assertFalse(Reciept.objects.exists())
+
+    def test_patch_diffs_ingredients(self):
+        first, second, third = (i.id for i in self.ingredients[:3])
+        response = self.client.post(
+            "/api/recipes/",
+            self.payload([(first, 1), (second, 2)]),
+            format="json",
+        )
+        reciept_id = response.data["id"]
+        kept = IngredientReciept.objects.get(ingredient_id=first)
+
+        response = self.client.patch(
+            f"/api/recipes/{reciept_id}/",
+            {
+                "ingredients": [
+                    {"id": first, "amount": 5},
+                    {"id": third, "amount": 3},
+                ]
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        rows = dict(
+            IngredientReciept.objects.filter(
+                reciept_id=reciept_id
+            ).values_list("ingredient_id", "amount")
+        )
+        self.assertEqual(rows, {first: 5, third: 3})
+        self.assertTrue(IngredientReciept.objects.filter(pk=kept.pk).exists())
+
+    def test_oversized_image_is_rejected(self):
+        payload = self.payload([(self.ingredients[0].id, 1)])
+        with self.settings(IMAGE_MAX_DIMENSION=0):
+            response = self.client.post(
+                "/api/recipes/", payload, format="json"
+            )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("image", response.data)
+        with self.settings(IMAGE_MAX_UPLOAD_SIZE=10):
+            response = self.client.post(
+                "/api/recipes/", payload, format="json"
+            )
+        self.assertEqual(response.status_code, 400)
+
+    def test_thumbnails_point_to_renditions(self):
+        response = self.client.post(
+            "/api/recipes/",
+            self.payload([(self.ingredients[0].id, 1)]),
+            format="json",
+        )
+        self.assertEqual(
+            response.data["thumbnails"]["list"], response.data["image"]
+        )
+        build_renditions(Reciept.objects.get().image.name)
+        response = self.client.get(f"/api/recipes/{response.data['id']}/")
+        for size in ("list", "card", "detail"):
+            self.assertIn(
+                "/renditions/", response.data["thumbnails"][size]
+            )
+            self.assertTrue(
+                response.data["thumbnails"][size].endswith(f".{size}.webp")
+            )
+
+    def test_patch_is_author_only(self):
+        response = self.client.post(
+            "/api/recipes/",
+            self.payload([(self.ingredients[0].id, 1)]),
+            format="json",
+        )
+        other = CustomUser.objects.create_user(
+            username="other", email="other@example.com", password="pass"
+        )
+        self.client.force_authenticate(other)
+        response = self.client.patch(
+            f"/api/recipes/{response.data['id']}/",
+            {"name": "Чужой"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 403)
+
+
+class ShoppingCartDownloadTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            username="buyer", email="buyer@example.com", password="pass"
+        )
+        ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=name, measurement_unit="г")
+            for name in ("Мука", "Сахар")
+        )
+        reciepts = create_reciepts(cls.user, 3, [], ingredients)
+        cls.user.shopping_cart.add(*reciepts[:2])
+
+    def setUp(self):
+        caches["reciept_cards"].clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def download(self, **params):
+        response = self.client.get(
+            "/api/recipes/download_shopping_cart/", params
+        )
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content).decode()
+
+    def test_amounts_are_summed_across_cart(self):
+        content = self.download()
+        self.assertIn("Мука (г) — 10", content)
+        self.assertIn("Сахар (г) — 10", content)
+
+    def test_csv(self):
+        content = self.download(type="csv")
+        self.assertEqual(
+            content.splitlines(),
+            ["name,measurement_unit,amount", "Мука,г,10", "Сахар,г,10"],
+        )
+
+    def test_anonymous_is_rejected(self):
+        response = APIClient().get("/api/recipes/download_shopping_cart/")
+        self.assertEqual(response.status_code, 401)
+
+
+class ShoppingCartTotalsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            username="cook", email="cook@example.com", password="pass"
+        )
+        cls.flour, cls.sugar = Ingredient.objects.bulk_create(
+            Ingredient(name=name, measurement_unit="г")
+            for name in ("Мука", "Сахар")
+        )
+        cls.reciepts = create_reciepts(
+            cls.user, 2, [], [cls.flour, cls.sugar]
+        )
+
+    def setUp(self):
+        caches["reciept_cards"].clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def cart_url(self, reciept):
+        return f"/api/recipes/{reciept.id}/shopping_cart/"
+
+    def totals(self):
+        return dict(
+            ShoppingCartIngredient.objects.filter(user=self.user)
+            .values_list("ingredient__name", "amount")
+        )
+
+    def test_add_and_remove(self):
+        first, second = self.reciepts
+        response = self.client.post(self.cart_url(first))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["id"], first.id)
+        response = self.client.post(self.cart_url(first))
+        self.assertEqual(response.status_code, 400)
+        self.client.post(self.cart_url(second))
+        self.assertEqual(self.totals(), {"Мука": 10, "Сахар": 10})
+
+        response = self.client.delete(self.cart_url(first))
+        self.assertEqual(response.status_code, 204)
+        response = self.client.delete(self.cart_url(first))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.totals(), {"Мука": 5, "Сахар": 5})
+        self.client.delete(self.cart_url(second))
+        self.assertEqual(self.totals(), {})
+
+    def test_recipe_update_and_delete(self):
+        first, second = self.reciepts
+        self.user.shopping_cart.add(first, second)
+        response = self.client.patch(
+            f"/api/recipes/{first.id}/",
+            {
+                "ingredients": [{"id": self.flour.id, "amount": 20}],
+                "tags": [],
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.totals(), {"Мука": 25, "Сахар": 5})
+
+        second.delete()
+        self.assertEqual(self.totals(), {"Мука": 20})
+        self.user.shopping_cart.clear()
+        self.assertEqual(self.totals(), {})
+
+    def test_total_created_concurrently_is_incremented(self):
+        bulk_create = ShoppingCartIngredient.objects.bulk_create
+
+        def created_meanwhile(objs, **kwargs):
+            ShoppingCartIngredient.objects.filter(user=self.user).delete()
+            ShoppingCartIngredient.objects.create(
+                user=self.user, ingredient=self.flour, amount=7
+            )
+            return bulk_create(objs, **kwargs)
+
+        with mock.patch.object(
+            ShoppingCartIngredient.objects, "bulk_create", created_meanwhile
+        ):
+            self.user.shopping_cart.add(self.reciepts[0])
+        self.assertEqual(self.totals(), {"Мука": 12, "Сахар": 5})
+
+
+class IngredientSearchTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Ingredient.objects.bulk_create(
+            Ingredient(name=name, measurement_unit="г")
+            for name in ("сахарная пудра", "ванильный сахар", "сахар", "соль")
+        )
+
+    def setUp(self):
+        ingredient_search_cache.invalidate()
+        caches["reference_data"].clear()
+
+    def search(self, name):
+        response = APIClient().get("/api/ingredients/", {"name": name})
+        self.assertEqual(response.status_code, 200)
+        return [item["name"] for item in response.json()]
+
+    def test_prefix_matches_come_first(self):
+        expected = ["сахар", "сахарная пудра", "ванильный сахар"]
+        self.assertEqual(self.search("сахар"), expected)
+        with self.settings(INGREDIENT_SEARCH_CACHE=True):
+            self.assertEqual(self.search("сахар"), expected)
+
+    def test_results_are_limited(self):
+        Ingredient.objects.create(
+            name="тростниковый сахар", measurement_unit="г"
+        )
+        for limit, name, expected in (
+            (2, "сахар", ["сахар", "сахарная пудра"]),
+            (3, "сахар", ["сахар", "сахарная пудра", "ванильный сахар"]),
+            (1, "ахар", ["ванильный сахар"]),
+        ):
+            with self.subTest(limit=limit, name=name):
+                with self.settings(INGREDIENT_SEARCH_LIMIT=limit):
+                    caches["reference_data"].clear()
+                    self.assertEqual(self.search(name), expected)
+                    with self.settings(INGREDIENT_SEARCH_CACHE=True):
+                        caches["reference_data"].clear()
+                        self.assertEqual(self.search(name), expected)
+
+    def test_search_folds_case_of_non_ascii_names(self):
+        Ingredient.objects.create(name="Мука", measurement_unit="г")
+        Ingredient.objects.create(name="Ёжевика", measurement_unit="г")
+        for name, expected in (
+            ("мука", ["Мука"]),
+            ("Мука", ["Мука"]),
+            ("МУ", ["Мука"]),
+            ("ежев", ["Ёжевика"]),
+            ("САХАРНАЯ", ["сахарная пудра"]),
+        ):
+            with self.subTest(name=name):
+                self.assertEqual(self.search(name), expected)
+                with self.settings(INGREDIENT_SEARCH_CACHE=True):
+                    self.assertEqual(self.search(name), expected)
+
+    def test_search_name_follows_renames(self):
+        ingredient = Ingredient.objects.get(name="соль")
+        ingredient.name = "Соль морская"
+        ingredient.save(update_fields=["name"])
+        ingredient.refresh_from_db()
+        self.assertEqual(ingredient.search_name, "соль морская")
+
+    def test_trigram_index_follows_writes(self):
+        ingredient = Ingredient.objects.create(
+            name="тростниковый сахар", measurement_unit="г"
+        )
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.search("остник"), ["тростниковый сахар"])
+        self.assertTrue(
+            any(TRIGRAM_TABLE in query["sql"] for query in queries)
+        )
+        ingredient.name = "кокосовый сахар"
+        ingredient.save()
+        caches["reference_data"].clear()
+        self.assertEqual(self.search("остник"), [])
+        self.assertEqual(self.search("косов"), ["кокосовый сахар"])
+        ingredient.delete()
+        caches["reference_data"].clear()
+        self.assertEqual(self.search("косов"), [])
+
+    def test_cache_is_invalidated_on_write(self):
+        with self.settings(INGREDIENT_SEARCH_CACHE=True):
+            self.assertEqual(self.search("соль"), ["соль"])
+            with self.captureOnCommitCallbacks(execute=True):
+                Ingredient.objects.create(
+                    name="соль морская", measurement_unit="г"
+                )
+            self.assertEqual(self.search("соль"), ["соль", "соль морская"])
+
+
+class LoadIngredientsTest(TestCase):
+    ITEMS = [
+        {"name": 'соус "Терияки"', "measurement_unit": "мл"},
+        {"name": "перец\\чили, молотый", "measurement_unit": "г"},
+        {"name": "café 😀", "measurement_unit": "шт."},
+    ]
+
+    def read_json(self, text, read_size):
+        with mock.patch.object(load_ingredients, "READ_SIZE", read_size):
+            return list(load_ingredients.read_json(StringIO(text)))
+
+    def test_json_reader_survives_chunk_boundaries(self):
+        text = json.dumps(self.ITEMS, ensure_ascii=True, indent=1)
+        expected = [
+            (item["name"], item["measurement_unit"]) for item in self.ITEMS
+        ]
+        for read_size in range(1, len(text) + 1):
+            with self.subTest(read_size=read_size):
+                self.assertEqual(self.read_json(text, read_size), expected)
+        self.assertEqual(self.read_json(" [ ] ", 1), [])
+
+    def test_json_reader_rejects_malformed_input(self):
+        for text in (
+            "",
+            '{"name": "соль", "measurement_unit": "г"}',
+            '[{"name": "соль", "measurement_unit": "г"}',
+            '[{"name": "соль", "measurement_unit": "г"} oops]',
+            '[{"name": "соль"}]',
+            '[{"name": 1, "measurement_unit": "г"}]',
+            '["соль"]',
+        ):
+            for read_size in (1, 4, 1024):
+                with self.subTest(text=text, read_size=read_size):
+                    with self.assertRaises(CommandError):
+                        self.read_json(text, read_size)
+
+    def test_csv_reader(self):
+        text = (
+            'соль,г\r\n\r\n"соус ""Терияки"", острый",мл\r\n'
+            '"тесто\nслоёное",г\r\n'
+        )
+        self.assertEqual(
+            list(load_ingredients.read_csv(StringIO(text, newline=""))),
+            [
+                ("соль", "г"),
+                ('соус "Терияки", острый', "мл"),
+                ("тесто\nслоёное", "г"),
+            ],
+        )
+        with self.assertRaisesMessage(CommandError, "Строка 2"):
+            list(load_ingredients.read_csv(StringIO("соль,г\nперец\n")))
+
+    def test_command_skips_duplicates_and_supports_dry_run(self):
+        Ingredient.objects.create(name="соль", measurement_unit="г")
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, "ingredients.json")
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(
+                [
+                    {"name": "соль", "measurement_unit": "г"},
+                    {"name": "Мука", "measurement_unit": "г"},
+                    {"name": "Мука", "measurement_unit": "г"},
+                ],
+                file,
+            )
+        call_command(
+            "load_ingredients", path, dry_run=True, stdout=StringIO()
+        )
+        self.assertEqual(Ingredient.objects.count(), 1)
+        call_command("load_ingredients", path, batch_size=2, stdout=StringIO())
+        self.assertEqual(
+            sorted(Ingredient.objects.values_list("name", "search_name")),
+            [("Мука", "мука"), ("соль", "соль")],
+        )
+
+
+class TokenBlacklistTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            username="user", email="user@example.com", password="pass"
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def login(self):
+        response = self.client.post(
+            "/api/auth/token/login/",
+            {"email": "user@example.com", "password": "pass"},
+        )
+        return {"HTTP_AUTHORIZATION": f"Token {response.data['auth_token']}"}
+
+    def test_logged_out_token_is_rejected(self):
+        headers = self.login()
+        other_headers = self.login()
+        response = self.client.get("/api/users/me/", **headers)
+        self.assertEqual(response.status_code, 200)
+        response = self.client.post("/api/auth/token/logout/", **headers)
+        self.assertEqual(response.status_code, 204)
+        response = self.client.get("/api/users/me/", **headers)
+        self.assertEqual(response.status_code, 401)
+        response = self.client.get("/api/users/me/", **other_headers)
+        self.assertEqual(response.status_code, 200)
+
+    def test_filter_miss_skips_token_lookup(self):
+        headers = self.login()
+        self.client.get("/api/tags/", **headers)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get("/api/tags/", **headers)
+        blacklist_queries = [
+            q["sql"] for q in queries if "api_blacklistedtokens" in q["sql"]
+        ]
+        self.assertEqual(blacklist_queries, [])
+
+    def test_warm_filter_answers_misses_without_database(self):
+        blacklist = TokenBlacklist()
+        blacklist.warm()
+        with self.assertNumQueries(0):
+            self.assertFalse(blacklist.is_blacklisted("unknown"))
+
+    def test_logout_reaches_other_workers(self):
+        headers = self.login()
+        jti = AccessToken(headers["HTTP_AUTHORIZATION"].split()[1])["jti"]
+        other_worker = TokenBlacklist()
+        self.assertFalse(other_worker.is_blacklisted(jti))
+        response = self.client.post("/api/auth/token/logout/", **headers)
+        self.assertEqual(response.status_code, 204)
+        self.assertTrue(other_worker.is_blacklisted(jti))
+
+    def test_bloom_filter(self):
+        bloom = BloomFilter(100)
+        values = [f"jti-{i}" for i in range(100)]
+        for value in values:
+            bloom.add(value)
+        self.assertTrue(all(value in bloom for value in values))
+        misses = sum(f"other-{i}" in bloom for i in range(10000))
+        self.assertLess(misses, 100)
+
+
+class CachedAuthenticationTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            username="cached", email="cached@example.com", password="pass"
+        )
+
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        response = self.client.post(
+            "/api/auth/token/login/",
+            {"email": "cached@example.com", "password": "pass"},
+        )
+        self.headers = {
+            "HTTP_AUTHORIZATION": f"Token {response.data['auth_token']}"
+        }
+
+    def me(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/users/me/", **self.headers)
+        self.assertEqual(response.status_code, 200)
+        user_queries = [
+            q for q in queries if "reciepts_customuser" in q["sql"]
+        ]
+        return response.json(), user_queries
+
+    def test_user_and_claims_are_cached(self):
+        self.me()
+        with mock.patch.object(
+            AccessToken, "verify", autospec=True
+        ) as verify:
+            data, queries = self.me()
+        verify.assert_not_called()
+        self.assertEqual(queries, [])
+        self.assertEqual(data["username"], "cached")
+
+    def test_user_edit_invalidates_cache(self):
+        self.me()
+        self.user.first_name = "Новое"
+        self.user.save()
+        data, queries = self.me()
+        self.assertEqual(data["first_name"], "Новое")
+        self.assertEqual(len(queries), 1)
+
+    def test_password_change_and_inactive_user(self):
+        self.me()
+        response = self.client.post(
+            "/api/users/set_password/",
+            {"current_password": "pass", "new_password": "N3w-passw0rd!"},
+            **self.headers,
+        )
+        self.assertEqual(response.status_code, 204)
+        _, queries = self.me()
+        self.assertEqual(len(queries), 1)
+
+        CustomUser.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.user.refresh_from_db()
+        self.user.save()
+        response = self.client.get("/api/users/me/", **self.headers)
+        self.assertEqual(response.status_code, 401)
+
+
+class LoginTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            username="login", email="login@example.com", password="pass"
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def login(self, password="pass", **extra):
+        return self.client.post(
+            "/api/auth/token/login/",
+            {"email": "login@example.com", "password": password},
+            **extra,
+        )
+
+    def test_outdated_hash_is_upgraded(self):
+        CustomUser.objects.filter(pk=self.user.pk).update(
+            password=make_password("pass", hasher="pbkdf2_sha1")
+        )
+        self.assertEqual(self.login().status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith("pbkdf2_sha256$"))
+        self.assertEqual(self.login().status_code, 200)
+
+    def test_throttled_by_email(self):
+        with mock.patch.dict(
+            LoginEmailThrottle.THROTTLE_RATES, {"login_email": "2/min"}
+        ):
+            self.assertEqual(self.login("wrong").status_code, 400)
+            self.assertEqual(self.login("wrong").status_code, 400)
+            response = self.login()
+        self.assertEqual(response.status_code, 429)
+        self.assertIn("Retry-After", response)
+
+    def test_spoofed_forwarded_for_is_ignored(self):
+        with mock.patch.dict(
+            LoginIPThrottle.THROTTLE_RATES, {"login_ip": "2/min"}
+        ):
+            for number in range(2):
+                response = self.login(
+                    "wrong", HTTP_X_FORWARDED_FOR=f"10.0.0.{number}"
+                )
+                self.assertEqual(response.status_code, 400)
+            response = self.login(HTTP_X_FORWARDED_FOR="10.0.0.9")
+        self.assertEqual(response.status_code, 429)
+
+    def test_saturated_pool_is_rejected(self):
+        password_pool.verify("pass", self.user.password)
+        slots = threading.BoundedSemaphore(1)
+        slots.acquire()
+        with mock.patch.object(password_pool, "_slots", slots):
+            response = self.login()
+        self.assertEqual(response.status_code, 429)
+
+
+class ReferenceCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.tag = Tag.objects.create(name="Завтрак", slug="breakfast")
+
+    def setUp(self):
+        caches["reference_data"].clear()
+
+    def test_conditional_get_skips_database(self):
+        response = self.client.get("/api/tags/")
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+        self.assertTrue(response.has_header("Last-Modified"))
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                "/api/tags/", HTTP_IF_NONE_MATCH=etag
+            )
+            self.assertEqual(response.status_code, 304)
+            response = self.client.get("/api/tags/")
+            self.assertEqual(response.json()[0]["slug"], "breakfast")
+
+    def test_write_changes_etag(self):
+        etag = self.client.get("/api/tags/")["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            Tag.objects.create(name="Обед", slug="lunch")
+        response = self.client.get("/api/tags/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(len(response.json()), 2)
+
+    def test_version_changes_after_commit(self):
+        state = get_state("tags")
+        with self.captureOnCommitCallbacks(execute=True):
+            Tag.objects.create(name="Обед", slug="lunch")
+            self.assertEqual(get_state("tags"), state)
+        self.assertNotEqual(get_state("tags"), state)
+
+
+class FavoriteTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            username="fan", email="fan@example.com", password="pass"
+        )
+        cls.reciepts = create_reciepts(cls.user, 3, [], [])
+
+    def setUp(self):
+        caches["reciept_cards"].clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def favorite_url(self, reciept):
+        return f"/api/recipes/{reciept.id}/favorite/"
+
+    def test_counter_follows_favorites(self):
+        reciept = self.reciepts[0]
+        response = self.client.post(self.favorite_url(reciept))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["id"], reciept.id)
+        response = self.client.post(self.favorite_url(reciept))
+        self.assertEqual(response.status_code, 400)
+        reciept.refresh_from_db()
+        self.assertEqual(reciept.favorited_count, 1)
+
+        response = self.client.delete(self.favorite_url(reciept))
+        self.assertEqual(response.status_code, 204)
+        response = self.client.delete(self.favorite_url(reciept))
+        self.assertEqual(response.status_code, 400)
+        reciept.refresh_from_db()
+        self.assertEqual(reciept.favorited_count, 0)
+
+    def test_recount_and_popular_ordering(self):
+        popular = self.reciepts[2]
+        self.user.favorites.add(popular)
+        call_command("recount_favorites", stdout=StringIO())
+        popular.refresh_from_db()
+        self.assertEqual(popular.favorited_count, 1)
+        response = self.client.get("/api/recipes/", {"ordering": "popular"})
+        self.assertEqual(response.data["results"][0]["id"], popular.id)
+
+    def test_popular_cursor_is_keyset(self):
+        reciepts = create_reciepts(self.user, 20, [], [])
+        for count, reciept in enumerate(reciepts[::4], start=1):
+            Reciept.objects.filter(pk=reciept.pk).update(
+                favorited_count=count
+            )
+        expected = list(
+            Reciept.objects.order_by("-favorited_count", "-id").values_list(
+                "id", flat=True
+            )
+        )
+        pages = []
+        url = "/api/recipes/"
+        params = {"ordering": "popular", "cursor": "", "limit": 4}
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url, params)
+            self.assertFalse(
+                any("OFFSET" in query["sql"] for query in queries)
+            )
+            pages.append([item["id"] for item in response.data["results"]])
+            url, params = response.data["next"], None
+        self.assertEqual(sum(pages, []), expected)
+
+        response = self.client.get(
+            "/api/recipes/", {"ordering": "popular", "cursor": "", "limit": 4}
+        )
+        response = self.client.get(response.data["next"])
+        response = self.client.get(response.data["previous"])
+        self.assertEqual(
+            [item["id"] for item in response.data["results"]], pages[0]
+        )
+        response = self.client.get(
+            "/api/recipes/", {"ordering": "popular", "cursor": "cD0x"}
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+class SubscriptionTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            username="reader", email="reader@example.com", password="pass"
+        )
+        cls.authors = [
+            CustomUser.objects.create_user(
+                username=f"author{i}",
+                email=f"author{i}@example.com",
+                password="pass",
+            )
+            for i in range(5)
+        ]
+        for author in cls.authors:
+            create_reciepts(author, 4, [], [])
+        Subscription.objects.bulk_create(
+            Subscription(user=cls.user, author=author)
+            for author in cls.authors[:4]
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_subscriptions_are_limited_per_author(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                "/api/users/subscriptions/", {"recipes_limit": 2, "limit": 3}
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 4)
+        self.assertEqual(len(queries), 3)
+        for item in response.data["results"]:
+            self.assertTrue(item["is_subscribed"])
+            self.assertEqual(item["recipes_count"], 4)
+            self.assertEqual(len(item["recipes"]), 2)
+            ids = [recipe["id"] for recipe in item["recipes"]]
+            self.assertEqual(ids, sorted(ids, reverse=True))
+
+    def test_subscribe_and_unsubscribe(self):
+        url = f"/api/users/{self.authors[4].id}/subscribe/"
+        response = self.client.post(url, {}, QUERY_STRING="recipes_limit=1")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data["recipes"]), 1)
+        self.assertEqual(self.client.post(url).status_code, 400)
+        self.assertEqual(self.client.delete(url).status_code, 204)
+        self.assertEqual(self.client.delete(url).status_code, 400)
+
+    def test_is_subscribed_follows_the_viewer(self):
+        author = self.authors[4]
+        reciept = Reciept.objects.filter(author=author).first()
+        caches["reciept_cards"].clear()
+        self.client.get(f"/api/recipes/{reciept.id}/")
+        response = self.client.post(f"/api/users/{author.id}/subscribe/")
+        self.assertTrue(response.data["is_subscribed"])
+        for client, expected in ((self.client, True), (APIClient(), False)):
+            with self.subTest(expected=expected):
+                user = client.get(f"/api/users/{author.id}/").json()
+                self.assertIs(user["is_subscribed"], expected)
+                users = client.get("/api/users/", {"limit": 10}).json()
+                flags = {
+                    item["id"]: item["is_subscribed"]
+                    for item in users["results"]
+                }
+                self.assertIs(flags[author.id], expected)
+                recipe = client.get(f"/api/recipes/{reciept.id}/").json()
+                self.assertIs(recipe["author"]["is_subscribed"], expected)
+                recipes = client.get(
+                    "/api/recipes/", {"author": author.id}
+                ).json()
+                self.assertTrue(
+                    all(
+                        item["author"]["is_subscribed"] is expected
+                        for item in recipes["results"]
+                    )
+                )
+
+    def test_cannot_subscribe_to_self(self):
+        response = self.client.post(f"/api/users/{self.user.id}/subscribe/")
+        self.assertEqual(response.status_code, 400)
+        response = self.client.delete(f"/api/users/{self.user.id}/")
+        self.assertEqual(response.status_code, 405)
+
+
+class SqliteTuningTest(TestCase):
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f"PRAGMA {name}")
+            return cursor.fetchone()[0]
+
+    def test_pragmas_are_applied(self):
+        self.assertEqual(self.pragma("synchronous"), 1)
+        self.assertEqual(self.pragma("busy_timeout"), 5000)
+        self.assertEqual(self.pragma("temp_store"), 2)
+
+
+class ContentAddressedStorageTest(TestCase):
+    def setUp(self):
+        caches["reciept_cards"].clear()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.user = CustomUser.objects.create_user(
+            username="author", email="author@example.com", password="pass"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_concurrent_identical_uploads_share_one_blob(self):
+        def upload(_):
+            return content_storage.save(
+                "images/reciept_images/img.png", ContentFile(b"x" * 100_000)
+            )
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            names = set(executor.map(upload, range(32)))
+        self.assertEqual(len(names), 1)
+        name = names.pop()
+        self.assertTrue(name.startswith("blobs/"))
+        directory = content_storage.path(name).rsplit("/", 1)[0]
+        self.assertEqual(
+            os.listdir(directory), [name.rsplit("/", 1)[1]]
+        )
+
+    def test_blobs_are_reference_counted_and_collected(self):
+        tag = Tag.objects.create(name="Завтрак", slug="breakfast")
+        ingredient = Ingredient.objects.create(
+            name="Соль", measurement_unit="г"
+        )
+        payload = {
+            "name": "Омлет",
+            "text": "Взбить и пожарить.",
+            "cooking_time": 5,
+            "image": IMAGE,
+            "tags": [tag.id],
+            "ingredients": [{"id": ingredient.id, "amount": 1}],
+        }
+        ids = [
+            self.client.post("/api/recipes/", payload, format="json").data[
+                "id"
+            ]
+            for _ in range(2)
+        ]
+        blob = MediaBlob.objects.get()
+        self.assertEqual(blob.ref_count, 2)
+
+        for reciept_id in ids:
+            self.client.delete(f"/api/recipes/{reciept_id}/")
+        blob.refresh_from_db()
+        self.assertEqual(blob.ref_count, 0)
+
+        call_command(
+            "collect_orphan_blobs", grace_minutes=0, stdout=StringIO()
+        )
+        self.assertFalse(MediaBlob.objects.exists())
+        self.assertFalse(content_storage.exists(blob.name))
+
+    def orphan(self, content=b"orphan"):
+        name = content_storage.save("img.png", ContentFile(content))
+        old = datetime.datetime.now().timestamp() - 2 * 60 * 60
+        os.utime(content_storage.path(name), (old, old))
+        MediaBlob.objects.create(name=name)
+        MediaBlob.objects.filter(name=name).update(
+            updated_at=timezone.now() - datetime.timedelta(hours=2)
+        )
+        return name
+
+    def test_collector_keeps_blob_referenced_after_listing(self):
+        name = self.orphan()
+        collect = collect_orphan_blobs.Command._collect
+
+        def referenced_meanwhile(command, pk, blob_name, cutoff):
+            change_ref_count(blob_name, 1)
+            return collect(command, pk, blob_name, cutoff)
+
+        with mock.patch.object(
+            collect_orphan_blobs.Command, "_collect", referenced_meanwhile
+        ):
+            call_command(
+                "collect_orphan_blobs", grace_minutes=1, stdout=StringIO()
+            )
+        self.assertEqual(MediaBlob.objects.get(name=name).ref_count, 1)
+        self.assertTrue(content_storage.exists(name))
+
+    def test_reupload_during_collection_keeps_file(self):
+        name = self.orphan()
+        collect = collect_orphan_blobs.Command._collect
+
+        def uploaded_meanwhile(command, pk, blob_name, cutoff):
+            content_storage.save("img.png", ContentFile(b"orphan"))
+            return collect(command, pk, blob_name, cutoff)
+
+        with mock.patch.object(
+            collect_orphan_blobs.Command, "_collect", uploaded_meanwhile
+        ):
+            call_command(
+                "collect_orphan_blobs", grace_minutes=1, stdout=StringIO()
+            )
+        self.assertTrue(content_storage.exists(name))
+        change_ref_count(name, 1)
+        self.assertEqual(MediaBlob.objects.get(name=name).ref_count, 1)
+
+
+class RecieptFilterTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            username="reader", email="reader@example.com", password="pass"
+        )
+        cls.author = CustomUser.objects.create_user(
+            username="author", email="author@example.com", password="pass"
+        )
+        cls.breakfast, cls.lunch, cls.dinner = Tag.objects.bulk_create(
+            Tag(name=slug, slug=slug)
+            for slug in ("breakfast", "lunch", "dinner")
+        )
+        cls.both = create_reciepts(
+            cls.author, 1, [cls.breakfast, cls.lunch], []
+        )[0]
+        cls.dinner_only = create_reciepts(cls.user, 1, [cls.dinner], [])[0]
+        cls.user.favorites.add(cls.both)
+        cls.user.shopping_cart.add(cls.dinner_only)
+
+    def setUp(self):
+        caches["reciept_cards"].clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def ids(self, query):
+        response = self.client.get(f"/api/recipes/?{query}")
+        self.assertEqual(response.status_code, 200)
+        return [item["id"] for item in response.data["results"]]
+
+    def test_tags_are_or_filtered_without_duplicates(self):
+        self.assertEqual(
+            self.ids("tags=breakfast&tags=lunch"), [self.both.id]
+        )
+        self.assertEqual(
+            self.ids("tags=lunch&tags=dinner"),
+            [self.dinner_only.id, self.both.id],
+        )
+
+    def test_author_and_user_filters(self):
+        self.assertEqual(self.ids(f"author={self.author.id}"), [self.both.id])
+        self.assertEqual(self.ids("is_favorited=1"), [self.both.id])
+        self.assertEqual(
+            self.ids("is_in_shopping_cart=1"), [self.dinner_only.id]
+        )
+        self.client.logout()
+        self.assertEqual(self.ids("is_favorited=1"), [])
+
+    def query_plan(self, queryset):
+        with connection.cursor() as cursor:
+            sql, params = queryset.query.sql_with_params()
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assertNoFullScan(self, plan):
+        for step in plan:
+            self.assertFalse(
+                step.startswith("SCAN") and "USING" not in step,
+                f"Полный просмотр таблицы: {plan}",
+            )
+
+    def test_filters_use_indexes(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("Проверка написана для EXPLAIN QUERY PLAN SQLite.")
+        queryset = Reciept.objects.with_user_flags(self.user).order_by("-id")
+        for data in (
+            {"author": self.author.id},
+            {"tags": "lunch"},
+            {"is_favorited": 1},
+            {"is_in_shopping_cart": 1},
+        ):
+            with self.subTest(data=data):
+                request = Request(APIRequestFactory().get("/", data))
+                request.user = self.user
+                filterset = RecieptFilter(
+                    request.query_params, queryset=queryset, request=request
+                )
+                self.assertNoFullScan(self.query_plan(filterset.qs))
+
+    def test_admin_edits_tags_inline(self):
+        admin = CustomUser.objects.create_superuser(
+            username="admin", email="admin@example.com", password="pass"
+        )
+        self.client.force_login(admin)
+        response = self.client.get(
+            f"/admin/reciepts/reciept/{self.both.id}/change/"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'name="reciepttag_set-TOTAL_FORMS"')
+        self.assertEqual(
+            response.context["inline_admin_formsets"][0]
+            .formset.total_form_count(),
+            3,
+        )
+
+
+@override_settings(SHORT_LINK_FLUSH_SIZE=3, SHORT_LINK_FLUSH_INTERVAL=60)
+class ShortLinkTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            username="linker", email="linker@example.com", password="pass"
+        )
+        cls.reciept = create_reciepts(cls.user, 1, [], [])[0]
+
+    def setUp(self):
+        caches["reciept_cards"].clear()
+        short_link_resolver.clear()
+        hit_counter.flush()
+        self.code = encode(self.reciept.id)
+
+    def test_codes_round_trip(self):
+        for number in (0, 1, 61, 62, 3843, 10**12):
+            self.assertEqual(decode(encode(number)), number)
+        for code in ("", "01", "a-b", "z" * 12):
+            self.assertIsNone(decode(code))
+
+    def test_get_link(self):
+        response = APIClient().get(
+            f"/api/recipes/{self.reciept.id}/get-link/"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.data["short-link"], f"http://testserver/s/{self.code}/"
+        )
+        response = APIClient().get("/api/recipes/0/get-link/")
+        self.assertEqual(response.status_code, 404)
+
+    def test_redirect_is_cached_and_hits_are_batched(self):
+        url = f"/s/{self.code}/"
+        response = self.client.get(url)
+        self.assertRedirects(
+            response,
+            f"/recipes/{self.reciept.id}",
+            fetch_redirect_response=False,
+        )
+        with self.assertNumQueries(0):
+            self.client.get(url)
+        self.reciept.refresh_from_db()
+        self.assertEqual(self.reciept.link_hits, 0)
+        with self.assertNumQueries(1):
+            self.client.get(url)
+        self.reciept.refresh_from_db()
+        self.assertEqual(self.reciept.link_hits, 3)
+
+    def test_unknown_and_deleted_recipes(self):
+        self.assertEqual(self.client.get("/s/zzzz/").status_code, 404)
+        self.client.get(f"/s/{self.code}/")
+        hit_counter.flush()
+        self.reciept.delete()
+        self.assertEqual(
+            self.client.get(f"/s/{self.code}/").status_code, 404
+        )
+
+
+class AsyncReadTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            username="async", email="async@example.com", password="pass"
+        )
+        cls.tag = Tag.objects.create(name="Обед", slug="lunch")
+        ingredient = Ingredient.objects.create(
+            name="Соль", measurement_unit="г"
+        )
+        cls.reciepts = create_reciepts(cls.user, 3, [cls.tag], [ingredient])
+        cls.user.favorites.add(cls.reciepts[0])
+
+    def setUp(self):
+        caches["reciept_cards"].clear()
+        caches["reference_data"].clear()
+        self.token = str(AccessToken.for_user(self.user))
+
+    async def test_reads_match_sync_views(self):
+        paths = (
+            "/api/recipes/?page=2",
+            f"/api/recipes/{self.reciepts[0].id}/",
+            "/api/tags/",
+            f"/api/tags/{self.tag.id}/",
+            "/api/ingredients/?name=со",
+        )
+        with mock.patch.object(
+            AsyncReadView, "fallback", autospec=True
+        ) as fallback:
+            async_responses = [
+                await self.async_client.get(
+                    path, headers={"Authorization": f"Token {self.token}"}
+                )
+                for path in paths
+            ]
+        fallback.assert_not_called()
+        await sync_to_async(caches["reference_data"].clear)()
+        for path, response in zip(paths, async_responses):
+            self.assertEqual(response.status_code, 200)
+            expected = await sync_to_async(self.client.get)(
+                path, HTTP_AUTHORIZATION=f"Token {self.token}"
+            )
+            self.assertEqual(response.json(), expected.json())
+        self.assertTrue(async_responses[1].json()["is_favorited"])
+
+    def test_detail_with_replica_rows_and_cold_cards(self):
+        # Реплика - второе имя той же базы: строки получают
+        # _state.db == "replica_0", как при настоящей реплике.
+        connections["replica_0"] = connections["default"]
+        self.addCleanup(connections.__delitem__, "replica_0")
+        path = f"/api/recipes/{self.reciepts[0].id}/"
+
+        async def get():
+            return await self.async_client.get(
+                path, headers={"Authorization": f"Token {self.token}"}
+            )
+
+        with override_settings(DATABASE_REPLICAS=["replica_0"]):
+            response = async_to_sync(get)()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["name"], self.reciepts[0].name)
+        self.assertTrue(response.json()["is_favorited"])
+
+    async def test_errors_fall_back_to_sync_views(self):
+        response = await self.async_client.get("/api/recipes/0/")
+        self.assertEqual(response.status_code, 404)
+        response = await self.async_client.get("/api/recipes/?page=9")
+        self.assertEqual(response.status_code, 404)
+        response = await self.async_client.post("/api/recipes/", {})
+        self.assertEqual(response.status_code, 401)
+        response = await self.async_client.get(
+            "/api/recipes/", headers={"Authorization": "Token broken"}
+        )
+        self.assertEqual(response.status_code, 401)
+
+        await sync_to_async(token_blacklist.add)(
+            AccessToken(self.token)["jti"],
+            datetime_from_epoch(AccessToken(self.token)["exp"]),
+        )
+        response = await self.async_client.get(
+            "/api/recipes/", headers={"Authorization": f"Token {self.token}"}
+        )
+        self.assertEqual(response.status_code, 401)
+
+
+@override_settings(DATABASE_REPLICAS=["default"])
+class ReplicaRoutingTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.writer, cls.reader = (
+            CustomUser.objects.create_user(
+                username=name, email=f"{name}@example.com", password="pass"
+            )
+            for name in ("writer", "reader")
+        )
+        cls.reciept = create_reciepts(cls.writer, 1, [], [])[0]
+
+    def setUp(self):
+        caches["reciept_cards"].clear()
+        cache.clear()
+        caches["reference_data"].clear()
+        self.clients = {}
+
+    def routed_reads(self, user, method, path):
+        client = self.clients.setdefault(user, APIClient())
+        if user is not None:
+            client.force_authenticate(user)
+        aliases = []
+        db_for_read = ReplicaRouter.db_for_read
+
+        def spy(router, model, **hints):
+            alias = db_for_read(router, model, **hints)
+            aliases.append(alias)
+            return alias
+
+        with mock.patch.object(ReplicaRouter, "db_for_read", spy):
+            response = getattr(client, method)(path)
+        self.assertLess(response.status_code, 400)
+        return set(aliases)
+
+    def test_safe_reads_use_replicas(self):
+        self.assertEqual(
+            self.routed_reads(None, "get", "/api/recipes/"), {"default"}
+        )
+        self.assertEqual(
+            self.routed_reads(self.reader, "get", "/api/tags/"), {"default"}
+        )
+        self.assertEqual(
+            self.routed_reads(self.reader, "get", "/api/users/"), {None}
+        )
+
+    def test_writer_is_pinned_to_primary(self):
+        url = f"/api/recipes/{self.reciept.id}/"
+        self.assertEqual(
+            self.routed_reads(self.writer, "post", url + "favorite/"), {None}
+        )
+        self.assertEqual(self.routed_reads(self.writer, "get", url), {None})
+        self.assertEqual(
+            self.routed_reads(self.reader, "get", url), {"default"}
+        )
+
+    def test_pin_survives_other_workers_and_is_bound_to_user(self):
+        url = f"/api/recipes/{self.reciept.id}/"
+        self.routed_reads(self.writer, "post", url + "favorite/")
+        pin = self.clients[self.writer].cookies[PIN_COOKIE]
+        self.assertTrue(pin["httponly"])
+        cache.clear()
+        self.assertEqual(self.routed_reads(self.writer, "get", url), {None})
+
+        self.clients[self.reader] = APIClient()
+        self.clients[self.reader].cookies[PIN_COOKIE] = pin.value
+        self.assertEqual(
+            self.routed_reads(self.reader, "get", url), {"default"}
+        )
+
+
+class InstrumentationTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            username="metrics", email="metrics@example.com", password="pass"
+        )
+        create_reciepts(cls.user, 3, [], [])
+
+    def setUp(self):
+        caches["reciept_cards"].clear()
+        registry.clear()
+
+    def test_histogram_buckets(self):
+        histogram = Histogram(1, 16)
+        for value in (0.5, 1, 3, 100):
+            histogram.record(value)
+        buckets = dict(histogram.cumulative())
+        self.assertEqual(buckets[1], 2)
+        self.assertEqual(buckets[4], 3)
+        self.assertEqual(buckets[float("inf")], 4)
+        self.assertEqual(histogram.sum, 104.5)
+
+    @override_settings(METRICS_ALLOWED_IPS=["127.0.0.0/8"])
+    def test_metrics_endpoint(self):
+        self.client.get("/api/recipes/")
+        content = self.client.get("/metrics").content.decode()
+        labels = 'route="reciept-list",method="GET"'
+        self.assertIn(
+            f'foodgram_requests_total{{{labels},status="200"}} 1', content
+        )
+        self.assertIn(
+            f"foodgram_request_sql_queries_count{{{labels}}} 1", content
+        )
+        self.assertIn(
+            f'foodgram_request_duration_seconds_bucket{{{labels},le="+Inf"}}',
+            content,
+        )
+        self.assertIn(
+            f"foodgram_request_serializer_duration_seconds_sum{{{labels}}}",
+            content,
+        )
+
+    def test_metrics_endpoint_access(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 404)
+        with override_settings(
+            METRICS_TOKEN="secret", METRICS_ALLOWED_IPS=["10.0.0.0/8"]
+        ):
+            self.assertEqual(self.client.get("/metrics").status_code, 403)
+            response = self.client.get(
+                "/metrics", HTTP_AUTHORIZATION="Bearer wrong"
+            )
+            self.assertEqual(response.status_code, 403)
+            response = self.client.get(
+                "/metrics", HTTP_AUTHORIZATION="Bearer secret"
+            )
+            self.assertEqual(response.status_code, 200)
+            response = self.client.get("/metrics", REMOTE_ADDR="10.1.2.3")
+            self.assertEqual(response.status_code, 200)
+
+    @override_settings(SERVER_TIMING=True, SLOW_REQUEST_MS=0)
+    def test_server_timing_and_slow_log(self):
+        with self.assertLogs("api.metrics", "WARNING") as logs:
+            response = self.client.get("/api/recipes/")
+        self.assertRegex(
+            response["Server-Timing"],
+            r'^total;dur=[\d.]+, db;dur=[\d.]+;desc="\d+", serialize;dur=',
+        )
+        self.assertIn("GET /api/recipes/", logs.output[0])
+
+
+class BenchmarkMixin:
+    def setUp(self):
+        caches["reciept_cards"].clear()
+        self.addCleanup(hit_counter.flush)
+        call_command(
+            "seed_benchmark_data",
+            users=3,
+            recipes=4,
+            tags=3,
+            ingredients=4,
+            ingredients_per_recipe=2,
+            favorites_per_user=2,
+            subscriptions_per_user=1,
+            followed_authors=5,
+            cart_sizes=[3],
+            stdout=StringIO(),
+        )
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def run_benchmark(self, **options):
+        output = os.path.join(self.directory, "results.json")
+        call_command(
+            "run_benchmark",
+            requests=2,
+            warmup=0,
+            output=output,
+            stdout=StringIO(),
+            **options,
+        )
+        with open(output, encoding="utf-8") as file:
+            return json.load(file)
+
+
+class BenchmarkCommandTest(BenchmarkMixin, TestCase):
+    def test_seed(self):
+        self.assertEqual(
+            CustomUser.objects.filter(username__startswith="bench_").count(),
+            7,
+        )
+        self.assertEqual(
+            CustomUser.objects.get(username="bench_follower").follows.count(),
+            5,
+        )
+        self.assertEqual(
+            CustomUser.objects.get(username="bench_cart_3")
+            .shopping_cart.count(),
+            3,
+        )
+        self.assertEqual(Subscription.objects.count(), 8)
+        self.assertEqual(IngredientReciept.objects.count(), 8)
+        self.assertEqual(
+            sum(Reciept.objects.values_list("favorited_count", flat=True)), 6
+        )
+
+    def test_counts_queries_when_query_log_is_full(self):
+        connection.queries_log.extend(
+            [{}] * connection.queries_log.maxlen
+        )
+        report = self.run_benchmark(scenario=["subscriptions"])
+        for result in report["endpoints"].values():
+            self.assertGreater(result["queries"], 0)
+
+    def test_report_and_budget(self):
+        # Вход под нагрузкой шлёт запросы из фоновых потоков, которым нужна
+        # закоммиченная база: он проверяется в LoginBenchmarkTest.
+        groups = [
+            "collection",
+            *(group for group in run_benchmark.SCENARIOS if group != "login"),
+        ]
+        with mock.patch.object(run_benchmark, "WRITE_WORKERS", 1):
+            report = self.run_benchmark(scenario=groups)
+        result = report["endpoints"]["get_recipes_list // User"]
+        self.assertEqual(result["statuses"], {"200": 2})
+        self.assertGreater(result["queries"], 0)
+        self.assertGreaterEqual(result["queries_max"], result["queries"])
+        for key in ("p50_ms", "p95_ms", "p99_ms", "throughput_rps"):
+            self.assertIn(key, result)
+        self.assertEqual(report["dataset"]["recipes"], 4)
+        download = report["endpoints"]["download_shopping_cart // User"]
+        self.assertEqual(download["statuses"], {"200": 2})
+        user = (
+            CustomUser.objects.filter(username__startswith="bench_")
+            .order_by("id")
+            .first()
+        )
+        token = AccessToken.for_user(user)
+        with CaptureQueriesContext(connection) as queries:
+            response = Client().get(
+                download["path"], headers={"Authorization": f"Token {token}"}
+            )
+            b"".join(response.streaming_content)
+        self.assertEqual(download["queries"], len(queries))
+        self.assertEqual(
+            report["endpoints"]["search_ingredients // in-memory index"][
+                "statuses"
+            ],
+            {"200": 2},
+        )
+        feed = report["endpoints"][
+            "get_subscription_list // 5 authors first page"
+        ]
+        self.assertEqual(feed["statuses"], {"200": 2})
+        for name, result in report["endpoints"].items():
+            if " page" in name and "subscription" not in name:
+                self.assertEqual(result["statuses"], {"200": 2}, name)
+        self.assertIn(
+            "get_users_list // cursor deep page", report["endpoints"]
+        )
+        for name in ("get_recipes_list", "get_tag_list"):
+            wsgi = report["endpoints"][f"{name} // wsgi"]
+            asgi = report["endpoints"][f"{name} // asgi"]
+            self.assertEqual(asgi["statuses"], {"200": 2})
+            self.assertEqual(asgi["queries"], wsgi["queries"])
+        for name, code in (
+            ("add_to_favorites", "201"),
+            ("remove_from_favorites", "204"),
+        ):
+            writes = report["endpoints"][f"{name} // 1 writers"]
+            self.assertEqual(writes["statuses"], {code: 2})
+        self.assertEqual(report["database"]["vendor"], "sqlite")
+        self.assertIn("journal_mode", report["database"])
+        redirect = report["endpoints"]["short_link_redirect // cached"]
+        self.assertEqual(redirect["statuses"], {"302": 2})
+        self.assertLessEqual(redirect["queries"], 1)
+        cart = report["endpoints"]["download_shopping_cart // 3 recipes csv"]
+        self.assertEqual(cart["statuses"], {"200": 2})
+        self.assertGreater(cart["peak_memory_kib"], 0)
+
+        budget = os.path.join(self.directory, "budget.json")
+        with open(budget, "w", encoding="utf-8") as file:
+            json.dump({"get_recipes_list // User": {"queries": 0}}, file)
+        with self.assertRaisesMessage(CommandError, "get_recipes_list"):
+            self.run_benchmark(scenario=groups, budget=budget)
+
+
+class SqliteTransactionTest(TransactionTestCase):
+    def test_transactions_take_write_lock_upfront(self):
+        wrapper = transaction.get_connection()
+        if not isinstance(wrapper, sqlite.DatabaseWrapper):
+            self.skipTest("Проверка написана для SQLITE_TUNING.")
+        with CaptureQueriesContext(connection) as queries:
+            with transaction.atomic():
+                Tag.objects.count()
+        self.assertEqual(queries[0]["sql"], "BEGIN IMMEDIATE")
+
+
+class LoginBenchmarkTest(BenchmarkMixin, TransactionTestCase):
+    def test_login_storm(self):
+        report = self.run_benchmark(scenario=["login"])
+        self.assertEqual(report["endpoints"]["login"]["statuses"], {"200": 2})
+        storm = report["endpoints"]["get_recipes_list // login storm"]
+        self.assertEqual(storm["statuses"], {"200": 2})
+        self.assertIn("throughput_rps", storm["background"])
+        self.assertNotIn("500", storm["background"]["statuses"])
+
+
+class ReadSerializerGoldenTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = CustomUser.objects.create_user(
+            username="author",
+            email="author@example.com",
+            password="pass",
+            first_name="Анна",
+            last_name='"Кавычки" \\ слеш',
+            avatar="images/user_avatars/avatar.png",
+        )
+        cls.reader = CustomUser.objects.create_user(
+            username="reader", email="reader@example.com", password="pass"
+        )
+        cls.tags = [
+            Tag.objects.create(name="Завтрак 🍳", slug="breakfast"),
+            Tag.objects.create(name="Ужин", slug="dinner"),
+        ]
+        cls.ingredients = [
+            Ingredient.objects.create(name="Соль", measurement_unit="г"),
+            Ingredient.objects.create(name="Яйцо", measurement_unit="шт."),
+        ]
+        cls.reciepts = create_reciepts(
+            cls.author, 3, cls.tags, cls.ingredients
+        )
+        cls.reciepts[0].text = "Строка\u2028разрыв\u2029 </script> \t\x01"
+        cls.reciepts[0].save(update_fields=["text"])
+        cls.reader.favorites.add(cls.reciepts[1])
+        cls.reader.shopping_cart.add(cls.reciepts[2])
+        Subscription.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        caches["reciept_cards"].clear()
+
+    def assertGolden(self, reference, fast, instance, many=False):
+        request = Request(APIRequestFactory().get("/api/recipes/"))
+        for context in ({}, {"request": request}):
+            with self.subTest(serializer=fast.__name__, context=context):
+                self.assertEqual(
+                    FastJSONRenderer().render(
+                        fast(instance, many=many, context=context).data
+                    ),
+                    JSONRenderer().render(
+                        reference(instance, many=many, context=context).data
+                    ),
+                )
+
+    def expected_reciept(
+        self, reciept, subscribed, favorited=False, in_shopping_cart=False
+    ):
+        image = "http://testserver/media/images/reciept_images/img.png"
+        return {
+            "id": reciept.id,
+            "tags": [
+                {"id": tag.id, "name": tag.name, "slug": tag.slug}
+                for tag in self.tags
+            ],
+            "author": {
+                "id": self.author.id,
+                "username": "author",
+                "email": "author@example.com",
+                "first_name": "Анна",
+                "last_name": '"Кавычки" \\ слеш',
+                "is_subscribed": subscribed,
+                "avatar": (
+                    "http://testserver/media/images/user_avatars/avatar.png"
+                ),
+            },
+            "ingredients": [
+                {
+                    "id": ingredient.id,
+                    "name": ingredient.name,
+                    "measurement_unit": ingredient.measurement_unit,
+                    "amount": 5,
+                }
+                for ingredient in self.ingredients
+            ],
+            "is_favorited": favorited,
+            "is_in_shopping_cart": in_shopping_cart,
+            "name": reciept.name,
+            "image": image,
+            "thumbnails": {size: image for size in ("list", "card", "detail")},
+            "text": reciept.text,
+            "cooking_time": 10,
+        }
+
+    def test_served_reciepts(self):
+        reader = APIClient()
+        reader.force_authenticate(self.reader)
+        flags = {
+            self.reciepts[1].pk: {"favorited": True},
+            self.reciepts[2].pk: {"in_shopping_cart": True},
+        }
+        for client, subscribed, user_flags in (
+            (APIClient(), False, {}),
+            (reader, True, flags),
+        ):
+            expected = [
+                self.expected_reciept(
+                    reciept, subscribed, **user_flags.get(reciept.pk, {})
+                )
+                for reciept in reversed(self.reciepts)
+            ]
+            caches["reciept_cards"].clear()
+            # Первый проход собирает карточки, второй берёт их из кэша.
+            for cards in ("cold", "warm"):
+                with self.subTest(subscribed=subscribed, cards=cards):
+                    response = client.get("/api/recipes/", {"limit": 2})
+                    self.assertEqual(
+                        response.content,
+                        JSONRenderer().render(
+                            {
+                                "count": 3,
+                                "next": "http://testserver/api/recipes/"
+                                "?limit=2&page=2",
+                                "previous": None,
+                                "results": expected[:2],
+                            }
+                        ),
+                    )
+                    response = client.get(
+                        f"/api/recipes/{self.reciepts[0].pk}/"
+                    )
+                    self.assertEqual(
+                        response.content, JSONRenderer().render(expected[2])
+                    )
+
+    def test_users_and_references(self):
+        for user in (AnonymousUser(), self.reader):
+            self.assertGolden(
+                UserSerializer,
+                UserReadSerializer,
+                CustomUser.objects.with_subscription_flag(user).order_by("id"),
+                many=True,
+            )
+        for reference, fast, model in (
+            (TagSerializer, TagReadSerializer, Tag),
+            (IngredientSerializer, IngredientReadSerializer, Ingredient),
+        ):
+            queryset = model.objects.order_by("id")
+            self.assertGolden(reference, fast, queryset, many=True)
+            self.assertGolden(
+                reference, fast, queryset.values(*fast.fields), many=True
+            )
+
+    def test_endpoints(self):
+        self.assertEqual(
+            APIClient().get("/api/tags/").content,
+            JSONRenderer().render(
+                TagSerializer(Tag.objects.all(), many=True).data
+            ),
+        )
+
+    def test_renderer_matches_json_renderer(self):
+        data = {
+            "date": datetime.datetime(2024, 1, 2, 3, 4, 5, 678901),
+            "aware": datetime.datetime(
+                2024, 1, 2, tzinfo=datetime.timezone.utc
+            ),
+            "lazy": gettext_lazy("Теги"),
+            "decimal": decimal.Decimal("1.25"),
+            1: [None, True, 1.5, "\u2028"],
+        }
+        self.assertEqual(
+            FastJSONRenderer().render(data), JSONRenderer().render(data)
+        )
+        self.assertEqual(FastJSONRenderer().render(None), b"")
+        media_type = "application/json; indent=2"
+        self.assertEqual(
+            FastJSONRenderer().render(data, media_type),
+            JSONRenderer().render(data, media_type),
+        )
+
+
+class RecieptCardCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = CustomUser.objects.create_user(
+            username="reader", email="reader@example.com", password="pass"
+        )
+        cls.author = CustomUser.objects.create_user(
+            username="author", email="author@example.com", password="pass"
+        )
+        cls.tag = Tag.objects.create(name="Завтрак", slug="breakfast")
+        cls.ingredient = Ingredient.objects.create(
+            name="Соль", measurement_unit="г"
+        )
+        cls.reciepts = create_reciepts(
+            cls.author, 3, [cls.tag], [cls.ingredient]
+        )
+        cls.reader.favorites.add(cls.reciepts[0])
+
+    def setUp(self):
+        caches["reciept_cards"].clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+
+    def first(self, client=None):
+        response = (client or self.client).get(
+            f"/api/recipes/{self.reciepts[0].pk}/"
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_warm_list_reads_only_the_page(self):
+        self.client.get("/api/recipes/", {"limit": 3})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/recipes/", {"limit": 3})
+        self.assertEqual(len(response.data["results"]), 3)
+        self.assertFalse(
+            any(
+                table in query["sql"]
+                for query in queries
+                for table in ("reciepts_tag", "reciepts_ingredient")
+            )
+        )
+
+    def test_user_flags_are_not_cached(self):
+        self.assertTrue(self.first()["is_favorited"])
+        self.assertFalse(self.first(APIClient())["is_favorited"])
+
+    def test_cards_are_built_from_the_primary(self):
+        stale = Reciept.objects.with_related().get(pk=self.reciepts[0].pk)
+        stale._state.db = "replica_0"
+        Reciept.objects.filter(pk=stale.pk).update(name="С основной базы")
+        with override_settings(
+            DATABASE_REPLICAS=["replica_0"]
+        ), request_routing() as routing:
+            routing.use_replica = True
+            cards = get_cards([stale, {"id": self.reciepts[1].pk}])
+        self.assertEqual(cards[card_key(stale.pk)]["name"], "С основной базы")
+        self.assertIn(card_key(self.reciepts[1].pk), cards)
+        self.assertTrue(self.first()["is_favorited"])
+
+    def test_serialization_does_not_query(self):
+        rows = list(
+            Reciept.objects.with_user_flags(self.reader).values(
+                *RecieptCardSerializer.fields
+            )
+        )
+        serializer = RecieptCardSerializer(rows, many=True)
+        with self.assertRaises(RuntimeError):
+            serializer.data
+        serializer.load()
+        with self.assertNumQueries(0):
+            self.assertEqual(len(serializer.data), 3)
+
+    async def test_async_load_from_replica_rows(self):
+        stale = await Reciept.objects.with_user_flags(self.reader).aget(
+            pk=self.reciepts[0].pk
+        )
+        stale._state.db = "replica_0"
+        await Reciept.objects.filter(pk=stale.pk).aupdate(name="С основной")
+        serializer = await RecieptCardSerializer(stale).aload()
+        self.assertEqual(serializer.data["name"], "С основной")
+        self.assertTrue(serializer.data["is_favorited"])
+
+    def test_invalidation(self):
+        self.first()
+        self.client.force_authenticate(self.author)
+        self.client.patch(
+            f"/api/recipes/{self.reciepts[0].pk}/",
+            {"name": "Омлет"},
+            format="json",
+        )
+        self.assertEqual(self.first()["name"], "Омлет")
+
+        row = IngredientReciept.objects.get(reciept=self.reciepts[0])
+        row.amount = 42
+        row.save()
+        self.assertEqual(self.first()["ingredients"][0]["amount"], 42)
+
+        self.ingredient.name = "Перец"
+        self.ingredient.save()
+        self.assertEqual(self.first()["ingredients"][0]["name"], "Перец")
+
+        self.tag.name = "Ужин"
+        self.tag.save()
+        self.assertEqual(self.first()["tags"][0]["name"], "Ужин")
+
+        other = Tag.objects.create(name="Обед", slug="lunch")
+        self.reciepts[0].tags.add(other)
+        self.assertEqual(len(self.first()["tags"]), 2)
+
+        self.author.first_name = "Анна"
+        self.author.save()
+        self.assertEqual(self.first()["author"]["first_name"], "Анна")
+
+        self.reciepts[0].delete()
+        self.assertEqual(
+            self.client.get(
+                f"/api/recipes/{self.reciepts[0].pk}/"
+            ).status_code,
+            404,
+        )
+
+    def test_login_does_not_invalidate(self):
+        self.first()
+        self.author.save(update_fields=["last_login"])
+        self.assertIsNotNone(
+            caches["reciept_cards"].get(card_key(self.reciepts[0].pk))
+        )
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class RecieptSearchTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            username="author", email="author@example.com", password="pass"
+        )
+        cls.tag = Tag.objects.create(name="Завтрак", slug="breakfast")
+        cls.salt = Ingredient.objects.create(name="Соль", measurement_unit="г")
+        cls.egg = Ingredient.objects.create(
+            name="Яйцо", measurement_unit="шт."
+        )
+        names = ("Борщ", "Омлет", "Салат")
+        texts = ("Варить долго.", "Подавать к борщу.", "Нарезать.")
+        cls.reciepts = Reciept.objects.bulk_create(
+            Reciept(
+                name=name,
+                image="images/reciept_images/img.png",
+                cooking_time=10,
+                text=text,
+                author=cls.user,
+            )
+            for name, text in zip(names, texts)
+        )
+        IngredientReciept.objects.bulk_create(
+            [
+                IngredientReciept(
+                    reciept=cls.reciepts[0], ingredient=cls.salt, amount=5
+                ),
+                IngredientReciept(
+                    reciept=cls.reciepts[1], ingredient=cls.egg, amount=2
+                ),
+            ]
+        )
+        cls.reciepts[1].tags.add(cls.tag)
+        call_command("rebuild_search_index", stdout=StringIO())
+
+    def setUp(self):
+        caches["reciept_cards"].clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def search(self, query, **params):
+        response = self.client.get(
+            "/api/recipes/", {"search": query, **params}
+        )
+        self.assertEqual(response.status_code, 200)
+        return [item["name"] for item in response.data["results"]]
+
+    def test_ranking_and_fields(self):
+        self.assertEqual(self.search("борщ", limit=10), ["Борщ", "Омлет"])
+        self.assertEqual(self.search("яйц"), ["Омлет"])
+        self.assertEqual(self.search("нарезать"), ["Салат"])
+        self.assertEqual(self.search("борщ", tags="breakfast"), ["Омлет"])
+        self.assertEqual(self.search("!!!"), [])
+
+    def test_cursor_pages_follow_rank(self):
+        response = self.client.get(
+            "/api/recipes/", {"search": "борщ", "cursor": "", "limit": 1}
+        )
+        self.assertEqual(response.data["results"][0]["name"], "Борщ")
+        response = self.client.get(response.data["next"])
+        self.assertEqual(response.data["results"][0]["name"], "Омлет")
+        self.assertIsNone(response.data["next"])
+
+    def test_index_follows_writes(self):
+        response = self.client.post(
+            "/api/recipes/",
+            {
+                "name": "Запеканка",
+                "text": "Запечь.",
+                "cooking_time": 30,
+                "image": IMAGE,
+                "tags": [self.tag.id],
+                "ingredients": [{"id": self.egg.id, "amount": 3}],
+            },
+            format="json",
+        )
+        reciept_id = response.data["id"]
+        self.assertEqual(self.search("яйцо"), ["Запеканка", "Омлет"])
+
+        self.client.patch(
+            f"/api/recipes/{reciept_id}/",
+            {
+                "name": "Сырники",
+                "ingredients": [{"id": self.salt.id, "amount": 1}],
+            },
+            format="json",
+        )
+        self.assertEqual(self.search("запеканка"), [])
+        self.assertEqual(self.search("сырники соль"), ["Сырники"])
+
+        self.salt.name = "Сахар"
+        self.salt.save()
+        self.assertCountEqual(
+            self.search("сахар", limit=10), ["Борщ", "Сырники"]
+        )
+
+        Reciept.objects.get(pk=reciept_id).delete()
+        self.assertEqual(self.search("сырники"), [])
@@ -1,7 +1,15 @@
-from django.urls import include, path
+from django.urls import include, path, re_path
 from rest_framework import routers
 from rest_framework_simplejwt.views import TokenObtainPairView
 
+from api.async_views import (
+    AsyncIngredientDetailView,
+    AsyncIngredientListView,
+    AsyncRecieptDetailView,
+    AsyncRecieptListView,
+    AsyncTagDetailView,
+    AsyncTagListView,
+)
 from api.views import (
     UserAndSignUpViewSet,
     CurrentUserView,
@@ -36,5 +44,25 @@ urlpatterns = [
         ChangePasswordView.as_view(),
         name="change_password",
     ),
+    path("recipes/", AsyncRecieptListView.as_view(), name="reciept-list"),
+    re_path(
+        r"^recipes/(?P<pk>\d+)/$",
+        AsyncRecieptDetailView.as_view(),
+        name="reciept-detail",
+    ),
+    path("tags/", AsyncTagListView.as_view(), name="tag-list"),
+    re_path(
+        r"^tags/(?P<pk>\d+)/$", AsyncTagDetailView.as_view(), name="tag-detail"
+    ),
+    path(
+        "ingredients/",
+        AsyncIngredientListView.as_view(),
+        name="ingredient-list",
+    ),
+    re_path(
+        r"^ingredients/(?P<pk>\d+)/$",
+        AsyncIngredientDetailView.as_view(),
+        name="ingredient-detail",
+    ),
     path("", include(router.urls)),
 ]
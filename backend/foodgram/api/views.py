@@ -1,31 +1,77 @@
-from rest_framework import viewsets, status, views, permissions, filters
+from rest_framework import (
+    viewsets,
+    mixins,
+    status,
+    views,
+    permissions,
+    filters,
+)
+from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework_simplejwt.tokens import AccessToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
 from rest_framework.exceptions import ValidationError
-from django.http import HttpResponseNotAllowed
+from django.conf import settings
+from django.http import (
+    Http404,
+    HttpResponseNotAllowed,
+    HttpResponseRedirect,
+    StreamingHttpResponse,
+)
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Avg
+from django.db import transaction
+from django.db.models import Avg, F
 
-from reciepts.models import CustomUser, Tag, Ingredient, Reciept
-from api.models import BlacklistedTokens
+from reciepts.models import (
+    CustomUser,
+    Tag,
+    Ingredient,
+    Reciept,
+    Subscription,
+)
+from api.authentication import bump_user_version
+from api.blacklist import token_blacklist
+from api.db_router import ReplicaReadMixin
+from api.exceptions import InvalidData
+from api.filters import RecieptFilter
+from api.ingredient_search import (
+    ingredient_search_cache,
+    search_ingredients,
+)
 from api.pagination import PageLimitPagination
+from api.read_serializers import (
+    FastReadMixin,
+    IngredientReadSerializer,
+    TagReadSerializer,
+    UserReadSerializer,
+)
+from api.reciept_cards import RecieptCardSerializer
+from api.search import SEARCH_ORDERING
+from api.reference_cache import ReferenceCacheMixin
+from api.permissions import IsAuthorOrReadOnly
 from api.serializers import (
-    RecieptSerializer,
     UserSerializer,
     SignUpSerializer,
     CustomTokenObtainSerializer,
     ChangePasswordSerializer,
     IngredientSerializer,
     RecieptCreateSerializer,
+    RecieptMinifiedSerializer,
     AvatarSerializer,
     TagSerializer,
+    UserWithRecipesSerializer,
 )
+from api.throttling import LoginEmailThrottle, LoginIPThrottle
+from api.shopping_cart import SHOPPING_CART_FORMATS, shopping_cart_totals
+from api.short_links import encode, hit_counter, short_link_resolver
 
 
 class CustomTokenObtainView(TokenObtainPairView):
     serializer_class = CustomTokenObtainSerializer
+    throttle_classes = (LoginIPThrottle, LoginEmailThrottle)
 
 
 class LogoutView(views.APIView):
@@ -39,8 +85,12 @@ class LogoutView(views.APIView):
         token = auth_header.split(" ")[1]
 
         try:
-            AccessToken(token)
-            BlacklistedTokens.objects.create(token=token)
+            access_token = AccessToken(token)
+            token_blacklist.add(
+                access_token["jti"],
+                datetime_from_epoch(access_token["exp"]),
+            )
+            bump_user_version(request.user.id)
             return Response(
                 {"detail": "Токен успешно удален."},
                 status=status.HTTP_204_NO_CONTENT,
@@ -49,12 +99,32 @@ class LogoutView(views.APIView):
             return Response(status=status.HTTP_400_BAD_REQUEST)
 
 
-class UserAndSignUpViewSet(viewsets.ModelViewSet):
-    http_method_names = ["get", "post", "head", "options", "trace"]
-    queryset = CustomUser.objects.all()
+class UserAndSignUpViewSet(
+    FastReadMixin,
+    mixins.CreateModelMixin,
+    mixins.ListModelMixin,
+    mixins.RetrieveModelMixin,
+    viewsets.GenericViewSet,
+):
+    http_method_names = [
+        "get",
+        "post",
+        "delete",
+        "head",
+        "options",
+        "trace",
+    ]
+    queryset = CustomUser.objects.order_by("id")
     serializer_class = UserSerializer
+    read_serializer_class = UserReadSerializer
     permission_classes = (permissions.AllowAny,)
     pagination_class = PageLimitPagination
+    cursor_ordering = ("id",)
+
+    def get_queryset(self):
+        return (
+            super().get_queryset().with_subscription_flag(self.request.user)
+        )
 
     def create(self, request, *args, **kwargs):
         serializer = SignUpSerializer(data=request.data)
@@ -63,14 +133,79 @@ class UserAndSignUpViewSet(viewsets.ModelViewSet):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    def _recipes_limit(self):
+        recipes_limit = self.request.query_params.get("recipes_limit")
+        if recipes_limit is None:
+            return None
+        if not recipes_limit.isdigit():
+            raise InvalidData("recipes_limit")
+        return int(recipes_limit)
+
+    def _authors_queryset(self):
+        return (
+            CustomUser.objects.with_recipes(self._recipes_limit())
+            .with_subscription_flag(self.request.user)
+            .order_by("id")
+        )
+
+    @action(
+        detail=False,
+        methods=["get"],
+        permission_classes=(permissions.IsAuthenticated,),
+    )
+    def subscriptions(self, request):
+        authors = self._authors_queryset().filter(
+            followers__user=request.user
+        )
+        page = self.paginate_queryset(authors)
+        serializer = UserWithRecipesSerializer(
+            page, many=True, context=self.get_serializer_context()
+        )
+        return self.get_paginated_response(serializer.data)
+
+    @action(
+        detail=True,
+        methods=["post", "delete"],
+        permission_classes=(permissions.IsAuthenticated,),
+    )
+    def subscribe(self, request, pk=None):
+        author = get_object_or_404(CustomUser, pk=pk)
+        if request.method == "DELETE":
+            deleted, _ = Subscription.objects.filter(
+                user=request.user, author=author
+            ).delete()
+            if not deleted:
+                raise ValidationError(
+                    {"errors": "Вы не подписаны на этого пользователя."}
+                )
+            return Response(status=status.HTTP_204_NO_CONTENT)
+
+        if author == request.user:
+            raise ValidationError(
+                {"errors": "Нельзя подписаться на самого себя."}
+            )
+        _, created = Subscription.objects.get_or_create(
+            user=request.user, author=author
+        )
+        if not created:
+            raise ValidationError(
+                {"errors": "Вы уже подписаны на этого пользователя."}
+            )
+        serializer = UserWithRecipesSerializer(
+            self._authors_queryset().get(pk=author.pk),
+            context=self.get_serializer_context(),
+        )
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
 
 class CurrentUserView(views.APIView):
     http_method_names = ["get", "head", "options", "trace"]
     permission_classes = (permissions.IsAuthenticated,)
+    renderer_classes = FastReadMixin.renderer_classes
 
     def get(self, request):
         user = request.user
-        serializer = UserSerializer(user)
+        serializer = UserReadSerializer(user)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
@@ -111,35 +246,222 @@ class ChangePasswordView(views.APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class TagViewSet(viewsets.ModelViewSet):
+class TagViewSet(
+    ReplicaReadMixin,
+    ReferenceCacheMixin,
+    FastReadMixin,
+    viewsets.ModelViewSet,
+):
     http_method_names = ["get", "head", "options", "trace"]
     serializer_class = TagSerializer
+    read_serializer_class = TagReadSerializer
     queryset = Tag.objects.all()
     pagination_class = None
     permission_classes = (permissions.AllowAny,)
+    authentication_classes = ()
+    cache_namespace = "tags"
 
 
-class IngredientViewSet(viewsets.ModelViewSet):
+class IngredientViewSet(
+    ReplicaReadMixin,
+    ReferenceCacheMixin,
+    FastReadMixin,
+    viewsets.ModelViewSet,
+):
     http_method_names = ["get", "head", "options", "trace"]
     serializer_class = IngredientSerializer
+    read_serializer_class = IngredientReadSerializer
     queryset = Ingredient.objects.all()
     pagination_class = None
     permission_classes = (permissions.AllowAny,)
+    authentication_classes = ()
+    cache_namespace = "ingredients"
+
+    def list(self, request, *args, **kwargs):
+        if request.query_params.get("name"):
+            return self._cached_response(self._search_list, request)
+        return super().list(request, *args, **kwargs)
+
+    def search(self, name):
+        if settings.INGREDIENT_SEARCH_CACHE:
+            return ingredient_search_cache.search(name)
+        return search_ingredients(self.get_queryset(), name)
+
+    def _search_list(self, request):
+        serializer = self.get_serializer(
+            self.search(request.query_params["name"]), many=True
+        )
+        return Response(serializer.data)
 
 
-class RecieptViewSet(viewsets.ModelViewSet):
+class RecieptViewSet(
+    ReplicaReadMixin, FastReadMixin, viewsets.ModelViewSet
+):
     queryset = Reciept.objects.all()
     serializer_class = RecieptCreateSerializer
-    permission_classes = (permissions.AllowAny,)
+    read_serializer_class = RecieptCardSerializer
+    permission_classes = (IsAuthorOrReadOnly,)
+    pagination_class = PageLimitPagination
+    filter_backends = (DjangoFilterBackend,)
+    filterset_class = RecieptFilter
+
+    @property
+    def cursor_ordering(self):
+        if self.request.query_params.get("search"):
+            return SEARCH_ORDERING
+        return self.list_ordering
+
+    @property
+    def list_ordering(self):
+        if self.request.query_params.get("ordering") == "popular":
+            return ("-favorited_count", "-id")
+        return ("-id",)
+
+    def get_read_fields(self):
+        fields = super().get_read_fields()
+        if self.request.query_params.get("search"):
+            return (*fields, "search_rank")
+        return fields
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        if isinstance(serializer, RecieptCardSerializer) and args:
+            serializer.load()
+        return serializer
+
+    def get_queryset(self):
+        return (
+            super()
+            .get_queryset()
+            .with_related()
+            .with_user_flags(self.request.user)
+            .order_by(*self.list_ordering)
+        )
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         recept = self.perform_create(serializer)
+        return self._read_response(recept, status.HTTP_201_CREATED)
 
-        front_ser = RecieptSerializer(instance=recept)
+    def update(self, request, *args, **kwargs):
+        partial = kwargs.pop("partial", False)
+        serializer = self.get_serializer(
+            self.get_object(), data=request.data, partial=partial
+        )
+        serializer.is_valid(raise_exception=True)
+        recept = self.perform_update(serializer)
+        return self._read_response(recept, status.HTTP_200_OK)
 
-        return Response(front_ser.data, status=status.HTTP_201_CREATED)
+    @action(
+        detail=False,
+        methods=["get"],
+        permission_classes=(permissions.IsAuthenticated,),
+    )
+    def download_shopping_cart(self, request):
+        file_type = request.query_params.get("type", "txt")
+        if file_type not in SHOPPING_CART_FORMATS:
+            raise InvalidData("type")
+        render, content_type = SHOPPING_CART_FORMATS[file_type]
+        response = StreamingHttpResponse(
+            render(shopping_cart_totals(request.user)),
+            content_type=content_type,
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="shopping_cart.{file_type}"'
+        )
+        return response
+
+    @action(
+        detail=True,
+        methods=["post", "delete"],
+        permission_classes=(permissions.IsAuthenticated,),
+    )
+    def favorite(self, request, pk=None):
+        reciept = get_object_or_404(Reciept, pk=pk)
+        favorites = CustomUser.favorites.through.objects
+        with transaction.atomic():
+            if request.method == "POST":
+                _, created = favorites.get_or_create(
+                    customuser=request.user, reciept=reciept
+                )
+                if not created:
+                    raise ValidationError(
+                        {"errors": "Рецепт уже в избранном."}
+                    )
+                delta = 1
+            else:
+                deleted, _ = favorites.filter(
+                    customuser=request.user, reciept=reciept
+                ).delete()
+                if not deleted:
+                    raise ValidationError(
+                        {"errors": "Рецепта нет в избранном."}
+                    )
+                delta = -1
+            Reciept.objects.filter(pk=reciept.pk).update(
+                favorited_count=F("favorited_count") + delta
+            )
+        if delta < 0:
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        serializer = RecieptMinifiedSerializer(
+            reciept, context=self.get_serializer_context()
+        )
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @action(
+        detail=True,
+        methods=["post", "delete"],
+        permission_classes=(permissions.IsAuthenticated,),
+    )
+    def shopping_cart(self, request, pk=None):
+        reciept = get_object_or_404(Reciept, pk=pk)
+        with transaction.atomic():
+            in_cart = request.user.shopping_cart.filter(
+                pk=reciept.pk
+            ).exists()
+            if request.method == "DELETE":
+                if not in_cart:
+                    raise ValidationError(
+                        {"errors": "Рецепта нет в списке покупок."}
+                    )
+                request.user.shopping_cart.remove(reciept)
+                return Response(status=status.HTTP_204_NO_CONTENT)
+            if in_cart:
+                raise ValidationError(
+                    {"errors": "Рецепт уже в списке покупок."}
+                )
+            request.user.shopping_cart.add(reciept)
+        serializer = RecieptMinifiedSerializer(
+            reciept, context=self.get_serializer_context()
+        )
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=["get"], url_path="get-link")
+    def get_link(self, request, pk=None):
+        reciept = get_object_or_404(Reciept.objects.only("id"), pk=pk)
+        short_link = reverse("short_link", args=[encode(reciept.pk)])
+        return Response(
+            {"short-link": request.build_absolute_uri(short_link)}
+        )
 
     def perform_create(self, serializer) -> Reciept:
         return serializer.save()
+
+    def perform_update(self, serializer) -> Reciept:
+        return serializer.save()
+
+    def _read_response(self, recept: Reciept, status_code: int) -> Response:
+        front_ser = RecieptCardSerializer(
+            instance=self.get_queryset().get(pk=recept.pk),
+            context=self.get_serializer_context(),
+        ).load()
+        return Response(front_ser.data, status=status_code)
+
+
+def short_link_redirect(request, code):
+    reciept_id = short_link_resolver.resolve(code)
+    if reciept_id is None:
+        raise Http404
+    hit_counter.hit(reciept_id)
+    return HttpResponseRedirect(f"/recipes/{reciept_id}")
@@ -36,6 +36,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "api.metrics.InstrumentationMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -44,6 +45,7 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "api.middleware.JWTBlacklistMiddleware",
+    "api.db_router.ReplicaRoutingMiddleware",
 ]
 
 ROOT_URLCONF = "foodgram.urls"
@@ -66,11 +68,104 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "foodgram.wsgi.application"
 
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+DB_ENGINE = os.getenv("DB_ENGINE", "sqlite")
+
+SQLITE_TUNING = os.getenv("SQLITE_TUNING", "True").lower() in ("true", "1")
+
+if DB_ENGINE == "postgresql":
+    # Драйвер ставится отдельно: uv sync --extra postgres.
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.postgresql",
+            "NAME": os.getenv("POSTGRES_DB", "foodgram"),
+            "USER": os.getenv("POSTGRES_USER", "foodgram"),
+            "PASSWORD": os.getenv("POSTGRES_PASSWORD", ""),
+            "HOST": os.getenv("DB_HOST", "localhost"),
+            "PORT": os.getenv("DB_PORT", "5432"),
+            "CONN_MAX_AGE": int(os.getenv("CONN_MAX_AGE", 60)),
+            "CONN_HEALTH_CHECKS": True,
+            # PgBouncer в режиме transaction pooling не поддерживает
+            # серверные курсоры, которые использует QuerySet.iterator().
+            "DISABLE_SERVER_SIDE_CURSORS": os.getenv(
+                "DB_PGBOUNCER", "False"
+            ).lower()
+            in ("true", "1"),
+            "OPTIONS": {
+                "connect_timeout": int(os.getenv("DB_CONNECT_TIMEOUT", 5)),
+            },
+        }
+    }
+else:
+    DATABASES = {
+        "default": {
+            "ENGINE": (
+                "api.sqlite" if SQLITE_TUNING else "django.db.backends.sqlite3"
+            ),
+            "NAME": os.getenv("SQLITE_PATH", BASE_DIR / "db.sqlite3"),
+            "CONN_MAX_AGE": int(os.getenv("CONN_MAX_AGE", 60)),
+            "OPTIONS": {"timeout": 20},
+        }
+    }
+
+DATABASE_REPLICAS = []
+
+for index, replica in enumerate(
+    filter(None, os.getenv("DB_REPLICAS", "").split(","))
+):
+    alias = f"replica_{index}"
+    DATABASES[alias] = {
+        **DATABASES["default"],
+        ("HOST" if DB_ENGINE == "postgresql" else "NAME"): replica.strip(),
+        "TEST": {"MIRROR": "default"},
     }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ["api.db_router.ReplicaRouter"]
+
+REPLICA_PIN_SECONDS = int(os.getenv("REPLICA_PIN_SECONDS", 5))
+
+SQLITE_PRAGMAS = (
+    {
+        "journal_mode": "wal",
+        "synchronous": "normal",
+        "busy_timeout": 5000,
+        "mmap_size": 256 * 1024 * 1024,
+        "temp_store": "memory",
+    }
+    if SQLITE_TUNING
+    else {}
+)
+
+LOCMEM_CACHE = "django.core.cache.backends.locmem.LocMemCache"
+
+# Инвалидация карточек рецептов доходит только до кэша текущего процесса,
+# поэтому с LocMemCache по умолчанию их срок жизни — минута. Для общего
+# бэкенда (Redis, Memcached) срок можно оставить длинным.
+RECIEPT_CARD_CACHE_BACKEND = os.getenv(
+    "RECIEPT_CARD_CACHE_BACKEND", LOCMEM_CACHE
+)
+
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv("CACHE_BACKEND", LOCMEM_CACHE),
+        "LOCATION": os.getenv("CACHE_LOCATION", ""),
+    },
+    "reference_data": {
+        "BACKEND": os.getenv("REFERENCE_CACHE_BACKEND", LOCMEM_CACHE),
+        "LOCATION": os.getenv("REFERENCE_CACHE_LOCATION", "reference-data"),
+    },
+    "reciept_cards": {
+        "BACKEND": RECIEPT_CARD_CACHE_BACKEND,
+        "LOCATION": os.getenv("RECIEPT_CARD_CACHE_LOCATION", "reciept-cards"),
+        "TIMEOUT": int(
+            os.getenv(
+                "RECIEPT_CARD_TTL",
+                60
+                if RECIEPT_CARD_CACHE_BACKEND == LOCMEM_CACHE
+                else 24 * 60 * 60,
+            )
+        ),
+    },
 }
 
 REST_FRAMEWORK = {
@@ -81,12 +176,19 @@ REST_FRAMEWORK = {
         "rest_framework.permissions.IsAuthenticatedOrReadOnly"
     ],
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "api.authentication.CachedJWTAuthentication",
     ),
     "DEFAULT_PAGINATION_CLASS": (
         "rest_framework.pagination.PageNumberPagination"
     ),
     "PAGE_SIZE": 2,
+    # Число доверенных прокси перед приложением. При 0 троттлинг берёт
+    # адрес из REMOTE_ADDR и не верит клиентскому X-Forwarded-For.
+    "NUM_PROXIES": int(os.getenv("NUM_PROXIES", 0)),
+    "DEFAULT_THROTTLE_RATES": {
+        "login_ip": os.getenv("LOGIN_IP_RATE", "30/min"),
+        "login_email": os.getenv("LOGIN_EMAIL_RATE", "10/min"),
+    },
 }
 
 SIMPLE_JWT = {
@@ -96,6 +198,27 @@ SIMPLE_JWT = {
     "AUTH_TOKEN_CLASSES": ("rest_framework_simplejwt.tokens.AccessToken",),
 }
 
+AUTH_USER_CACHE_TTL = int(os.getenv("AUTH_USER_CACHE_TTL", 60))
+
+# Сколько секунд процесс может не видеть токен, отозванный в другом
+# процессе, если кэш default не общий (LocMem).
+TOKEN_BLACKLIST_REFRESH = int(os.getenv("TOKEN_BLACKLIST_REFRESH", 5))
+
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", 1024))
+
+# Хеширование паролей не должно занимать все ядра: чтения обслуживаются
+# теми же процессорами.
+PASSWORD_HASH_WORKERS = int(
+    os.getenv("PASSWORD_HASH_WORKERS", max(1, (os.cpu_count() or 1) // 2))
+)
+
+PASSWORD_HASH_QUEUE = int(
+    os.getenv("PASSWORD_HASH_QUEUE", 4 * max(1, PASSWORD_HASH_WORKERS))
+)
+
+# Приоритет (nice) процессов хеширования относительно обработчиков запросов.
+PASSWORD_HASH_NICE = int(os.getenv("PASSWORD_HASH_NICE", 10))
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": (
@@ -127,4 +250,52 @@ USE_TZ = True
 
 STATIC_URL = "/static/"
 
+MEDIA_URL = "/media/"
+
+MEDIA_ROOT = BASE_DIR / "media"
+
+IMAGE_MAX_UPLOAD_SIZE = 5 * 1024 * 1024
+
+IMAGE_MAX_DIMENSION = 4096
+
+IMAGE_RENDITIONS = {
+    "list": (320, 320),
+    "card": (640, 640),
+    "detail": (1280, 1280),
+}
+
+IMAGE_RENDITION_FORMAT = "WEBP"
+
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", 2))
+
+INGREDIENT_SEARCH_CACHE = os.getenv(
+    "INGREDIENT_SEARCH_CACHE", "False"
+).lower() in ("true", "1")
+
+INGREDIENT_SEARCH_LIMIT = int(os.getenv("INGREDIENT_SEARCH_LIMIT", 20))
+
+SEARCH_CONFIG = os.getenv("SEARCH_CONFIG", "russian")
+
+SHORT_LINK_CACHE_SIZE = int(os.getenv("SHORT_LINK_CACHE_SIZE", 4096))
+
+SHORT_LINK_FLUSH_SIZE = int(os.getenv("SHORT_LINK_FLUSH_SIZE", 100))
+
+SHORT_LINK_FLUSH_INTERVAL = float(os.getenv("SHORT_LINK_FLUSH_INTERVAL", 10))
+
+SERVER_TIMING = os.getenv("SERVER_TIMING", "False").lower() in ("true", "1")
+
+SLOW_REQUEST_MS = int(os.getenv("SLOW_REQUEST_MS", 500))
+
+SLOW_REQUEST_TOP_QUERIES = int(os.getenv("SLOW_REQUEST_TOP_QUERIES", 5))
+
+# /metrics отдаётся только по токену или с адресов из списка (IP или сети);
+# если не задано ни то, ни другое, эндпоинт отключён.
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+METRICS_ALLOWED_IPS = [
+    address.strip()
+    for address in os.getenv("METRICS_ALLOWED_IPS", "").split(",")
+    if address.strip()
+]
+
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
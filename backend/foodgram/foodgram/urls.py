@@ -1,7 +1,12 @@
 from django.contrib import admin
 from django.urls import path, include
 
+from api.metrics import metrics_view
+from api.views import short_link_redirect
+
 urlpatterns = [
     path("api/", include("api.urls")),
     path("admin/", admin.site.urls),
+    path("s/<str:code>/", short_link_redirect, name="short_link"),
+    path("metrics", metrics_view, name="metrics"),
 ]
@@ -1,5 +1,12 @@
 from django.contrib import admin
-from reciepts.models import Tag, Ingredient, Reciept, CustomUser
+from reciepts.models import (
+    Tag,
+    Ingredient,
+    Reciept,
+    RecieptTag,
+    CustomUser,
+    Subscription,
+)
 
 
 @admin.register(CustomUser)
@@ -13,8 +20,17 @@ class IngredientAdmin(admin.ModelAdmin):
     search_fields = ("name",)
 
 
+class RecieptTagInline(admin.TabularInline):
+    model = RecieptTag
+    extra = 1
+    min_num = 1
+    verbose_name = "Тег"
+    verbose_name_plural = "Теги"
+
+
 @admin.register(Reciept)
 class RecieptAdmin(admin.ModelAdmin):
+    inlines = (RecieptTagInline,)
     list_display = ("name", "author_first_name")
     readonly_fields = ("favorited_count",)
     list_filter = ("tags",)
@@ -27,3 +43,4 @@ class RecieptAdmin(admin.ModelAdmin):
 
 
 admin.site.register(Tag)
+admin.site.register(Subscription)
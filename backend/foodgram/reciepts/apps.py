@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class RecieptsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'reciepts'
+
+    def ready(self):
+        import reciepts.signals  # noqa: F401
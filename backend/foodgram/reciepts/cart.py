@@ -0,0 +1,59 @@
+from django.db.models import Case, F, IntegerField, Sum, Value, When
+
+from reciepts.models import (
+    CustomUser,
+    IngredientReciept,
+    ShoppingCartIngredient,
+)
+
+
+def cart_holders(reciept_id):
+    return list(
+        CustomUser.shopping_cart.through.objects.filter(
+            reciept_id=reciept_id
+        ).values_list("customuser_id", flat=True)
+    )
+
+
+def apply_to_totals(user_ids, reciept_ids, sign):
+    if not user_ids or not reciept_ids:
+        return
+    deltas = dict(
+        IngredientReciept.objects.filter(reciept_id__in=reciept_ids)
+        .values("ingredient_id")
+        .annotate(total=Sum("amount"))
+        .values_list("ingredient_id", "total")
+    )
+    if not deltas:
+        return
+
+    if sign > 0:
+        # Вставка с пропуском конфликтов и последующий UPDATE не зависят от
+        # того, успел ли параллельный запрос создать те же строки.
+        ShoppingCartIngredient.objects.bulk_create(
+            (
+                ShoppingCartIngredient(
+                    user_id=user_id, ingredient_id=ingredient_id, amount=0
+                )
+                for user_id in user_ids
+                for ingredient_id in deltas
+            ),
+            ignore_conflicts=True,
+        )
+    ShoppingCartIngredient.objects.filter(
+        user_id__in=user_ids, ingredient_id__in=deltas
+    ).update(
+        amount=F("amount")
+        + Case(
+            *(
+                When(ingredient_id=ingredient_id, then=Value(sign * delta))
+                for ingredient_id, delta in deltas.items()
+            ),
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+    )
+    if sign < 0:
+        ShoppingCartIngredient.objects.filter(
+            user_id__in=user_ids, amount__lte=0
+        ).delete()
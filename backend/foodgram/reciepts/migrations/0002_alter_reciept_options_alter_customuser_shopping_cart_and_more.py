@@ -0,0 +1,43 @@
+# Generated by Django 4.2.20 on 2026-10-18 20:06
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def clear_shopping_carts(apps, schema_editor):
+    # Строки старой корзины ссылаются на ингредиенты и не могут быть
+    # перенесены на рецепты, поэтому корзины очищаются.
+    CustomUser = apps.get_model('reciepts', 'CustomUser')
+    CustomUser.shopping_cart.through.objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reciepts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='reciept',
+            options={'ordering': ('-id',), 'verbose_name': 'Рецепт', 'verbose_name_plural': 'Рецепты'},
+        ),
+        migrations.RunPython(
+            clear_shopping_carts, migrations.RunPython.noop
+        ),
+        migrations.AlterField(
+            model_name='customuser',
+            name='shopping_cart',
+            field=models.ManyToManyField(blank=True, related_name='shopping_carts', to='reciepts.reciept', verbose_name='Список покупок'),
+        ),
+        migrations.AlterField(
+            model_name='ingredientreciept',
+            name='ingredient',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='i2r', to='reciepts.ingredient'),
+        ),
+        migrations.AlterField(
+            model_name='ingredientreciept',
+            name='reciept',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='i2r', to='reciepts.reciept'),
+        ),
+    ]
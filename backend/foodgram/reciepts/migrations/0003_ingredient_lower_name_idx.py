@@ -0,0 +1,18 @@
+# Generated by Django 4.2.20 on 2026-10-18 20:08
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reciepts', '0002_alter_reciept_options_alter_customuser_shopping_cart_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ingredient',
+            index=models.Index(django.db.models.functions.text.Lower('name'), name='ingredient_lower_name_idx'),
+        ),
+    ]
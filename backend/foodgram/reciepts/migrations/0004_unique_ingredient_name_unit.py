@@ -0,0 +1,54 @@
+# Generated by Django 4.2.20 on 2026-10-18 20:11
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicate_ingredients(apps, schema_editor):
+    Ingredient = apps.get_model('reciepts', 'Ingredient')
+    IngredientReciept = apps.get_model('reciepts', 'IngredientReciept')
+    duplicates = (
+        Ingredient.objects.values('name', 'measurement_unit')
+        .annotate(keep_id=Min('id'), total=Count('id'))
+        .filter(total__gt=1)
+    )
+    for group in duplicates:
+        extra = Ingredient.objects.filter(
+            name=group['name'], measurement_unit=group['measurement_unit']
+        ).exclude(id=group['keep_id'])
+        IngredientReciept.objects.filter(ingredient__in=extra).update(
+            ingredient_id=group['keep_id']
+        )
+        repeated = (
+            IngredientReciept.objects.filter(ingredient_id=group['keep_id'])
+            .values('reciept_id')
+            .annotate(
+                keep_row=Min('id'), amount=Sum('amount'), rows=Count('id')
+            )
+            .filter(rows__gt=1)
+        )
+        for row in repeated:
+            IngredientReciept.objects.filter(id=row['keep_row']).update(
+                amount=row['amount']
+            )
+            IngredientReciept.objects.filter(
+                ingredient_id=group['keep_id'], reciept_id=row['reciept_id']
+            ).exclude(id=row['keep_row']).delete()
+        extra.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reciepts', '0003_ingredient_lower_name_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicate_ingredients, migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('name', 'measurement_unit'), name='unique_ingredient_name_unit'),
+        ),
+    ]
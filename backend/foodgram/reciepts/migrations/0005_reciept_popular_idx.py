@@ -0,0 +1,36 @@
+# Generated by Django 4.2.20 on 2026-10-18 20:12
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_favorites(apps, schema_editor):
+    CustomUser = apps.get_model('reciepts', 'CustomUser')
+    Reciept = apps.get_model('reciepts', 'Reciept')
+    counts = (
+        CustomUser.favorites.through.objects.filter(reciept=OuterRef('pk'))
+        .values('reciept')
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    Reciept.objects.update(
+        favorited_count=Coalesce(
+            Subquery(counts, output_field=IntegerField()), 0
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reciepts', '0004_unique_ingredient_name_unit'),
+    ]
+
+    operations = [
+        migrations.RunPython(count_favorites, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='reciept',
+            index=models.Index(fields=['-favorited_count', '-id'], name='reciept_popular_idx'),
+        ),
+    ]
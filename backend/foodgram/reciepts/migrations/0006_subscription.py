@@ -0,0 +1,86 @@
+# Generated by Django 4.2.20 on 2026-10-18 20:13
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import reciepts.models
+
+
+def copy_subscriptions(apps, schema_editor):
+    # Старая связь симметрична: в ней хранятся обе стороны каждой пары.
+    CustomUser = apps.get_model('reciepts', 'CustomUser')
+    Subscription = apps.get_model('reciepts', 'Subscription')
+    rows = CustomUser.subscriptions.through.objects.exclude(
+        from_customuser=models.F('to_customuser')
+    ).values_list('from_customuser_id', 'to_customuser_id')
+    Subscription.objects.bulk_create(
+        (
+            Subscription(user_id=user_id, author_id=author_id)
+            for user_id, author_id in rows.iterator()
+        ),
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+def restore_subscriptions(apps, schema_editor):
+    # Уникальный индекс промежуточной таблицы SQLite создаёт только в конце
+    # миграции, поэтому повторы пар отбрасываются здесь.
+    CustomUser = apps.get_model('reciepts', 'CustomUser')
+    Subscription = apps.get_model('reciepts', 'Subscription')
+    Through = CustomUser.subscriptions.through
+    pairs = set()
+    for user_id, author_id in Subscription.objects.values_list(
+        'user_id', 'author_id'
+    ).iterator():
+        pairs.add((user_id, author_id))
+        pairs.add((author_id, user_id))
+    Through.objects.bulk_create(
+        (
+            Through(from_customuser_id=first, to_customuser_id=second)
+            for first, second in pairs
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reciepts', '0005_reciept_popular_idx'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='customuser',
+            managers=[
+                ('objects', reciepts.models.CustomUserManager()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Subscription',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='followers', to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='follows', to=settings.AUTH_USER_MODEL, verbose_name='Подписчик')),
+            ],
+            options={
+                'verbose_name': 'Подписка',
+                'verbose_name_plural': 'Подписки',
+                'indexes': [models.Index(fields=['author', 'user'], name='subscription_author_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='subscription',
+            constraint=models.UniqueConstraint(fields=('user', 'author'), name='unique_subscription'),
+        ),
+        migrations.AddConstraint(
+            model_name='subscription',
+            constraint=models.CheckConstraint(check=models.Q(('user', models.F('author')), _negated=True), name='no_self_subscription'),
+        ),
+        migrations.RunPython(copy_subscriptions, restore_subscriptions),
+        migrations.RemoveField(
+            model_name='customuser',
+            name='subscriptions',
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.20 on 2026-10-18 20:16
+
+from django.db import migrations, models
+import reciepts.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reciepts', '0006_subscription'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('ref_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True, db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Файл',
+                'verbose_name_plural': 'Файлы',
+            },
+        ),
+        migrations.AlterField(
+            model_name='customuser',
+            name='avatar',
+            field=models.ImageField(default=None, null=True, storage=reciepts.storage.ContentAddressedStorage(), upload_to='images/user_avatars/', verbose_name='Фото профиля'),
+        ),
+        migrations.AlterField(
+            model_name='reciept',
+            name='image',
+            field=models.ImageField(storage=reciepts.storage.ContentAddressedStorage(), upload_to='images/reciept_images/', verbose_name='Картинка'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reciepts', '0007_media_blobs'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='RecieptTag',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('reciept', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='reciepts.reciept')),
+                        ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='reciepts.tag')),
+                    ],
+                    options={
+                        'db_table': 'reciepts_reciept_tags',
+                        'unique_together': {('reciept', 'tag')},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='reciept',
+                    name='tags',
+                    field=models.ManyToManyField(through='reciepts.RecieptTag', to='reciepts.tag', verbose_name='Теги'),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='reciept',
+            index=models.Index(fields=['author', '-id'], name='reciept_author_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reciepttag',
+            index=models.Index(fields=['tag', 'reciept'], name='reciept_tag_tag_idx'),
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 4.2.20 on 2026-10-18 20:19
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Sum
+
+
+def fill_shopping_cart_totals(apps, schema_editor):
+    IngredientReciept = apps.get_model('reciepts', 'IngredientReciept')
+    ShoppingCartIngredient = apps.get_model(
+        'reciepts', 'ShoppingCartIngredient'
+    )
+    totals = (
+        IngredientReciept.objects.filter(reciept__shopping_carts__isnull=False)
+        .values('reciept__shopping_carts', 'ingredient')
+        .annotate(total=Sum('amount'))
+    )
+    ShoppingCartIngredient.objects.bulk_create(
+        ShoppingCartIngredient(
+            user_id=row['reciept__shopping_carts'],
+            ingredient_id=row['ingredient'],
+            amount=row['total'],
+        )
+        for row in totals
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reciepts', '0008_reciept_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='reciept',
+            name='is_favorited',
+        ),
+        migrations.RemoveField(
+            model_name='reciept',
+            name='is_in_shopping_cart',
+        ),
+        migrations.CreateModel(
+            name='ShoppingCartIngredient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.IntegerField(verbose_name='Количество')),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='reciepts.ingredient', verbose_name='Ингредиент')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_cart_totals', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Ингредиент в списке покупок',
+                'verbose_name_plural': 'Ингредиенты в списке покупок',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='shoppingcartingredient',
+            constraint=models.UniqueConstraint(fields=('user', 'ingredient'), name='unique_shopping_cart_ingredient'),
+        ),
+        migrations.RunPython(
+            fill_shopping_cart_totals, migrations.RunPython.noop
+        ),
+    ]
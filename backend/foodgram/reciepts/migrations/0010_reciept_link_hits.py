@@ -0,0 +1,18 @@
+# Generated by Django 4.2.20 on 2026-10-18 20:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reciepts', '0009_shopping_cart_totals'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reciept',
+            name='link_hits',
+            field=models.IntegerField(default=0, verbose_name='Переходы по короткой ссылке'),
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 4.2.20 on 2026-10-18 21:05
+
+from django.conf import settings
+from django.db import migrations
+
+DOCUMENT_JOINS = (
+    'FROM reciepts_reciept r '
+    'LEFT JOIN reciepts_ingredientreciept ir ON ir.reciept_id = r.id '
+    'LEFT JOIN reciepts_ingredient i ON i.id = ir.ingredient_id '
+)
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            'CREATE VIRTUAL TABLE reciepts_reciept_search USING fts5('
+            'name, text, ingredients, '
+            "tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        schema_editor.execute(
+            'INSERT INTO reciepts_reciept_search '
+            '(reciepts_reciept_search, rank) '
+            "VALUES ('rank', 'bm25(10.0, 1.0, 5.0)')"
+        )
+        schema_editor.execute(
+            'INSERT INTO reciepts_reciept_search '
+            '(rowid, name, text, ingredients) '
+            "SELECT r.id, r.name, r.text, "
+            "COALESCE(group_concat(i.name, ' '), '') "
+            f'{DOCUMENT_JOINS}GROUP BY r.id'
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE TABLE reciepts_reciept_search ('
+            'reciept_id bigint PRIMARY KEY REFERENCES reciepts_reciept (id) '
+            'ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, '
+            'document tsvector NOT NULL)'
+        )
+        schema_editor.execute(
+            'CREATE INDEX reciepts_reciept_search_gin '
+            'ON reciepts_reciept_search USING GIN (document)'
+        )
+        schema_editor.execute(
+            'INSERT INTO reciepts_reciept_search (reciept_id, document) '
+            'SELECT r.id, '
+            "setweight(to_tsvector(%s::regconfig, r.name), 'A') || "
+            'setweight(to_tsvector(%s::regconfig, '
+            "COALESCE(string_agg(i.name, ' '), '')), 'B') || "
+            "setweight(to_tsvector(%s::regconfig, r.text), 'C') "
+            f'{DOCUMENT_JOINS}GROUP BY r.id',
+            [settings.SEARCH_CONFIG] * 3,
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        schema_editor.execute('DROP TABLE reciepts_reciept_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reciepts', '0010_reciept_link_hits'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.20 on 2026-10-19 09:12
+
+from django.db import migrations, models
+
+from reciepts.models import normalize_ingredient_name
+
+
+def fill_search_names(apps, schema_editor):
+    Ingredient = apps.get_model('reciepts', 'Ingredient')
+    ingredients = list(Ingredient.objects.only('id', 'name'))
+    for ingredient in ingredients:
+        ingredient.search_name = normalize_ingredient_name(ingredient.name)
+    Ingredient.objects.bulk_update(
+        ingredients, ['search_name'], batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reciepts', '0011_reciept_search'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='ingredient',
+            name='ingredient_lower_name_idx',
+        ),
+        migrations.AddField(
+            model_name='ingredient',
+            name='search_name',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=128, verbose_name='Название для поиска'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_search_names, migrations.RunPython.noop),
+    ]
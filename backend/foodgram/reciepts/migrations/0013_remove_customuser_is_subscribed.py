@@ -0,0 +1,17 @@
+# Generated by Django 4.2.20 on 2026-10-19 09:40
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reciepts', '0012_ingredient_search_name'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='customuser',
+            name='is_subscribed',
+        ),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 4.2.20 on 2026-10-19 11:20
+
+from django.db import migrations
+
+
+def create_trigram_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        # Триггеры пропадут, если SQLite пересоздаст таблицу ингредиентов
+        # в следующей миграции: тогда их нужно создать заново.
+        schema_editor.execute(
+            'CREATE VIRTUAL TABLE reciepts_ingredient_trigram USING fts5('
+            "search_name, tokenize = 'trigram', "
+            "content = 'reciepts_ingredient', content_rowid = 'id')"
+        )
+        schema_editor.execute(
+            'CREATE TRIGGER reciepts_ingredient_trigram_insert '
+            'AFTER INSERT ON reciepts_ingredient BEGIN '
+            'INSERT INTO reciepts_ingredient_trigram (rowid, search_name) '
+            'VALUES (new.id, new.search_name); END'
+        )
+        schema_editor.execute(
+            'CREATE TRIGGER reciepts_ingredient_trigram_delete '
+            'AFTER DELETE ON reciepts_ingredient BEGIN '
+            'INSERT INTO reciepts_ingredient_trigram '
+            '(reciepts_ingredient_trigram, rowid, search_name) '
+            "VALUES ('delete', old.id, old.search_name); END"
+        )
+        schema_editor.execute(
+            'CREATE TRIGGER reciepts_ingredient_trigram_update '
+            'AFTER UPDATE OF search_name ON reciepts_ingredient BEGIN '
+            'INSERT INTO reciepts_ingredient_trigram '
+            '(reciepts_ingredient_trigram, rowid, search_name) '
+            "VALUES ('delete', old.id, old.search_name); "
+            'INSERT INTO reciepts_ingredient_trigram (rowid, search_name) '
+            'VALUES (new.id, new.search_name); END'
+        )
+        schema_editor.execute(
+            'INSERT INTO reciepts_ingredient_trigram '
+            "(reciepts_ingredient_trigram) VALUES ('rebuild')"
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        schema_editor.execute(
+            'CREATE INDEX reciepts_ingredient_search_name_trgm '
+            'ON reciepts_ingredient USING GIN (search_name gin_trgm_ops)'
+        )
+
+
+def drop_trigram_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        for action in ('insert', 'delete', 'update'):
+            schema_editor.execute(
+                f'DROP TRIGGER reciepts_ingredient_trigram_{action}'
+            )
+        schema_editor.execute('DROP TABLE reciepts_ingredient_trigram')
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            'DROP INDEX reciepts_ingredient_search_name_trgm'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reciepts', '0013_remove_customuser_is_subscribed'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
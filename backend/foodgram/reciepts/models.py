@@ -1,7 +1,9 @@
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, UserManager
 from django.db import models
+from django.db.models.functions import Coalesce, RowNumber
 
 
+from reciepts.storage import content_storage
 from reciepts.constants import (
     MAX_USERNAME_LENGTH,
     MAX_EMAIL_LENGTH,
@@ -31,25 +33,96 @@ class Tag(models.Model):
         return self.name
 
 
+def normalize_ingredient_name(name):
+    return " ".join(name.casefold().replace("ё", "е").split())
+
+
+class IngredientQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for obj in objs:
+            obj.search_name = normalize_ingredient_name(obj.name)
+        return super().bulk_create(objs, *args, **kwargs)
+
+
 class Ingredient(models.Model):
     name = models.CharField(
         max_length=MAX_INGREDIENT_NAME_LENGTH,
         blank=False,
         verbose_name="Название",
     )
+    search_name = models.CharField(
+        max_length=MAX_INGREDIENT_NAME_LENGTH,
+        db_index=True,
+        editable=False,
+        verbose_name="Название для поиска",
+    )
     measurement_unit = models.CharField(
         max_length=MAX_MEASUREMENT_UNIT_LENGTH,
         blank=False,
         verbose_name="Единица измерения",
     )
 
+    objects = IngredientQuerySet.as_manager()
+
     class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=("name", "measurement_unit"),
+                name="unique_ingredient_name_unit",
+            )
+        ]
         verbose_name = "Ингредиент"
         verbose_name_plural = "Ингредиенты"
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        self.search_name = normalize_ingredient_name(self.name)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "name" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "search_name"}
+        super().save(*args, **kwargs)
+
+
+class RecieptQuerySet(models.QuerySet):
+    def with_related(self):
+        return self.select_related("author").prefetch_related(
+            "tags",
+            models.Prefetch(
+                "i2r",
+                queryset=IngredientReciept.objects.select_related(
+                    "ingredient"
+                ),
+            ),
+        )
+
+    def with_user_flags(self, user):
+        if not user.is_authenticated:
+            return self.annotate(
+                user_favorited=models.Value(False),
+                user_in_shopping_cart=models.Value(False),
+                author_subscribed=models.Value(False),
+            )
+        return self.annotate(
+            user_favorited=models.Exists(
+                CustomUser.favorites.through.objects.filter(
+                    customuser=user, reciept=models.OuterRef("pk")
+                )
+            ),
+            user_in_shopping_cart=models.Exists(
+                CustomUser.shopping_cart.through.objects.filter(
+                    customuser=user, reciept=models.OuterRef("pk")
+                )
+            ),
+            author_subscribed=models.Exists(
+                Subscription.objects.filter(
+                    user=user, author=models.OuterRef("author_id")
+                )
+            ),
+        )
+
 
 class Reciept(models.Model):
     name = models.CharField(
@@ -57,6 +130,7 @@ class Reciept(models.Model):
     )
     image = models.ImageField(
         upload_to="images/reciept_images/",
+        storage=content_storage,
         blank=False,
         verbose_name="Картинка",
     )
@@ -70,24 +144,33 @@ class Reciept(models.Model):
         verbose_name="Автор",
         on_delete=models.CASCADE,
     )
-    tags = models.ManyToManyField(Tag, blank=False, verbose_name="Теги")
+    tags = models.ManyToManyField(
+        Tag, blank=False, through="RecieptTag", verbose_name="Теги"
+    )
     ingredients = models.ManyToManyField(
         Ingredient,
         blank=False,
         through="IngredientReciept",
         verbose_name="Ингредиенты",
     )
-    is_favorited = models.BooleanField(
-        default=False, verbose_name="В избранном"
-    )
-    is_in_shopping_cart = models.BooleanField(
-        default=False, verbose_name="В списке покупок"
-    )
     favorited_count = models.IntegerField(
         default=0, verbose_name="Количество добавлений в избранное"
     )
+    link_hits = models.IntegerField(
+        default=0, verbose_name="Переходы по короткой ссылке"
+    )
+
+    objects = RecieptQuerySet.as_manager()
 
     class Meta:
+        ordering = ("-id",)
+        indexes = [
+            models.Index(
+                fields=("-favorited_count", "-id"),
+                name="reciept_popular_idx",
+            ),
+            models.Index(fields=("author", "-id"), name="reciept_author_idx"),
+        ]
         verbose_name = "Рецепт"
         verbose_name_plural = "Рецепты"
 
@@ -95,6 +178,18 @@ class Reciept(models.Model):
         return self.name
 
 
+class RecieptTag(models.Model):
+    reciept = models.ForeignKey(Reciept, on_delete=models.CASCADE)
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE)
+
+    class Meta:
+        db_table = "reciepts_reciept_tags"
+        unique_together = ("reciept", "tag")
+        indexes = [
+            models.Index(fields=("tag", "reciept"), name="reciept_tag_tag_idx")
+        ]
+
+
 class IngredientReciept(models.Model):
     ingredient = models.ForeignKey(
         Ingredient, on_delete=models.CASCADE, related_name="i2r"
@@ -105,6 +200,50 @@ class IngredientReciept(models.Model):
     amount = models.IntegerField()
 
 
+class CustomUserQuerySet(models.QuerySet):
+    def with_recipes(self, recipes_limit=None):
+        recipes = Reciept.objects.order_by("-id")
+        if recipes_limit is not None:
+            recipes = recipes.annotate(
+                author_position=models.Window(
+                    RowNumber(),
+                    partition_by=models.F("author_id"),
+                    order_by=models.F("id").desc(),
+                )
+            ).filter(author_position__lte=recipes_limit)
+        # Коррелированный подзапрос считается только для строк страницы,
+        # а не для всех авторов подписки, как JOIN с GROUP BY.
+        recipes_count = (
+            Reciept.objects.filter(author=models.OuterRef("pk"))
+            .order_by()
+            .values("author")
+            .annotate(count=models.Count("id"))
+            .values("count")
+        )
+        return self.annotate(
+            recipes_count=Coalesce(models.Subquery(recipes_count), 0)
+        ).prefetch_related(
+            models.Prefetch(
+                "reciept_set", queryset=recipes, to_attr="limited_recipes"
+            )
+        )
+
+    def with_subscription_flag(self, user):
+        if not user.is_authenticated:
+            return self.annotate(user_subscribed=models.Value(False))
+        return self.annotate(
+            user_subscribed=models.Exists(
+                Subscription.objects.filter(
+                    user=user, author=models.OuterRef("pk")
+                )
+            )
+        )
+
+
+class CustomUserManager(UserManager.from_queryset(CustomUserQuerySet)):
+    pass
+
+
 class CustomUser(AbstractUser):
     email = models.EmailField(
         max_length=MAX_EMAIL_LENGTH,
@@ -122,26 +261,103 @@ class CustomUser(AbstractUser):
     last_name = models.CharField(
         max_length=MAX_SURNAME_LENGTH, verbose_name="Фамилия"
     )
-    is_subscribed = models.BooleanField(default=False, verbose_name="Подписан")
     avatar = models.ImageField(
         upload_to="images/user_avatars/",
+        storage=content_storage,
         null=True,
         default=None,
         verbose_name="Фото профиля",
     )
-    subscriptions = models.ManyToManyField(
-        "self", blank=True, verbose_name="Подписки"
-    )
     shopping_cart = models.ManyToManyField(
-        Ingredient, blank=True, verbose_name="Список покупок"
+        Reciept,
+        blank=True,
+        related_name="shopping_carts",
+        verbose_name="Список покупок",
     )
     favorites = models.ManyToManyField(
         Reciept, blank=True, verbose_name="Избранное"
     )
 
+    objects = CustomUserManager()
+
     class Meta:
         verbose_name = "Пользователь"
         verbose_name_plural = "Пользователи"
 
     def __str__(self):
         return self.username
+
+
+class Subscription(models.Model):
+    user = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        related_name="follows",
+        verbose_name="Подписчик",
+    )
+    author = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        related_name="followers",
+        verbose_name="Автор",
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=("user", "author"), name="unique_subscription"
+            ),
+            models.CheckConstraint(
+                check=~models.Q(user=models.F("author")),
+                name="no_self_subscription",
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=("author", "user"), name="subscription_author_idx"
+            )
+        ]
+        verbose_name = "Подписка"
+        verbose_name_plural = "Подписки"
+
+    def __str__(self):
+        return f"{self.user} → {self.author}"
+
+
+class MediaBlob(models.Model):
+    name = models.CharField(max_length=255, unique=True)
+    ref_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        verbose_name = "Файл"
+        verbose_name_plural = "Файлы"
+
+    def __str__(self):
+        return self.name
+
+
+class ShoppingCartIngredient(models.Model):
+    user = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        related_name="shopping_cart_totals",
+        verbose_name="Пользователь",
+    )
+    ingredient = models.ForeignKey(
+        Ingredient, on_delete=models.CASCADE, verbose_name="Ингредиент"
+    )
+    amount = models.IntegerField(verbose_name="Количество")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=("user", "ingredient"),
+                name="unique_shopping_cart_ingredient",
+            )
+        ]
+        verbose_name = "Ингредиент в списке покупок"
+        verbose_name_plural = "Ингредиенты в списке покупок"
+
+    def __str__(self):
+        return f"{self.ingredient}: {self.amount}"
@@ -0,0 +1,102 @@
+from django.db.models import F
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from reciepts.cart import apply_to_totals, cart_holders
+from reciepts.models import CustomUser, MediaBlob, Reciept
+from reciepts.storage import is_blob
+
+BLOB_FIELDS = {Reciept: "image", CustomUser: "avatar"}
+
+
+def change_ref_count(name, delta):
+    if not is_blob(name):
+        return
+    updated = MediaBlob.objects.filter(name=name).update(
+        ref_count=F("ref_count") + delta, updated_at=timezone.now()
+    )
+    if updated or delta <= 0:
+        return
+    # Строки ещё нет или её только что удалил collect_orphan_blobs.
+    _, created = MediaBlob.objects.get_or_create(
+        name=name, defaults={"ref_count": delta}
+    )
+    if not created:
+        MediaBlob.objects.filter(name=name).update(
+            ref_count=F("ref_count") + delta, updated_at=timezone.now()
+        )
+
+
+@receiver(pre_save, sender=Reciept)
+@receiver(pre_save, sender=CustomUser)
+def remember_previous_blob(sender, instance, update_fields=None, **kwargs):
+    field = BLOB_FIELDS[sender]
+    if instance.pk is None or (
+        update_fields is not None and field not in update_fields
+    ):
+        return
+    instance._previous_blob = (
+        sender.objects.filter(pk=instance.pk)
+        .values_list(field, flat=True)
+        .first()
+    )
+
+
+@receiver(post_save, sender=Reciept)
+@receiver(post_save, sender=CustomUser)
+def update_blob_refs(sender, instance, **kwargs):
+    if "_previous_blob" not in instance.__dict__:
+        if not kwargs["created"]:
+            return
+        previous = None
+    else:
+        previous = instance.__dict__.pop("_previous_blob")
+    current = getattr(instance, BLOB_FIELDS[sender]).name or None
+    if current != previous:
+        change_ref_count(current, 1)
+        change_ref_count(previous, -1)
+
+
+@receiver(post_delete, sender=Reciept)
+@receiver(post_delete, sender=CustomUser)
+def release_blob(sender, instance, **kwargs):
+    change_ref_count(getattr(instance, BLOB_FIELDS[sender]).name, -1)
+
+
+@receiver(m2m_changed, sender=CustomUser.shopping_cart.through)
+def update_shopping_cart_totals(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    if action not in ("post_add", "pre_remove", "pre_clear"):
+        return
+    if reverse:
+        rows = sender.objects.filter(reciept_id=instance.pk)
+        related_field = "customuser_id"
+    else:
+        rows = sender.objects.filter(customuser_id=instance.pk)
+        related_field = "reciept_id"
+
+    if action == "post_add":
+        related_ids, sign = list(pk_set), 1
+    else:
+        if action == "pre_remove":
+            rows = rows.filter(**{f"{related_field}__in": pk_set})
+        related_ids = list(rows.values_list(related_field, flat=True))
+        sign = -1
+
+    if reverse:
+        apply_to_totals(related_ids, [instance.pk], sign)
+    else:
+        apply_to_totals([instance.pk], related_ids, sign)
+
+
+@receiver(pre_delete, sender=Reciept)
+def remove_from_shopping_cart_totals(sender, instance, **kwargs):
+    apply_to_totals(cart_holders(instance.pk), [instance.pk], -1)
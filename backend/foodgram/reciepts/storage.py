@@ -0,0 +1,63 @@
+import hashlib
+import os
+import posixpath
+import tempfile
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+BLOBS_PREFIX = "blobs"
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    def blob_name(self, name, content):
+        sha256 = hashlib.sha256()
+        for chunk in content.chunks():
+            sha256.update(chunk)
+        digest = sha256.hexdigest()
+        ext = os.path.splitext(name)[1].lower()
+        return posixpath.join(
+            BLOBS_PREFIX, digest[:2], digest[2:4], digest + ext
+        )
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+        name = self.blob_name(name, content)
+        if self.exists(name):
+            try:
+                os.utime(self.path(name))
+            except FileNotFoundError:
+                return self._save(name, content)
+            return name
+        return self._save(name, content)
+
+    def _save(self, name, content):
+        full_path = self.path(name)
+        directory = os.path.dirname(full_path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                for chunk in content.chunks():
+                    tmp.write(chunk)
+            if self.file_permissions_mode is not None:
+                os.chmod(tmp_path, self.file_permissions_mode)
+            try:
+                os.link(tmp_path, full_path)
+            except FileExistsError:
+                pass
+        finally:
+            os.unlink(tmp_path)
+        return name
+
+
+content_storage = ContentAddressedStorage()
+
+
+def is_blob(name):
+    return bool(name) and name.startswith(BLOBS_PREFIX + "/")